@@ -0,0 +1,170 @@
+import os
+import re
+import threading
+
+from langchain_core.documents import Document
+
+from agents.heuristic_extractor import is_heading
+
+# Token- and structure-aware chunking.
+#
+# Chunks are sized in tokens of the embedding model (all-MiniLM-L6-v2 reads at
+# most 256 word pieces, anything beyond is silently truncated), a heading always
+# starts a new chunk, and paragraphs are only broken when a single paragraph is
+# larger than the budget. Every chunk is an exact slice of its page, and its
+# start_index/end_index are stored in the metadata so callers can map chunks
+# back to the source text without re-splitting. There is no overlap by default:
+# chunks end on paragraph boundaries, so repeating 20% of the text bought little.
+
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "256"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+CHUNK_TOKENIZER = os.getenv("CHUNK_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+
+_WORD = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.?!;:])\s+")
+_LINE = re.compile(r"[^\n]*\n?")
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+
+
+def _load_tokenizer():
+    global _tokenizer
+    with _tokenizer_lock:
+        if _tokenizer is None:
+            try:
+                from transformers import AutoTokenizer
+
+                _tokenizer = AutoTokenizer.from_pretrained(CHUNK_TOKENIZER)
+            except Exception as e:
+                # Offline or transformers missing: words + punctuation is a close
+                # (slightly low) estimate of WordPiece counts for English text
+                print(f"tokenizer {CHUNK_TOKENIZER} unavailable ({e}), using regex token estimate")
+                _tokenizer = False
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Token count of ``text`` under the embedding model's tokenizer."""
+    tokenizer = _load_tokenizer()
+    if tokenizer:
+        return len(tokenizer.encode(text, add_special_tokens=False))
+    return len(_WORD.findall(text))
+
+
+def _blocks(text):
+    """Yield (start, end, heading) spans: headings and blank-line separated paragraphs."""
+    start = end = None
+    for match in _LINE.finditer(text):
+        line = match.group(0)
+        if not line:
+            break
+        if not line.strip():
+            if start is not None:
+                yield start, end, False
+                start = None
+            continue
+        if is_heading(line):
+            if start is not None:
+                yield start, end, False
+                start = None
+            yield match.start(), match.start() + len(line.rstrip()), True
+            continue
+        if start is None:
+            start = match.start() + len(line) - len(line.lstrip())
+        end = match.start() + len(line.rstrip())
+    if start is not None:
+        yield start, end, False
+
+
+def _pieces(text, start, end, max_tokens):
+    """Split an oversized span at sentence ends, then at word boundaries."""
+    spans, cursor = [], start
+    for match in _SENTENCE_END.finditer(text, start, end):
+        spans.append((cursor, match.start()))
+        cursor = match.end()
+    spans.append((cursor, end))
+
+    for span_start, span_end in spans:
+        if count_tokens(text[span_start:span_end]) <= max_tokens:
+            yield span_start, span_end
+            continue
+        piece_start, tokens = None, 0
+        for word in re.finditer(r"\S+", text[span_start:span_end]):
+            word_start, word_end = span_start + word.start(), span_start + word.end()
+            word_tokens = count_tokens(word.group(0))
+            if piece_start is not None and tokens + word_tokens > max_tokens:
+                yield piece_start, piece_end
+                piece_start, tokens = None, 0
+            if piece_start is None:
+                piece_start = word_start
+            piece_end = word_end
+            tokens += word_tokens
+        if piece_start is not None:
+            yield piece_start, piece_end
+
+
+class StructureAwareSplitter:
+    """Drop-in replacement for the RecursiveCharacterTextSplitter calls used here.
+
+    Implements ``split_text``, ``create_documents`` and ``split_documents``.
+    Chunk metadata carries ``start_index``/``end_index`` (offsets into the input
+    text), ``tokens`` and the nearest preceding ``heading``.
+    """
+
+    def __init__(self, max_tokens=None, overlap_tokens=None):
+        self.max_tokens = max_tokens or CHUNK_MAX_TOKENS
+        self.overlap_tokens = CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
+
+    def iter_spans(self, text):
+        """Yield (start, end, tokens, heading) for each chunk of ``text``."""
+        chunk, tokens, heading = [], 0, None
+
+        def flush():
+            return chunk[0][0], chunk[-1][1], tokens, heading
+
+        for start, end, is_head in _blocks(text):
+            if is_head:
+                if chunk:
+                    yield flush()
+                chunk, tokens = [], 0
+                heading = text[start:end].strip()
+            size = count_tokens(text[start:end])
+            spans = [(start, end, size)] if size <= self.max_tokens else [
+                (s, e, count_tokens(text[s:e])) for s, e in _pieces(text, start, end, self.max_tokens)
+            ]
+            for span_start, span_end, span_tokens in spans:
+                if chunk and tokens + span_tokens > self.max_tokens:
+                    yield flush()
+                    # Carry trailing spans forward as overlap, if configured
+                    carried, carried_tokens = [], 0
+                    for prev in reversed(chunk):
+                        if carried_tokens + prev[2] > self.overlap_tokens:
+                            break
+                        carried.insert(0, prev)
+                        carried_tokens += prev[2]
+                    chunk, tokens = carried, carried_tokens
+                chunk.append((span_start, span_end, span_tokens))
+                tokens += span_tokens
+        if chunk:
+            yield flush()
+
+    def split_text(self, text):
+        return [text[start:end] for start, end, _, _ in self.iter_spans(text)]
+
+    def create_documents(self, texts, metadatas=None):
+        documents = []
+        for i, text in enumerate(texts):
+            base = metadatas[i] if metadatas else {}
+            for start, end, tokens, heading in self.iter_spans(text):
+                documents.append(Document(
+                    page_content=text[start:end],
+                    metadata={**base, "start_index": start, "end_index": end, "tokens": tokens, "heading": heading},
+                ))
+        return documents
+
+    def split_documents(self, documents):
+        return self.create_documents(
+            [doc.page_content for doc in documents],
+            [dict(doc.metadata) for doc in documents],
+        )
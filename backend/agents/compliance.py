@@ -0,0 +1,84 @@
+import json
+import os
+import re
+
+from methods.token_budget import select_within_budget
+
+# Batched requirement compliance checking.
+#
+# Instead of one agent run per requirement (and guessing compliance from the
+# word "yes" in the answer), evidence for each requirement is retrieved from the
+# company documents (vector search only, no LLM) and up to
+# COMPLIANCE_BATCH_SIZE requirements are judged in a single prompt that returns
+# strict JSON keyed by requirement id.
+
+COMPLIANCE_BATCH_SIZE = int(os.getenv("RFP_COMPLIANCE_BATCH_SIZE", "20"))
+EVIDENCE_TOKENS = int(os.getenv("RFP_COMPLIANCE_EVIDENCE_TOKENS", "300"))  # per requirement
+NOT_EVALUATED = "Not evaluated by the compliance check."
+
+COMPLIANCE_PROMPT = (
+    "You are checking whether our company meets the requirements of an RFP.\n"
+    "For each requirement below you get excerpts from our company documentation. "
+    "Mark a requirement satisfied only if the excerpts support it; if they do not "
+    "mention it, it is not satisfied. Quote or paraphrase the supporting excerpt "
+    "as evidence, or explain what is missing.\n\n"
+    "Respond ONLY with JSON in this format:\n"
+    '{{"results": [{{"id": "R1", "satisfied": true, "evidence": "..."}}]}}\n'
+    "Include every requirement id exactly once.\n\n"
+    "{items}"
+)
+
+
+def batched(items, size=None):
+    size = size or COMPLIANCE_BATCH_SIZE
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _evidence(retriever, text):
+    docs = retriever.invoke(text)
+    excerpts = [f"- {doc.page_content.strip()}" for doc in docs if doc.page_content.strip()]
+    return "\n".join(select_within_budget(excerpts, EVIDENCE_TOKENS, "\n")) or "- (no matching company documentation)"
+
+
+def _parse_results(content):
+    if match := re.search(r"```(?:json)?\s*(\{.*\})\s*```", content, re.DOTALL):
+        content = match.group(1)
+    else:
+        start, end = content.find("{"), content.rfind("}") + 1
+        if start == -1 or end == 0:
+            raise ValueError("No JSON object found in compliance response.")
+        content = content[start:end]
+    return json.loads(content).get("results", [])
+
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("true", "yes", "1", "satisfied")
+
+
+def check_requirements(requirements, retriever, llm):
+    """Judge one batch of requirements with a single LLM call.
+
+    Returns ``{requirement_id: {"satisfied": bool, "evidence": str}}`` with an
+    entry for every requirement; ids the model skipped are reported as not
+    satisfied. Raises if the call fails or the response is not valid JSON.
+    """
+    items = "\n\n".join(
+        f"Requirement {req['id']}: {req['text']}\nCompany documentation:\n{_evidence(retriever, req['text'])}"
+        for req in requirements
+    )
+    response = llm.invoke(COMPLIANCE_PROMPT.format(items=items))
+    results = _parse_results(getattr(response, "content", str(response)))
+
+    by_id = {}
+    for result in results:
+        if isinstance(result, dict) and result.get("id") is not None:
+            by_id[str(result["id"])] = {
+                "satisfied": _as_bool(result.get("satisfied")),
+                "evidence": str(result.get("evidence") or ""),
+            }
+    return {
+        str(req["id"]): by_id.get(str(req["id"]), {"satisfied": False, "evidence": NOT_EVALUATED})
+        for req in requirements
+    }
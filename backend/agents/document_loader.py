@@ -0,0 +1,110 @@
+import io
+import mmap
+import os
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from agents.chunking import StructureAwareSplitter
+from methods.excel_extraction import iter_excel_row_batches
+from methods.pdf_extraction import iter_pdf_page_texts
+
+# Lazy, page-at-a-time document loading.
+#
+# Loaders are generators: a PDF yields one Document per page as it is parsed,
+# and iter_document_chunks() splits each page as soon as it arrives. Callers
+# that consume chunks incrementally therefore only hold a window of pages in
+# memory instead of every page of a 600-page tender.
+
+SUPPORTED_EXTENSIONS = (".pdf", ".docx", ".xlsx")
+CHUNKER = os.getenv("RFP_CHUNKER", "structure")
+
+
+def open_source(source, use_mmap=True):
+    """Return a seekable binary stream for a path, raw bytes or an open buffer.
+
+    Paths are memory-mapped instead of read into a copy (or opened as a plain
+    file with ``use_mmap=False``: zipfile cannot read an mmap), bytes are
+    wrapped in a BytesIO and file-like objects (e.g. the download buffer) are
+    used as-is. A stream opened from a path belongs to the caller, who closes it.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if isinstance(source, (str, os.PathLike)):
+        if os.path.getsize(source) == 0:
+            raise ValueError("Uploaded document is empty.")
+        if not use_mmap:
+            return open(source, "rb")
+        with open(source, "rb") as fh:
+            return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+    source.seek(0)
+    return source
+
+
+def _iter_pdf(stream, name):
+    # Large PDFs are extracted across the shared process pool
+    for i, text in enumerate(iter_pdf_page_texts(stream)):
+        yield Document(page_content=text, metadata={"source": name, "page": i})
+
+
+def _iter_docx(stream, name):
+    import docx2txt
+
+    yield Document(page_content=docx2txt.process(stream), metadata={"source": name})
+
+
+def _iter_xlsx(stream, name):
+    # One Document per row batch (header row repeated), streamed in read-only mode.
+    # zipfile cannot read an mmap directly; the compressed workbook is small.
+    source = stream[:] if isinstance(stream, mmap.mmap) else stream
+    for sheet, first, last, text in iter_excel_row_batches(source):
+        yield Document(
+            page_content=text,
+            metadata={"source": name, "sheet": sheet, "first_row": first, "last_row": last},
+        )
+
+
+_LOADERS = {".pdf": _iter_pdf, ".docx": _iter_docx, ".xlsx": _iter_xlsx}
+
+
+def source_name(source, filename=None):
+    return filename or (str(source) if isinstance(source, (str, os.PathLike)) else "")
+
+
+def iter_document_pages(source, filename=None):
+    """Yield the pages of a PDF, DOCX or XLSX document lazily as Documents.
+
+    ``source`` may be a file path, raw bytes or a binary buffer; ``filename``
+    picks the parser when ``source`` is not a path.
+    """
+    name = source_name(source, filename)
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in _LOADERS:
+        raise ValueError("Unsupported file format. Only PDF, DOCX and XLSX are supported.")
+
+    stream = open_source(source)
+    try:
+        yield from _LOADERS[extension](stream, os.path.basename(name))
+    finally:
+        if isinstance(stream, mmap.mmap):
+            stream.close()
+
+
+def default_splitter():
+    """Chunker selected by RFP_CHUNKER: "structure" (token/heading aware) or "recursive"."""
+    if CHUNKER == "recursive":
+        return RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200, add_start_index=True)
+    return StructureAwareSplitter()
+
+
+def iter_document_chunks(source, filename=None, splitter=None):
+    """Yield chunks page by page; a page is split and released before the next is parsed."""
+    splitter = splitter or default_splitter()
+    for page in iter_document_pages(source, filename):
+        yield from splitter.split_documents([page])
+
+
+def iter_document_text(source, filename=None):
+    """Yield the text of each page lazily (no Document list is ever materialized)."""
+    for page in iter_document_pages(source, filename):
+        yield page.page_content
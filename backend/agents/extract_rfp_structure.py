@@ -1,56 +1,249 @@
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, UnstructuredExcelLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import google.generativeai as genai
 import json
 from fastapi import HTTPException
 import os
 import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from agents.document_loader import default_splitter, iter_document_chunks, iter_document_pages
+from agents.heuristic_extractor import extract_structure_heuristically
+from agents.structure_merge import merge_partial_structures
+from methods.llm_provider import generate_content, get_gemini_model
+from methods.telemetry import with_current_context
 
 # Document processing functions
 
-def process_document(file_path):
-    print("hello3")
-    """Extract text and metadata from uploaded documents (PDF, DOCX or XLSX)"""
-    if file_path.endswith('.pdf'):
-        loader = PyPDFLoader(file_path)
-        documents = loader.load()
-    elif file_path.endswith('.docx'):
-        loader = Docx2txtLoader(file_path)
-        documents = loader.load()
-    elif file_path.endswith('.xlsx'):
-        loader = UnstructuredExcelLoader(file_path)
-        documents = loader.load()
+def process_document(source, filename=None):
+    """Extract text and metadata from uploaded documents (PDF, DOCX or XLSX)
+
+    ``source`` may be a file path, raw bytes or a binary buffer; in-memory
+    sources are parsed directly without being written to disk. ``filename`` is
+    used to pick the parser when ``source`` is not a path. Returns every chunk
+    as a list; use ``iter_document_chunks`` to stream them instead.
+    """
+    return list(iter_document_chunks(source, filename))
+
+STRUCTURE_SCHEMA = """{
+  "metadata": {"title": "...", "issuer": "...", "issue_date": "...", "due_date": "...",
+               "contact_info": {"name": "...", "email": "...", "phone": "..."},
+               "submission_requirements": ["..."]},
+  "sections": [{"id": "1", "title": "...", "parent_id": null, "content": "...", "level": 1}],
+  "questions": [{"id": "Q1", "text": "...", "section": "1", "type": "...", "response_format": "...",
+                 "word_limit": null, "related_requirements": ["R1"]}],
+  "requirements": [{"id": "R1", "text": "...", "section": "1", "category": "...", "mandatory": true,
+                    "related_questions": ["Q1"]}]
+}"""
+
+CHUNK_PROMPT = (
+    "You are an expert at analyzing RFP documents. The text below is part {index} "
+    "of a larger RFP. Extract only the sections, questions and requirements that appear in this "
+    "part and respond ONLY with JSON in this format:\n{schema}\n"
+    "Use the document's own outline numbers (e.g. \"3.2\") as section ids where present. "
+    "Use null for metadata that is not in this part.\n\nRFP Text:\n{text}"
+)
+
+# Bump whenever prompts, chunking or merging change so cached structures
+# (see methods/structure_cache.py) from older extractors are not reused.
+EXTRACTOR_VERSION = "7"
+
+# Try the rule-based extractor first; the LLM is only used for fragments it
+# cannot place (or for the whole document when no outline is found).
+HEURISTIC_FAST_PATH = os.getenv("RFP_HEURISTIC_FAST_PATH", "1") not in ("0", "false", "False")
+
+# Map-reduce extraction settings. "auto" switches to map-reduce once the document
+# is too large to comfortably fit a single prompt.
+EXTRACT_MODE = os.getenv("RFP_EXTRACT_MODE", "auto")  # single | map_reduce | auto
+MAP_REDUCE_MIN_CHARS = int(os.getenv("RFP_MAP_REDUCE_MIN_CHARS", "30000"))
+MAP_CHUNK_CHARS = int(os.getenv("RFP_MAP_CHUNK_CHARS", "12000"))
+EXTRACT_CONCURRENCY = int(os.getenv("RFP_EXTRACT_CONCURRENCY", "8"))
+
+
+def _parse_json_response(response):
+    """Pull the JSON object out of a Gemini response (fenced or bare)."""
+    import re
+    # Safely get the content from the response
+    if hasattr(response, "candidates"):
+        content = response.candidates[0].content.parts[0].text
+    elif hasattr(response, "content"):
+        content = response.content
     else:
-        raise ValueError("Unsupported file format. Only PDF, DOCX and XLSX are supported.")
+        content = str(response)
+
+    # Try to extract a JSON block fenced as ```json { ... } ```
+    if match := re.search(r"```json\s*(\{.*\})\s*```", content, re.DOTALL):
+        json_str = match.group(1)
+    else:
+        # Fallback: extract from first '{' to last '}'
+        json_start = content.find('{')
+        json_end = content.rfind('}') + 1
+        if json_start == -1 or json_end == 0:
+            raise ValueError("No JSON object found in LLM response.")
+        json_str = content[json_start:json_end]
+
+    return json.loads(json_str)
+
+
+def _group_chunks(chunks, max_chars=MAP_CHUNK_CHARS):
+    """Pack consecutive splitter chunks into map batches of at most ``max_chars`` (lazily)."""
+    current, size = [], 0
+    for chunk in chunks:
+        text = chunk.page_content
+        if current and size + len(text) > max_chars:
+            yield "\n".join(current)
+            current, size = [], 0
+        current.append(text)
+        size += len(text)
+    if current:
+        yield "\n".join(current)
+
+
+def _fallback_sections(texts):
+    return [
+        {
+            "id": str(i + 1),
+            "title": f"Section {i + 1}",
+            "parent_id": None,
+            "content": text,
+            "level": 1,
+        }
+        for i, text in enumerate(texts)
+    ]
+
+
+def extract_rfp_structure_map_reduce(chunks, model_name, title=None, base=None):
+    """Extract the RFP structure chunk-by-chunk in parallel and merge the results.
 
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200
-    )
-    return text_splitter.split_documents(documents)
+    ``chunks`` is consumed lazily: at most twice RFP_EXTRACT_CONCURRENCY batches
+    are read ahead of the calls in flight, so the batch prompts for a long
+    document are never all built at once. A batch whose call fails is kept as
+    a plain section so no text is lost.
 
-def extract_rfp_structure(file_path):
+    ``base`` (the rule-based structure) is merged together with the per-batch
+    results, so the outline numbers the model returns as section ids are
+    still there when its sections are matched against the outline.
+    """
+    llm = get_gemini_model(model_name)
+    if llm is None:
+        raise RuntimeError(f"Gemini model '{model_name}' is not available")
+
+    def extract_batch(index, text):
+        prompt = CHUNK_PROMPT.format(index=index + 1, schema=STRUCTURE_SCHEMA, text=text)
+        try:
+            return _parse_json_response(generate_content(llm, prompt, label="extract_map"))
+        except Exception as e:
+            print(f"map-reduce: batch {index + 1} failed: {e}")
+            section = _fallback_sections([text])[0]
+            section["title"] = f"Part {index + 1}"
+            return {"sections": [section], "_failed": True}
+
+    concurrency = max(1, EXTRACT_CONCURRENCY)
+    partials, in_flight = [], deque()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for index, text in enumerate(_group_chunks(chunks)):
+            if len(in_flight) >= 2 * concurrency:
+                partials.append(in_flight.popleft().result())
+            in_flight.append(pool.submit(with_current_context(extract_batch), index, text))
+        partials.extend(future.result() for future in in_flight)
+    if not partials:
+        return base
+    print(f"map-reduce extraction: {len(partials)} batches, concurrency={concurrency}")
+    merged = merge_partial_structures(([base] if base else []) + partials, title)
+    if any(p.get("_failed") for p in partials):
+        merged["_degraded"] = True
+    return merged
+
+
+def _read_small_document(chunks):
+    """Read chunks while the text stays under MAP_REDUCE_MIN_CHARS.
+
+    Returns ``(read, exhausted)``; ``exhausted`` is False once the threshold
+    is reached and the rest of ``chunks`` has not been read.
+    """
+    read, size = [], 0
+    for chunk in chunks:
+        read.append(chunk)
+        size += len(chunk.page_content)
+        if size >= MAP_REDUCE_MIN_CHARS:
+            return read, False
+    return read, True
+
+
+def extract_rfp_structure(source, filename=None):
     """Extract RFP structure and generate structured JSON data
 
-    This function attempts to use a configured Gemini model (GEMINI_MODEL env var).
+    ``source``/``filename`` are passed through to ``process_document``.
+
+    Well-formatted RFPs are handled by the rule-based extractor alone; otherwise
+    this function attempts to use a configured Gemini model (GEMINI_MODEL env var).
+    Large documents (see RFP_EXTRACT_MODE) are extracted with map-reduce.
     If the model is not configured or the call fails it falls back to a simple
     deterministic extractor which returns the document chunks as sections so the
-    upload endpoint can continue to work.
+    upload endpoint can continue to work. Results produced because an LLM call
+    failed carry ``"_degraded": True`` so callers do not cache them.
     """
     print("hello2")
-    chunks = process_document(file_path)
-    combined_text = " ".join([chunk.page_content for chunk in chunks])
+    # The document is parsed once into page Documents (one copy of its text);
+    # the rule-based pass and every LLM path reuse them, and chunks (with their
+    # page offsets) are split from those pages lazily when an LLM path runs.
+    # Besides the pages, what stays in memory is the extracted structure and the
+    # whole text when it goes out as a single prompt, which only happens below
+    # MAP_REDUCE_MIN_CHARS unless RFP_EXTRACT_MODE=single.
+    splitter = default_splitter()
+    pages = list(iter_document_pages(source, filename))
+
+    def page_chunks():
+        for page in pages:
+            yield from splitter.split_documents([page])
+
+    title = os.path.basename(filename or str(source))
 
     # Attempt to use a configured Gemini model (set GEMINI_MODEL in env).
     MODEL_NAME = os.getenv("GEMINI_MODEL", "")
     response = None
 
+    heuristic, ambiguous = None, None
+    if HEURISTIC_FAST_PATH:
+        heuristic, ambiguous = extract_structure_heuristically((page.page_content for page in pages), title)
+        if not ambiguous:
+            print(f"heuristic extraction: {len(heuristic['sections'])} sections, LLM skipped")
+            return heuristic
+        if MODEL_NAME and heuristic["sections"]:
+            # Outline found: only send the fragments the rules could not place
+            try:
+                return extract_rfp_structure_map_reduce(
+                    splitter.create_documents(ambiguous), MODEL_NAME, title, base=heuristic
+                )
+            except Exception as e:
+                print(f"Fragment extraction failed: {e}")
+                traceback.print_exc()
+
+    if heuristic is not None and not heuristic["sections"]:
+        ambiguous = None  # the whole text again; the pages are chunked below instead
+
+    chunks, combined_text = None, None
     if MODEL_NAME:
+        chunks = page_chunks()
+        if EXTRACT_MODE == "single":
+            read, exhausted = list(chunks), True
+        elif EXTRACT_MODE == "map_reduce":
+            read, exhausted = [], False
+        else:
+            read, exhausted = _read_small_document(chunks)
+        if exhausted:
+            combined_text = " ".join(chunk.page_content for chunk in read)
+        else:
+            chunks = chain(read, chunks)
+    if MODEL_NAME and combined_text is None:
+        try:
+            return extract_rfp_structure_map_reduce(chunks, MODEL_NAME, title)
+        except Exception as e:
+            print(f"Map-reduce extraction failed: {e}")
+            traceback.print_exc()
+    elif MODEL_NAME:
         try:
-            llm = genai.GenerativeModel(MODEL_NAME)
+            llm = get_gemini_model(MODEL_NAME)
             print("calling LLM", MODEL_NAME)
-            response = llm.generate_content(combined_text)
+            response = generate_content(llm, combined_text, label="extract_single") if llm is not None else None
             print("hello by llm")
         except Exception as e:
             print(f"LLM call failed: {e}")
@@ -60,49 +253,32 @@ def extract_rfp_structure(file_path):
     # If we got a response from LLM, try to parse JSON out of it.
     if response is not None:
         try:
-            import re
-            # Safely get the content from the response
-            if hasattr(response, "candidates"):
-                content = response.candidates[0].content.parts[0].text
-            elif hasattr(response, "content"):
-                content = response.content
-            else:
-                content = str(response)
-
-            # Try to extract a JSON block fenced as ```json { ... } ```
-            if match := re.search(r"```json\s*(\{.*\})\s*```", content, re.DOTALL):
-                json_str = match.group(1)
-            else:
-                # Fallback: extract from first '{' to last '}'
-                json_start = content.find('{')
-                json_end = content.rfind('}') + 1
-                if json_start == -1 or json_end == 0:
-                    raise ValueError("No JSON object found in LLM response.")
-                json_str = content[json_start:json_end]
-
-            return json.loads(json_str)
+            return _parse_json_response(response)
         except Exception as e:
             print(f"Error extracting JSON: {e}")
             print(f"Response content: {getattr(response, 'content', str(response))}")
             traceback.print_exc()
             # Fall through to deterministic fallback
 
-    # Fallback deterministic extractor: convert chunks into simple sections
+    # Fallback deterministic extractor: use the rule-based outline when there
+    # is one, otherwise convert chunks into simple sections
     try:
-        sections = []
-        sections.extend(
-            {
-                "id": str(i + 1),
-                "title": f"Section {i + 1}",
-                "parent_id": None,
-                "content": chunk.page_content,
-                "level": 1,
-            }
-            for i, chunk in enumerate(chunks)
+        if heuristic is not None and heuristic["sections"]:
+            # Ambiguous section bodies are already in the outline; only the preamble is added
+            placed = {section["content"] for section in heuristic["sections"]}
+            extra = _fallback_sections([f for f in ambiguous if f.split("\n", 1)[-1] not in placed])
+            for section in extra:
+                section["title"] = f"Preamble {section['id']}"
+            result = merge_partial_structures([{"sections": extra}, heuristic], title)
+            result["metadata"] = heuristic["metadata"]
+            result["_degraded"] = bool(MODEL_NAME)
+            return result
+        sections = _fallback_sections(
+            [chunk.page_content for chunk in page_chunks()]
         )
         return {
-            "metadata": {
-                "title": os.path.basename(file_path),
+            "metadata": heuristic["metadata"] if heuristic else {
+                "title": title,
                 "issuer": None,
                 "issue_date": None,
                 "due_date": None,
@@ -110,8 +286,9 @@ def extract_rfp_structure(file_path):
                 "submission_requirements": [],
             },
             "sections": sections,
-            "questions": [],
-            "requirements": [],
+            "questions": heuristic["questions"] if heuristic else [],
+            "requirements": heuristic["requirements"] if heuristic else [],
+            "_degraded": bool(MODEL_NAME),
         }
     except Exception as e:
         print(f"Fallback extraction failed: {e}")
@@ -0,0 +1,260 @@
+import re
+
+# Rule-based RFP structure extractor.
+#
+# Well-formatted RFPs have numbered headings ("3.2 Technical Approach"),
+# requirement sentences ("The vendor shall ...") and explicit questions
+# ("Q4. Describe your ..."). These are picked out with regular expressions in
+# milliseconds. Text the rules cannot place (no headings at all, a long run of
+# text before the first heading, or a section body in which no question or
+# requirement was found) is returned as "ambiguous" so only those fragments
+# need to go to the LLM.
+
+# Only the "Section/Article/Part" prefix is case-insensitive: the heading text
+# must start with a capital letter ("3 months of support" is not a heading)
+HEADING_NUMBERED = re.compile(
+    r"^\s*(?:(?i:section|article|part)\s+)?(\d{1,2}(?:\.\d{1,2}){0,4})[.)]?\s+([A-Z][^\n]{1,100})$"
+)
+HEADING_CAPS = re.compile(r"^\s*([A-Z][A-Z0-9&,/()\- ]{3,80})\s*$")
+QUESTION_NUMBERED = re.compile(r"^\s*(?:Q(?:uestion)?\s*\.?\s*(\d+(?:\.\d+)*)[.):]?|\(?([a-z]|\d+)[.)])\s+(.+)$", re.IGNORECASE)
+QUESTION_PROMPT = re.compile(r"^\s*(?:please\s+)?(describe|explain|provide|outline|detail|list|identify|specify|demonstrate)\b", re.IGNORECASE)
+REQUIREMENT = re.compile(r"\b(shall|must|is required to|are required to|required|mandatory)\b", re.IGNORECASE)
+WORD_LIMIT = re.compile(r"(?:not\s+(?:to\s+)?exceed|maximum(?:\s+of)?|max\.?|up\s+to|limit(?:ed)?\s+to)?\s*(\d{2,5})\s+words?\b", re.IGNORECASE)
+SENTENCE_SPLIT = re.compile(r"(?<=[.?!])\s+(?=[A-Z(])")
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE = re.compile(r"(?:\+?\d[\d ().-]{7,}\d)")
+DATE = r"([A-Z][a-z]+ \d{1,2},? \d{4}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|\d{4}-\d{2}-\d{2}|\d{1,2} [A-Z][a-z]+ \d{4})"
+DUE_DATE = re.compile(r"(?:due|deadline|closing|submission)[^\n]{0,40}?" + DATE, re.IGNORECASE)
+ISSUE_DATE = re.compile(r"(?:issue[d]?|release[d]?|publication)\s+date[^\n]{0,20}?" + DATE, re.IGNORECASE)
+ISSUER = re.compile(r"(?:issued by|issuing (?:agency|organization)|prepared by)\s*:?\s*([^\n]{3,100})", re.IGNORECASE)
+
+MIN_HEADINGS = 2
+MAX_PREAMBLE_CHARS = 3000
+MAX_CAPS_WORDS = 10
+
+
+def _heading(line):
+    """Return (number, title) for heading lines, else None."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 110:
+        return None
+    if match := HEADING_NUMBERED.match(stripped):
+        title = match.group(2).strip()
+        # "1. The vendor shall provide ..." is a list item, not a heading
+        if title.endswith((".", ";", ",", "?")) and len(title.split()) > 6:
+            return None
+        if REQUIREMENT.search(title) and len(title.split()) > 6:
+            return None
+        return match.group(1), f"{match.group(1)} {title}"
+    if (match := HEADING_CAPS.match(stripped)) and len(stripped.split()) <= MAX_CAPS_WORDS and len(stripped.split()) >= 2:
+        return None, match.group(1).strip()
+    return None
+
+
+def is_heading(line):
+    """True for lines the extractor treats as section headings."""
+    return _heading(line) is not None
+
+
+def _sentences(text):
+    text = re.sub(r"\s+", " ", text).strip()
+    return [s.strip() for s in SENTENCE_SPLIT.split(text) if s.strip()]
+
+
+def _word_limit(text):
+    if match := WORD_LIMIT.search(text):
+        return int(match.group(1))
+    return None
+
+
+class _MetadataScanner:
+    """Collects document metadata page by page (first match wins)."""
+
+    def __init__(self, title):
+        self.head = ""
+        self.metadata = {
+            "title": title,
+            "issuer": None,
+            "issue_date": None,
+            "due_date": None,
+            "contact_info": {"name": None, "email": None, "phone": None},
+            "submission_requirements": [],
+        }
+
+    def feed(self, page):
+        if len(self.head) < 5000:
+            self.head = (self.head + "\n" + page)[:5000] if self.head else page[:5000]
+        metadata, contact = self.metadata, self.metadata["contact_info"]
+        if not metadata["issue_date"] and (match := ISSUE_DATE.search(page)):
+            metadata["issue_date"] = match.group(1)
+        if not metadata["due_date"] and (match := DUE_DATE.search(page)):
+            metadata["due_date"] = match.group(1)
+        if not contact["email"] and (match := EMAIL.search(page)):
+            contact["email"] = match.group(0)
+        if not contact["phone"] and (match := PHONE.search(page)):
+            contact["phone"] = match.group(0).strip()
+
+    def finish(self):
+        first_line = next((line.strip() for line in self.head.splitlines() if len(line.strip()) > 8), None)
+        if first_line and len(first_line) <= 150:
+            self.metadata["title"] = first_line
+        if match := ISSUER.search(self.head):
+            self.metadata["issuer"] = match.group(1).strip()
+        return self.metadata
+
+
+def _iter_lines(pages, scanner):
+    for page in pages:
+        scanner.feed(page)
+        yield from page.splitlines()
+
+
+def _split_sections(lines):
+    """Group lines under detected headings. Returns (preamble_lines, sections)."""
+    preamble, sections, current = [], [], None
+    number_to_id = {}
+    for line in lines:
+        heading = _heading(line)
+        if heading:
+            number, title = heading
+            section_id = str(len(sections) + 1)
+            parent_id = None
+            level = 1
+            if number and "." in number:
+                parent_id = number_to_id.get(number.rsplit(".", 1)[0])
+                level = number.count(".") + 1 if parent_id else 1
+            if number:
+                number_to_id.setdefault(number, section_id)
+            current = {"id": section_id, "title": title, "parent_id": parent_id, "level": level, "_heading": line, "_lines": []}
+            sections.append(current)
+        elif current is None:
+            preamble.append(line)
+        else:
+            current["_lines"].append(line)
+
+    # Parent levels come from the parent chain, not only from the numbering depth
+    by_id = {s["id"]: s for s in sections}
+    for section in sections:
+        if section["parent_id"]:
+            section["level"] = by_id[section["parent_id"]]["level"] + 1
+    return preamble, sections
+
+
+def _extract_items(section_id, lines, questions, requirements):
+    """Find numbered questions, question sentences and requirement sentences."""
+    body = []
+    for line in lines:
+        match = QUESTION_NUMBERED.match(line)
+        candidate = match.group(3).strip() if match else None
+        if candidate and (candidate.endswith("?") or QUESTION_PROMPT.match(candidate)):
+            questions.append(_question(candidate, section_id))
+        else:
+            body.append(line)
+
+    for sentence in _sentences("\n".join(body)):
+        if sentence.endswith("?") and len(sentence) > 15:
+            questions.append(_question(sentence, section_id))
+        elif QUESTION_PROMPT.match(sentence) and len(sentence) > 25:
+            questions.append(_question(sentence, section_id))
+        elif REQUIREMENT.search(sentence) and len(sentence) > 20:
+            requirements.append({
+                "id": f"R{len(requirements) + 1}",
+                "text": sentence,
+                "section": section_id,
+                "category": None,
+                "mandatory": True,
+                "related_questions": [],
+            })
+
+
+def _question(text, section_id):
+    return {
+        "id": None,
+        "text": text,
+        "section": section_id,
+        "type": "descriptive",
+        "response_format": "narrative",
+        "word_limit": _word_limit(text),
+        "related_requirements": [],
+    }
+
+
+def extract_structure_heuristically(text, title=None):
+    """Rule-based extraction.
+
+    ``text`` is the document text, or an iterable of page texts consumed one
+    page at a time. Returns ``(structure, ambiguous_fragments)`` where
+    ``structure`` has the usual metadata/sections/questions/requirements keys
+    and ``ambiguous_fragments`` is a list of text blocks the rules could not
+    place (empty when the document was fully understood).
+    """
+    scanner = _MetadataScanner(title)
+    preamble, sections = _split_sections(_iter_lines([text] if isinstance(text, str) else text, scanner))
+    questions, requirements = [], []
+    ambiguous = []
+
+    if len(sections) < MIN_HEADINGS:
+        # No usable outline: the whole document is ambiguous, but explicit
+        # questions and requirement sentences are still worth keeping.
+        lines = preamble + [line for section in sections for line in [section["_heading"], *section["_lines"]]]
+        _extract_items(None, lines, questions, requirements)
+        sections = []
+        whole = "\n".join(lines)
+        ambiguous = [whole] if whole.strip() else []
+    else:
+        preamble_text = "\n".join(preamble).strip()
+        if len(preamble_text) > MAX_PREAMBLE_CHARS:
+            ambiguous.append(preamble_text)
+
+        for section in sections:
+            heading = section.pop("_heading").strip()
+            section_lines = section.pop("_lines")
+            section["content"] = "\n".join(section_lines).strip()
+            found = len(questions) + len(requirements)
+            _extract_items(section["id"], section_lines, questions, requirements)
+            # A body with no question or requirement may be a misdetected heading
+            # or prose the rules cannot read; the LLM gets it with its heading
+            if section["content"] and len(questions) + len(requirements) == found:
+                ambiguous.append(f"{heading}\n{section['content']}")
+
+    return _finish(scanner.finish(), sections, questions, requirements), ambiguous
+
+
+def _unique(items, prefix):
+    """First occurrence of each text (case and spacing ignored), renumbered."""
+    seen, unique = set(), []
+    for item in items:
+        key = " ".join(item["text"].lower().split())
+        if key in seen:
+            continue
+        seen.add(key)
+        item["id"] = f"{prefix}{len(unique) + 1}"
+        unique.append(item)
+    return unique
+
+
+def _finish(metadata, sections, questions, requirements):
+    """De-duplicate and number questions and requirements, link items and attach metadata."""
+    unique_questions = _unique(questions, "Q")
+    # Repeated "shall" lines would otherwise become duplicate compliance items
+    requirements = _unique(requirements, "R")
+    for question in unique_questions:
+        question["related_requirements"] = [
+            r["id"] for r in requirements if question["section"] and r["section"] == question["section"]
+        ]
+    for requirement in requirements:
+        requirement["related_questions"] = [
+            q["id"] for q in unique_questions if requirement["section"] and q["section"] == requirement["section"]
+        ]
+
+    submission_sections = {s["id"] for s in sections if "submission" in s["title"].lower()}
+    metadata["submission_requirements"] = [
+        r["text"] for r in requirements if r["section"] in submission_sections
+    ]
+    return {
+        "metadata": metadata,
+        "sections": sections,
+        "questions": unique_questions,
+        "requirements": requirements,
+    }
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import numpy as np
+from langchain_community.vectorstores.utils import maximal_marginal_relevance
+from langchain_core.retrievers import BaseRetriever
+
+from methods.telemetry import record_call
+from methods.token_budget import estimate_tokens, truncate_to_budget
+
+# Multi-chunk retrieval: candidates -> MMR -> cross-encoder rerank -> budget.
+#
+# A plain top-k search over small chunks tends to return near-duplicates of
+# the same paragraph. RETRIEVAL_CANDIDATES nearest chunks are fetched, MMR
+# keeps RETRIEVAL_MMR_K of them that are relevant but not redundant, and a small
+# CPU cross-encoder (RERANK_MODEL) scores each (query, chunk) pair to pick the
+# final order. The best chunks are returned until RETRIEVAL_CONTEXT_TOKENS is
+# used up.
+#
+# Reranking is bounded: at most RETRIEVAL_MMR_K pairs of RERANK_MAX_LENGTH
+# tokens scored on RERANK_WORKERS threads. Waiting for a free thread and
+# scoring are each limited to RERANK_TIMEOUT seconds, so agents retrieving at
+# the same time do not time each other out; past either limit (or if the model
+# cannot be loaded) the MMR order is used instead and the fallback is counted
+# by reason (rerank_stats(), shown on the health endpoint). Every rerank is timed and
+# recorded in the telemetry table (kind "rerank"); the number of scored pairs
+# goes in the units column, the token columns stay empty.
+
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_MMR_K = int(os.getenv("RETRIEVAL_MMR_K", "8"))
+RETRIEVAL_MMR_LAMBDA = float(os.getenv("RETRIEVAL_MMR_LAMBDA", "0.6"))
+RETRIEVAL_CONTEXT_TOKENS = int(os.getenv("RETRIEVAL_CONTEXT_TOKENS", "1500"))
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "1") == "1"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "256"))
+RERANK_TIMEOUT = float(os.getenv("RERANK_TIMEOUT", "1.5"))
+RERANK_WORKERS = int(os.getenv("RERANK_WORKERS", "2"))
+
+_cross_encoder = None
+_cross_encoder_lock = threading.Lock()
+# Few scorer threads: the model is CPU bound, many parallel predict calls only contend
+_rerank_pool = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+_rerank_counts = {"reranked": 0, "unavailable": 0, "queued": 0, "timeout": 0, "error": 0}
+_rerank_counts_lock = threading.Lock()
+
+
+def _load_cross_encoder():
+    global _cross_encoder
+    with _cross_encoder_lock:
+        if _cross_encoder is None:
+            try:
+                from sentence_transformers import CrossEncoder
+
+                _cross_encoder = CrossEncoder(RERANK_MODEL, max_length=RERANK_MAX_LENGTH, device="cpu")
+            except Exception as e:
+                print(f"cross-encoder {RERANK_MODEL} unavailable ({e}), using MMR order")
+                _cross_encoder = False
+    return _cross_encoder
+
+
+def mmr_candidates(store, company_id, query, k=None, fetch_k=None):
+    """``k`` diverse chunks out of the ``fetch_k`` nearest ones for one company."""
+    k, fetch_k = k or RETRIEVAL_MMR_K, fetch_k or RETRIEVAL_CANDIDATES
+    if not hasattr(store, "search_with_embeddings"):
+        # LangChain PGVector implements MMR itself
+        return store.max_marginal_relevance_search(
+            query, k=k, fetch_k=fetch_k, lambda_mult=RETRIEVAL_MMR_LAMBDA, filter={"company_id": company_id}
+        )
+    query_embedding, docs, embeddings = store.search_with_embeddings(company_id, query, fetch_k)
+    if len(docs) <= k:
+        return docs
+    selected = maximal_marginal_relevance(
+        np.array(query_embedding, dtype=np.float32), embeddings, lambda_mult=RETRIEVAL_MMR_LAMBDA, k=k
+    )
+    return [docs[i] for i in selected]
+
+
+def _count(outcome):
+    with _rerank_counts_lock:
+        _rerank_counts[outcome] += 1
+
+
+def rerank_stats() -> dict:
+    """Reranks done and MMR-order fallbacks by reason, since process start."""
+    with _rerank_counts_lock:
+        return {"model": RERANK_MODEL, "workers": RERANK_WORKERS, **_rerank_counts}
+
+
+def _fallback(docs, reason, started, message):
+    _count(reason)
+    print(f"{message}, using MMR order")
+    record_call("rerank", "local", RERANK_MODEL, time.perf_counter() - started, success=False, error=reason,
+                units=len(docs))
+    return docs
+
+
+def rerank(query, docs):
+    """Docs sorted by cross-encoder score; input order if the model is slow or missing."""
+    if not RERANK_ENABLED or len(docs) < 2:
+        return docs
+    model = _load_cross_encoder()
+    if not model:
+        _count("unavailable")
+        return docs
+    started = time.perf_counter()
+    running = threading.Event()
+
+    def predict(pairs):
+        running.set()
+        return model.predict(pairs)
+
+    future = _rerank_pool.submit(predict, [(query, doc.page_content) for doc in docs])
+    if not running.wait(RERANK_TIMEOUT) and future.cancel():
+        return _fallback(docs, "queued", started, f"no rerank thread free within {RERANK_TIMEOUT}s")
+    try:
+        # Timed from when scoring starts, not from submit
+        scores = future.result(timeout=RERANK_TIMEOUT)
+    except FutureTimeout:
+        # The running predict cannot be interrupted; its result is ignored
+        return _fallback(docs, "timeout", started, f"rerank exceeded {RERANK_TIMEOUT}s for {len(docs)} chunks")
+    except Exception as e:
+        return _fallback(docs, "error", started, f"rerank failed ({e})")
+    _count("reranked")
+    record_call("rerank", "local", RERANK_MODEL, time.perf_counter() - started, units=len(docs))
+    order = sorted(range(len(docs)), key=lambda i: float(scores[i]), reverse=True)
+    for i in order:
+        docs[i].metadata["rerank_score"] = round(float(scores[i]), 4)
+    return [docs[i] for i in order]
+
+
+def within_budget(docs, top_n, max_tokens=None):
+    """The first ``top_n`` docs that fit in ``max_tokens`` (the first one is truncated if it alone does not)."""
+    max_tokens = max_tokens or RETRIEVAL_CONTEXT_TOKENS
+    kept, used = [], 0
+    for doc in docs[:top_n]:
+        tokens = estimate_tokens(doc.page_content)
+        if used + tokens > max_tokens:
+            if not kept:
+                doc.page_content = truncate_to_budget(doc.page_content, max_tokens)
+                kept.append(doc)
+            break
+        kept.append(doc)
+        used += tokens
+    return kept
+
+
+def retrieve_context(store, company_id, query, top_n=4, max_tokens=None):
+    """Candidates -> MMR -> rerank -> best ``top_n`` chunks within the token budget."""
+    return within_budget(rerank(query, mmr_candidates(store, company_id, query)), top_n, max_tokens)
+
+
+class RerankingRetriever(BaseRetriever):
+    """LangChain retriever running retrieve_context() for one company."""
+
+    store: object
+    company_id: int
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return retrieve_context(self.store, self.company_id, query, self.k)
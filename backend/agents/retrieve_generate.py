@@ -0,0 +1,49 @@
+import os
+
+from agents.tools.company_doc_tool import get_company_retriever
+from methods.token_budget import select_within_budget
+
+# Deterministic retrieve-then-generate answering.
+#
+# The ReAct agent spends 3-6 LLM round-trips per item (thought, tool choice,
+# observation, final answer) to pick between company documents and the model's
+# general knowledge. This pipeline always retrieves once and makes a single
+# grounded generation call; the prompt itself tells the model what to do when
+# the retrieved context does not cover the question.
+
+RETRIEVAL_K = int(os.getenv("RFP_RETRIEVAL_K", "4"))
+CONTEXT_TOKENS = int(os.getenv("RFP_CONTEXT_TOKENS", "2000"))
+
+GROUNDED_PROMPT = (
+    "You are writing a response to an RFP on behalf of our company.\n"
+    "Use the company documentation below as the primary source. If it does not "
+    "cover the request, answer from general knowledge and say the point should be "
+    "confirmed by the company. Do not invent certifications, clients or figures.\n\n"
+    "Company documentation:\n{context}\n\n"
+    "Request:\n{query}\n\n"
+    "Answer:"
+)
+
+
+def _format_context(docs):
+    # Retriever order is relevance order: keep the best excerpts that fit the budget
+    excerpts = [f"[{i}] {doc.page_content.strip()}" for i, doc in enumerate(docs, start=1) if doc.page_content.strip()]
+    return "\n\n".join(select_within_budget(excerpts, CONTEXT_TOKENS)) or "No relevant company documentation found."
+
+
+class RetrieveThenGenerate:
+    """One retrieval plus one LLM call per query.
+
+    Exposes ``run(query, callbacks=None)`` like AgentExecutor so the two can be
+    swapped in generate_rfp_response.
+    """
+
+    def __init__(self, company_id, llm, k=None):
+        self.llm = llm
+        self.retriever = get_company_retriever(company_id, k or RETRIEVAL_K)
+
+    def run(self, query, callbacks=None):
+        docs = self.retriever.invoke(query)
+        prompt = GROUNDED_PROMPT.format(context=_format_context(docs), query=query)
+        response = self.llm.invoke(prompt, config={"callbacks": callbacks} if callbacks else None)
+        return getattr(response, "content", str(response))
@@ -0,0 +1,235 @@
+import re
+
+# Merge step for map-reduce RFP extraction.
+#
+# Each chunk of the RFP is extracted independently, so the partial results use
+# overlapping, chunk-local ids and may repeat the same heading, question or
+# requirement when it straddles a chunk boundary. merge_partial_structures()
+# folds them into a single structure with unique ids and a consistent
+# parent_id/level hierarchy.
+
+_NUMBERING = re.compile(r"^\s*(?:section\s+)?(\d+(?:\.\d+)*)\b", re.IGNORECASE)
+
+METADATA_DEFAULTS = {
+    "title": None,
+    "issuer": None,
+    "issue_date": None,
+    "due_date": None,
+    "contact_info": {"name": None, "email": None, "phone": None},
+    "submission_requirements": [],
+}
+
+
+def _normalize(text):
+    return re.sub(r"[^a-z0-9]+", " ", str(text or "").lower()).strip()
+
+
+def _numbering(*candidates):
+    """Return the outline number ("3.2.1") found at the start of any candidate."""
+    for candidate in candidates:
+        if candidate is None:
+            continue
+        if match := _NUMBERING.match(str(candidate)):
+            return match.group(1)
+    return None
+
+
+def _heading_text(title):
+    """Normalized heading without its outline number ("2. Background" -> "background")."""
+    return _normalize(_NUMBERING.sub("", str(title or ""), count=1))
+
+
+def _merge_metadata(partials, title):
+    metadata = {key: (value.copy() if isinstance(value, (dict, list)) else value)
+                for key, value in METADATA_DEFAULTS.items()}
+    for partial in partials:
+        for key, value in (partial.get("metadata") or {}).items():
+            if value in (None, "", [], {}):
+                continue
+            if key == "submission_requirements" and isinstance(value, list):
+                for item in value:
+                    if item not in metadata[key]:
+                        metadata[key].append(item)
+            elif key == "contact_info" and isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    if sub_value and not metadata[key].get(sub_key):
+                        metadata[key][sub_key] = sub_value
+            elif metadata.get(key) in (None, "", [], {}):
+                metadata[key] = value
+    if not metadata.get("title"):
+        metadata["title"] = title
+    return metadata
+
+
+def _merge_sections(partials):
+    sections = []
+    by_key = {}
+    last_of_part = {}    # part index -> merged section its last heading went to
+    id_map = {}          # (part index, local id) -> merged id
+    number_map = {}      # outline number -> merged id
+    pending_parents = {}  # merged id -> (part index, local parent id)
+
+    for part_index, partial in enumerate(partials):
+        for position, section in enumerate(partial.get("sections") or []):
+            local_id = str(section.get("id", ""))
+            title = section.get("title") or ""
+            content = section.get("content") or ""
+            number = _numbering(local_id, title)
+            # The outline number may sit in the heading ("2 Background", rule-based
+            # extractor) or in the id ({"id": "2", "title": "Background"}, LLM)
+            key = (_numbering(title, local_id), _heading_text(title) or _normalize(content[:80]))
+            merged = by_key.get(key)
+            if merged is None and position == 0 and _numbering(title) is None:
+                # A heading cut by a chunk boundary comes back with a new chunk-local id
+                previous = last_of_part.get(part_index - 1)
+                if previous is not None and _heading_text(previous["title"]) == key[1]:
+                    merged = previous
+
+            if merged is not None:
+                # Same heading seen again (chunk overlap / continuation): keep new text only.
+                if content and content not in merged["content"]:
+                    merged["content"] = f"{merged['content']}\n{content}".strip()
+            else:
+                merged = {
+                    "id": str(len(sections) + 1),
+                    "title": title,
+                    "parent_id": None,
+                    "content": content,
+                    "level": 1,
+                }
+                sections.append(merged)
+                by_key[key] = merged
+                if section.get("parent_id") not in (None, ""):
+                    pending_parents[merged["id"]] = (part_index, str(section["parent_id"]))
+            id_map[(part_index, local_id)] = merged["id"]
+            last_of_part[part_index] = merged
+            if number and number not in number_map:
+                number_map[number] = merged["id"]
+            if number and not merged.get("_number"):
+                merged["_number"] = number
+
+    by_id = {section["id"]: section for section in sections}
+    for section in sections:
+        number = section.pop("_number", None)
+        parent_id = None
+        if section["id"] in pending_parents:
+            part_index, local_parent = pending_parents[section["id"]]
+            parent_id = id_map.get((part_index, local_parent)) or number_map.get(local_parent)
+        if parent_id is None and number and "." in number:
+            parent_id = number_map.get(number.rsplit(".", 1)[0])
+        if parent_id == section["id"] or parent_id not in by_id:
+            parent_id = None
+        section["parent_id"] = parent_id
+
+    # Rebuild levels from the parent chain, guarding against cycles.
+    for section in sections:
+        level, seen, current = 1, {section["id"]}, section
+        while current["parent_id"] is not None and current["parent_id"] not in seen:
+            seen.add(current["parent_id"])
+            current = by_id[current["parent_id"]]
+            level += 1
+        if current["parent_id"] is not None:
+            section["parent_id"] = None
+            level = 1
+        section["level"] = level
+
+    return sections, id_map, number_map
+
+
+def _merge_items(partials, key, prefix, text_field, section_ids, number_map):
+    items = []
+    by_text = {}
+    id_map = {}
+    for part_index, partial in enumerate(partials):
+        for item in partial.get(key) or []:
+            text = item.get(text_field) or item.get("content") or item.get("title") or ""
+            norm = _normalize(text)
+            if not norm:
+                continue
+            local_id = str(item.get("id", ""))
+            if norm in by_text:
+                merged = by_text[norm]
+            else:
+                merged = dict(item)
+                merged["id"] = f"{prefix}{len(items) + 1}"
+                merged[text_field] = text
+                section = item.get("section")
+                merged["section"] = (
+                    section_ids.get((part_index, str(section)))
+                    or number_map.get(str(section))
+                    or section
+                ) if section not in (None, "") else None
+                merged["_part"] = part_index
+                items.append(merged)
+                by_text[norm] = merged
+            id_map[(part_index, local_id)] = merged["id"]
+    return items, id_map
+
+
+def _remap_related(items, field, id_map):
+    for item in items:
+        part_index = item.pop("_part", None)
+        related = []
+        for ref in item.get(field) or []:
+            mapped = id_map.get((part_index, str(ref)))
+            if mapped and mapped not in related:
+                related.append(mapped)
+        item[field] = related
+
+
+def merge_partial_structures(partials, title=None):
+    """Merge per-chunk extraction results into one RFP structure.
+
+    Sections are de-duplicated by outline number (from the heading or the id)
+    and heading text, or when a chunk opens with the heading the previous chunk
+    ended on; questions and requirements by text.
+    Ids are renumbered ("1", "Q1", "R1", ...), cross references are remapped
+    and parent_id/level are rebuilt from the returned parents or, when those
+    are missing, from outline numbering such as "3.2" -> "3".
+    """
+    partials = [p for p in partials if isinstance(p, dict)]
+    sections, section_ids, number_map = _merge_sections(partials)
+    questions, question_ids = _merge_items(partials, "questions", "Q", "text", section_ids, number_map)
+    requirements, requirement_ids = _merge_items(partials, "requirements", "R", "text", section_ids, number_map)
+    _remap_related(questions, "related_requirements", requirement_ids)
+    _remap_related(requirements, "related_questions", question_ids)
+
+    for question in questions:
+        question.setdefault("type", None)
+        question.setdefault("response_format", None)
+        question.setdefault("word_limit", None)
+    for requirement in requirements:
+        requirement.setdefault("category", None)
+        requirement.setdefault("mandatory", True)
+
+    return {
+        "metadata": _merge_metadata(partials, title),
+        "sections": sections,
+        "questions": questions,
+        "requirements": requirements,
+    }
+
+
+if __name__ == "__main__":
+    # Regression checks: python -m agents.structure_merge
+    rule_based = {"sections": [
+        {"id": "1", "title": "1 Scope", "content": "a"},
+        {"id": "2", "title": "2 Background", "content": "b"},
+    ]}
+    fragments = {"sections": [{"id": "2", "title": "Background", "content": "b"}]}
+    merged = merge_partial_structures([rule_based, fragments])["sections"]
+    assert [s["title"] for s in merged] == ["1 Scope", "2 Background"], merged
+
+    distinct = [
+        {"sections": [{"id": "1", "title": "1 Scope", "content": "x"}]},
+        {"sections": [{"id": "1", "title": "2 Scope", "content": "y"}]},
+    ]
+    assert len(merge_partial_structures(distinct)["sections"]) == 2
+
+    continued = [
+        {"sections": [{"id": "1", "title": "Intro", "content": "a"}, {"id": "2", "title": "Pricing", "content": "p1"}]},
+        {"sections": [{"id": "1", "title": "Pricing", "content": "p2"}]},
+    ]
+    pricing = merge_partial_structures(continued)["sections"][1]
+    assert pricing["content"] == "p1\np2", pricing
+    print("structure_merge checks passed")
@@ -4,8 +4,7 @@
 # from langchain.tools import Tool
 # from langchain_google_genai import ChatGoogleGenerativeAI
 # # from langchain_community.chat_models import ChatGroq
-# from langchain_groq import ChatGroq
-
+# 
 # from dotenv import load_dotenv
 
 # load_dotenv()
@@ -36,14 +35,20 @@
 #     description="Useful for answering questions about company-related topics."
 # )
 import os
+import threading
+from functools import lru_cache
 # from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_community.vectorstores import PGVector
 from langchain.chains import RetrievalQA
 from langchain.tools import Tool
-from langchain_groq import ChatGroq
 from langchain_core.documents import Document
 from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from methods.embedding_cache import CachedEmbeddings
+from methods.telemetry import TrackedEmbeddings
+from methods.vector_index import CompanyChunkStore, backfill_company_chunks, backfill_pending, create_chunk_tables
+from agents.retrieval import RerankingRetriever
 
 load_dotenv()
 raw_url = os.getenv("VECTOR_DATABASE_URL")
@@ -52,13 +57,59 @@ if not raw_url:
 PGVECTOR_CONNECTION_STRING = raw_url.replace("postgresql://", "postgresql+psycopg2://", 1)
 
 # Load embeddings
-embeddings = HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')
+# Query embeddings are cached (methods/embedding_cache.py); only misses reach the model
+embeddings = CachedEmbeddings(TrackedEmbeddings(HuggingFaceEmbeddings(model_name='all-MiniLM-L6-v2')), 'all-MiniLM-L6-v2')
+
+# LLM (Groq + LLaMA 3): use methods.llm_provider.get_groq_chat(), which reads GROQ_API_KEY
+
+# One vector store per process. Building it creates a SQLAlchemy engine and
+# checks the extension, tables and indexes, so it is done once; queries share
+# the engine's connection pool. Retrievers and tools only hold the company
+# filter and are kept in bounded LRU caches.
+#
+# VECTOR_BACKEND=chunks (default) stores chunks in company_doc_chunks with an
+# indexed company_id and an ANN index (methods/vector_index.py);
+# VECTOR_BACKEND=langchain keeps the original PGVector company_docs collection.
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chunks")
+VECTOR_BACKFILL = os.getenv("VECTOR_BACKFILL", "auto")  # auto | 1 | 0: copy of the old collection
+VECTOR_DB_POOL_SIZE = int(os.getenv("VECTOR_DB_POOL_SIZE", "10"))
+VECTOR_DB_MAX_OVERFLOW = int(os.getenv("VECTOR_DB_MAX_OVERFLOW", "20"))
+RETRIEVER_CACHE_SIZE = int(os.getenv("RETRIEVER_CACHE_SIZE", "256"))
+RETRIEVAL_PIPELINE = os.getenv("RETRIEVAL_PIPELINE", "rerank")  # rerank | topk
+ENGINE_ARGS = {
+    "pool_size": VECTOR_DB_POOL_SIZE,
+    "max_overflow": VECTOR_DB_MAX_OVERFLOW,
+    "pool_pre_ping": True,
+    "pool_recycle": 1800,
+}
+
+_vectorstore = None
+_vectorstore_lock = threading.Lock()
+
+
+def get_vectorstore():
+    """Process-wide company document store (created on first use)."""
+    global _vectorstore
+    with _vectorstore_lock:
+        if _vectorstore is None:
+            if VECTOR_BACKEND == "langchain":
+                _vectorstore = PGVector(
+                    collection_name="company_docs",
+                    connection_string=PGVECTOR_CONNECTION_STRING,
+                    embedding_function=embeddings,
+                    engine_args=ENGINE_ARGS,
+                )
+            else:
+                engine = create_engine(PGVECTOR_CONNECTION_STRING, **ENGINE_ARGS)
+                create_chunk_tables(engine)
+                if VECTOR_BACKFILL == "1" or (VECTOR_BACKFILL == "auto" and backfill_pending(engine)):
+                    backfill_company_chunks(engine)
+                elif VECTOR_BACKFILL == "0" and backfill_pending(engine):
+                    print("WARNING: company_doc_chunks is empty but the company_docs collection has rows; "
+                          "retrieval will not see them until a start with VECTOR_BACKFILL=auto or 1")
+                _vectorstore = CompanyChunkStore(engine, embeddings)
+        return _vectorstore
 
-# LLM (Groq + LLaMA 3)
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    groq_api_key = "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"
-)
 
 # def get_company_qa_tool(company_id: int) -> Tool:
 #     """Create a Tool that queries company-specific documents from PGVector."""
@@ -81,21 +132,25 @@ llm = ChatGroq(
 #         func=company_qa.run,
 #         description=f"Answer queries using only documents from company_id={company_id}."
 #     )
+@lru_cache(maxsize=RETRIEVER_CACHE_SIZE)
+def get_company_retriever(company_id: int, k: int = 4):
+    """Retriever over one company's documents: MMR + rerank (agents/retrieval.py) or plain top-k."""
+    if RETRIEVAL_PIPELINE == "rerank":
+        return RerankingRetriever(store=get_vectorstore(), company_id=company_id, k=k)
+    return get_vectorstore().as_retriever(search_kwargs={"k": k, "filter": {"company_id": company_id}})
+
+
+@lru_cache(maxsize=RETRIEVER_CACHE_SIZE)
 def get_company_qa_tool(company_id: int):
-    vectorstore = PGVector(
-        collection_name="company_docs",
-        connection_string=PGVECTOR_CONNECTION_STRING,
-        embedding_function=embeddings
-    )
-    retriever = vectorstore.as_retriever(search_kwargs={"filter": {"company_id": company_id}})
+    retriever = get_company_retriever(company_id)
     # Use invoke instead of get_relevant_documents (per deprecation warning)
     def company_doc_query(query: str):
         docs = retriever.invoke(query)
         if not docs:
             return "No relevant company documentation found."
-        # Return the most relevant doc's content (or concatenate top N)
+        # Best chunks first, already cut to the retrieval token budget
         if isinstance(docs, list):
-            return docs[0].page_content
+            return "\n\n".join(f"[{i}] {doc.page_content.strip()}" for i, doc in enumerate(docs, start=1))
         return str(docs)
     from langchain.tools import Tool
     return Tool(
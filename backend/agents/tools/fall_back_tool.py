@@ -1,18 +1,6 @@
 from langchain.tools import Tool
-import google.generativeai as genai
-import os
 import logging
-
-# Safe, lazy model initialization using GEMINI_MODEL env var.
-# Do NOT instantiate a model at import time to avoid crashes when the model name
-# is not available or supported in the current API account.
-model_name = os.getenv("GEMINI_MODEL")
-llm = None
-if model_name:
-    try:
-        llm = genai.GenerativeModel(model_name)
-    except Exception:
-        logging.exception("Failed to initialize Gemini model '%s'", model_name)
+from methods.llm_router import generate_text, route_available
 
 
 def _fallback_generate(prompt: str) -> str:
@@ -20,16 +8,15 @@ def _fallback_generate(prompt: str) -> str:
 
     This avoids raising exceptions at import time or when the model is unavailable.
     """
-    if llm is None:
+    if not route_available("fallback"):
         return (
             "LLM not configured or unavailable. Set the GEMINI_MODEL environment variable to "
             "a supported model name (and ensure API key/permissions are correct)."
         )
     try:
-        resp = llm.generate_content(prompt)
-        return getattr(resp, "text", str(resp))
+        return generate_text("fallback", prompt)
     except Exception:
-        logging.exception("LLM generate_content failed")
+        logging.exception("LLM generation failed")
         return "LLM call failed; check server logs for details."
 
 
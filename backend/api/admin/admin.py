@@ -1,3 +1,4 @@
+import asyncio
 import os
 from models.schema import User, UserRole, UserCreate, UserResponse, RFP , Employee , EmployeeCreate, Company
 from methods.functions import get_db, require_role, get_password_hash
@@ -9,16 +10,17 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, RootModel
 from typing import Dict, List
 from sqlalchemy.exc import SQLAlchemyError
-from methods.functions import extract_text_from_docx,extract_text_from_excel,extract_text_from_pdf_bytes
+from methods.document_ingestion import ingest_document
+from methods.structure_cache import invalidate_structures
+from methods.answer_cache import answer_cache_stats, invalidate_company_answers
+from methods.checkpoints import clear_company_checkpoints
+from methods.telemetry import GROUP_BY, bind_telemetry, usage_summary
 import datetime 
 import json
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, UploadFile, File, Form
-# from langchain.embeddings import HuggingFaceEmbeddings
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.vectorstores.pgvector import PGVector
-from langchain_core.documents import Document
+from agents.tools.company_doc_tool import get_vectorstore
 
 
 load_dotenv()
@@ -215,46 +217,77 @@ async def remove_rfp(
     db.commit()
     return {"message": f"RFP {rfp_id} deleted and unassigned from all employees."}
 
-load_dotenv()
-embedding_model = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-
-raw_url = os.getenv("VECTOR_DATABASE_URL")
-if not raw_url:
-    raise RuntimeError("DATABASE_URL environment variable is not set. Please set it in your .env file or environment.")
-PGVECTOR_CONNECTION_STRING = raw_url.replace("postgresql://", "postgresql+psycopg2://", 1)
-
-vectorstore = PGVector(
-    collection_name="company_docs",
-    connection_string=PGVECTOR_CONNECTION_STRING,
-    embedding_function=embedding_model,
-)
-
-
 @router.post("/add-document/")
-async def add_document(company_id: int = Form(...), file: UploadFile = File(...)):
+async def add_document(company_id: int = Form(...), file: UploadFile = File(...), db: Session = Depends(get_db)):
     file_bytes = await file.read()
     filename = file.filename.lower()
-
-    if filename.endswith(".pdf"):
-        text = extract_text_from_pdf_bytes(file_bytes)
-    elif filename.endswith(".docx"):
-        text = extract_text_from_docx(file_bytes)
-    elif filename.endswith(".xlsx"):
-        text = extract_text_from_excel(file_bytes)
-    else:
+    bind_telemetry(company_id=company_id, endpoint="add_document")
+    if not filename.endswith((".pdf", ".docx", ".xlsx")):
         return {"error": "Unsupported file type. Use .pdf, .docx or .xlsx"}
-
-    if not text.strip():
+    # New documents can change answers, so cached ones are no longer trusted
+    invalidate_company_answers(db, company_id)
+    clear_company_checkpoints(db, company_id)
+
+    # Chunked and embedded in batches off the event loop (methods/document_ingestion.py)
+    vectorstore = await asyncio.to_thread(get_vectorstore)
+    stats = await asyncio.to_thread(ingest_document, vectorstore, company_id, file.filename, file_bytes)
+    # Again once the chunks are stored: a generation running during the ingest
+    # may have cached answers built from the old documents
+    invalidate_company_answers(db, company_id)
+    clear_company_checkpoints(db, company_id)
+    if not stats["chunks"]:
         return {"error": "No extractable text found in the document."}
+    return {"message": f"{filename} embedded for company {company_id}", **stats}
+
+@router.delete("/admin/rfp-structure-cache/{content_hash}")
+async def invalidate_rfp_structure_cache(
+    content_hash: str,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: Session = Depends(get_db)
+):
+    deleted = invalidate_structures(db, content_hash)
+    if not deleted:
+        raise HTTPException(status_code=404, detail="No cached structure for this file hash.")
+    return {"message": f"Removed {deleted} cached structure(s).", "deleted": deleted}
+
+@router.delete("/admin/rfp-structure-cache")
+async def clear_rfp_structure_cache(
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: Session = Depends(get_db)
+):
+    deleted = invalidate_structures(db)
+    return {"message": f"Removed {deleted} cached structure(s).", "deleted": deleted}
+
+@router.get("/admin/answer-cache/stats")
+async def get_answer_cache_stats(
+    company_id: int = None,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: Session = Depends(get_db)
+):
+    return answer_cache_stats(db, company_id)
 
-    print("vectorizing")
-    doc = Document(page_content=text, metadata={"company_id": company_id})
-    vectorstore.add_documents([doc])
-    print(doc)
-    return {
-        "message": f"{filename} embedded for company {company_id}",
-        "characters": len(text)
-    }
+@router.delete("/admin/answer-cache/{company_id}")
+async def clear_answer_cache(
+    company_id: int,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: Session = Depends(get_db)
+):
+    deleted = invalidate_company_answers(db, company_id)
+    return {"message": f"Removed {deleted} cached answer(s).", "deleted": deleted}
+
+@router.get("/admin/llm-usage")
+async def get_llm_usage(
+    group_by: str = "company",
+    company_id: int = None,
+    rfp_id: int = None,
+    since_hours: float = None,
+    current_user: User = Depends(require_role([UserRole.ADMIN, UserRole.SUPER_ADMIN])),
+    db: Session = Depends(get_db)
+):
+    """LLM/embedding calls, tokens and latency per company, RFP, endpoint or provider."""
+    if group_by not in GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(GROUP_BY)}")
+    return {"group_by": group_by, "usage": usage_summary(db, group_by, company_id, rfp_id, since_hours)}
 
 @router.post("/admin/rfps/{rfp_id}/message")
 async def add_rfp_message(
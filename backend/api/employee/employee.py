@@ -12,7 +12,7 @@ import os
 import logging
 import json
 from pydantic import BaseModel
-import google.generativeai as genai
+from methods.llm_router import generate_text, route_available
 
 router = APIRouter(prefix="/api", tags=["Employee"])
 
@@ -137,16 +137,7 @@ def final_rfp(
     changes: str = Form(...),
     db: Session = Depends(get_db)
 ):
-    # Use GEMINI_MODEL env var for model name; instantiate lazily and handle failure
-    model_name = os.getenv("GEMINI_MODEL")
-    model = None
-    if model_name:
-        try:
-            model = genai.GenerativeModel(model_name)
-        except Exception:
-            logging.exception("Failed to initialize Gemini model '%s'", model_name)
-
-    if model is None:
+    if not route_available("employee_final_rfp"):
         # Graceful error telling the operator to configure the model
         raise HTTPException(
             status_code=503,
@@ -156,15 +147,16 @@ def final_rfp(
         )
 
     try:
-        prompt = model.generate_content(
+        result = generate_text(
+            "employee_final_rfp",
             f"""
             I have a document which contains the text "{text}". I want you to apply the following {changes} to each relevant part of the data. Modify the content accordingly and return the final output in the correct order, preserving structure and formatting. Apply only the changes mentioned—do not invent or omit anything.
-            """
+            """,
         )
-        print(getattr(prompt, "text", str(prompt)))
-        return {"prompt": getattr(prompt, "text", str(prompt))}
+        print(result)
+        return {"prompt": result}
     except Exception:
-        logging.exception("LLM generate_content failed in final_rfp")
+        logging.exception("LLM generation failed in final_rfp")
         raise HTTPException(status_code=500, detail="LLM generation failed; check server logs.")
 
 
@@ -173,6 +165,8 @@ from botocore.exceptions import ClientError
 from urllib.parse import urlparse
 
 from dotenv import load_dotenv
+from methods.extracted_text import get_rfp_text, invalidate_rfp_text, store_rfp_text
+from methods.pdf_extraction import extract_pdf_text
 load_dotenv()
 def parse_s3_url(s3_url: str):
     """Extract bucket name and key from S3 URL."""
@@ -222,6 +216,7 @@ def ok(
     print(pdf_url)
     
     rfp.status = "review pending"
+    generated_text = {"pdf": file_paths.pop("pdf_text", None), "docx": file_paths.pop("docx_text", None)}
     # DOCX replacement and deletion
     if not rfp.docx_url:
         rfp.docx_url = docx_url
@@ -239,6 +234,13 @@ def ok(
         delete_s3_file(old_pdf)
 
     db.commit()
+
+    # Replace the stored artifact text so the edit endpoints never re-download it
+    invalidate_rfp_text(db, rfp.id, keep_urls=[u for u in (docx_url, pdf_url) if u])
+    if pdf_url and generated_text["pdf"] is not None:
+        store_rfp_text(db, rfp.id, "pdf", pdf_url, generated_text["pdf"])
+    if docx_url and generated_text["docx"] is not None:
+        store_rfp_text(db, rfp.id, "docx", docx_url, generated_text["docx"])
     return file_paths
     
 
@@ -339,6 +341,14 @@ def generate_and_upload_proposal(company_id, responses, subdomain):
                 "message": f"PDF conversion failed: {e}"
             }
 
+        # Extract artifact text now, while the files are local, for the extracted-text store
+        docx_text = "\n".join(p.text for p in doc.paragraphs)
+        try:
+            pdf_text = extract_pdf_text(pdf_path)
+        except Exception as e:
+            print(f"Failed to extract generated PDF text: {e}")
+            pdf_text = None
+
         # AWS S3 Upload
         AWS_ACCESS_KEY_ID = os.getenv("ACCESS_KEY_AWS")
         AWS_SECRET_ACCESS_KEY = os.getenv("SECRET_KEY_AWS")
@@ -385,7 +395,9 @@ def generate_and_upload_proposal(company_id, responses, subdomain):
     return {
         "status": "success",
         "docx_url": docx_url,
-        "pdf_url": pdf_url
+        "pdf_url": pdf_url,
+        "docx_text": docx_text,
+        "pdf_text": pdf_text
     }
 
 @router.get("/employee/rfps/{rfp_id}/response")
@@ -403,8 +415,8 @@ def get_rfp_response(rfp_id: int, db: Session = Depends(get_db)):
             return {"response": response_json}
         except Exception:
             return {"response": response_data}
-    # Fallback: return extracted text if available
-    extracted_text = getattr(rfp, "extracted_text", None)
+    # Fallback: return extracted text if available (stored copy only, no download)
+    extracted_text = get_rfp_text(db, rfp, fetch=False)
     if extracted_text:
         return {"extracted_text": extracted_text}
     return {"message": "No response or extracted text found for this RFP."}
@@ -1,16 +1,14 @@
-import requests
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
 from models.schema import RFP, Employee, Company
 from methods.functions import get_db
-from langchain_groq import ChatGroq
 from langchain.agents import initialize_agent, AgentType
 from agents.tools.company_doc_tool import get_company_qa_tool
 from agents.tools.fall_back_tool import FallbackLLMTool
 import os
-from PyPDF2 import PdfReader
-from io import BytesIO
-import google.generativeai as genai
+from methods.extracted_text import get_rfp_text
+from methods.llm_router import generate_text, route_available
 import os
 import logging
 
@@ -25,11 +23,7 @@ def extract_pdf_text(
     if not rfp or not rfp.pdf_url:
         raise HTTPException(status_code=404, detail="RFP or PDF not found.")
     try:
-        response = requests.get(rfp.pdf_url)
-        response.raise_for_status()
-        pdf_bytes = BytesIO(response.content)
-        reader = PdfReader(pdf_bytes)
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
+        text = get_rfp_text(db, rfp, artifact="pdf")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to extract PDF text: {str(e)}")
     return {"text": text}
@@ -47,24 +41,8 @@ def extract_file_text(
         raise HTTPException(status_code=404, detail="RFP or file not found.")
     try:
         print(f"[extract-file-text] RFP: {rfp}")
-        if rfp.pdf_url:
-            print(f"[extract-file-text] Trying PDF url: {rfp.pdf_url}")
-            response = requests.get(rfp.pdf_url)
-            response.raise_for_status()
-            pdf_bytes = BytesIO(response.content)
-            reader = PdfReader(pdf_bytes)
-            text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        elif rfp.docx_url:
-            import docx
-            print(f"[extract-file-text] Trying DOCX url: {rfp.docx_url}")
-            response = requests.get(rfp.docx_url)
-            response.raise_for_status()
-            docx_bytes = BytesIO(response.content)
-            doc = docx.Document(docx_bytes)
-            text = "\n".join([p.text for p in doc.paragraphs])
-        else:
-            print("[extract-file-text] No file url present on RFP.")
-            text = ""
+        # Served from the extracted-text store; only the first call per artifact downloads
+        text = get_rfp_text(db, rfp) or ""
     except Exception as e:
         print(f"[extract-file-text] Exception: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to extract file text: {str(e)}")
@@ -87,39 +65,14 @@ async def employee_custom_prompt_edit(
     # Extract file text (reuse logic)
     try:
         print(f"[custom-prompt-edit] RFP: {rfp}")
-        if rfp.pdf_url:
-            print(f"[custom-prompt-edit] Trying PDF url: {rfp.pdf_url}")
-            response = requests.get(rfp.pdf_url)
-            response.raise_for_status()
-            pdf_bytes = BytesIO(response.content)
-            reader = PdfReader(pdf_bytes)
-            file_text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        elif rfp.docx_url:
-            import docx
-            print(f"[custom-prompt-edit] Trying DOCX url: {rfp.docx_url}")
-            response = requests.get(rfp.docx_url)
-            response.raise_for_status()
-            docx_bytes = BytesIO(response.content)
-            doc = docx.Document(docx_bytes)
-            file_text = "\n".join([p.text for p in doc.paragraphs])
-        else:
-            print("[custom-prompt-edit] No file url present on RFP.")
-            file_text = ""
+        file_text = await asyncio.to_thread(get_rfp_text, db, rfp) or ""
     except Exception as e:
         print(f"[custom-prompt-edit] Exception during extraction: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to extract file text: {str(e)}")
     # LLM prompt
     try:
-        model_name = os.getenv("GEMINI_MODEL")
-        model = None
-        if model_name:
-            try:
-                model = genai.GenerativeModel(model_name)
-            except Exception:
-                logging.exception("Failed to initialize Gemini model '%s'", model_name)
-
         full_prompt = f"File Content:\n{file_text}\n\nInstruction: {prompt}"
-        if model is None:
+        if not route_available("custom_prompt_edit"):
             # graceful fallback when model is not configured
             result = (
                 "LLM not configured or unavailable. Set the GEMINI_MODEL environment variable to a supported model "
@@ -127,10 +80,9 @@ async def employee_custom_prompt_edit(
             )
         else:
             try:
-                response = model.generate_content(full_prompt)
-                result = getattr(response, 'text', str(response))
+                result = await asyncio.to_thread(generate_text, "custom_prompt_edit", full_prompt)
             except Exception:
-                logging.exception("LLM generate_content failed")
+                logging.exception("LLM generation failed")
                 result = "LLM call failed; check server logs for details."
     except Exception as e:
         logging.exception("Unexpected error in custom prompt edit")
@@ -152,19 +104,11 @@ async def employee_final_proposal(rfp_id: int, request: Request, db: Session = D
         if not rfp:
             raise HTTPException(status_code=404, detail="RFP not found.")
         # Optionally, you can add more context from the RFP or employee here
-        model_name = os.getenv("GEMINI_MODEL")
-        model = None
-        if model_name:
-            try:
-                model = genai.GenerativeModel(model_name)
-            except Exception:
-                logging.exception("Failed to initialize Gemini model '%s'", model_name)
-
         prompt_text = (
             f"You are an expert proposal writer. Refine and finalize the following proposal draft into a professional, cohesive document suitable for submission. Format with appropriate sections, summary, and conclusion. Return the result in Markdown format.\n\nProposal Draft:\n{proposal_text}"
         )
 
-        if model is None:
+        if not route_available("final_proposal"):
             # graceful fallback
             return {
                 "result": (
@@ -174,11 +118,10 @@ async def employee_final_proposal(rfp_id: int, request: Request, db: Session = D
             }
 
         try:
-            prompt = model.generate_content(prompt_text)
-            final_proposal_markdown = getattr(prompt, 'text', str(prompt))
+            final_proposal_markdown = await asyncio.to_thread(generate_text, "final_proposal", prompt_text)
             return {"result": final_proposal_markdown}
         except Exception:
-            logging.exception("LLM generate_content failed for final proposal")
+            logging.exception("LLM generation failed for final proposal")
             raise HTTPException(status_code=500, detail="LLM generation failed; check server logs.")
     except Exception as e:
         logging.exception("Unexpected error in employee_final_proposal")
@@ -1,5 +1,7 @@
 from fastapi import APIRouter, FastAPI, Request, HTTPException
-import google.generativeai as genai
+from methods.llm_router import generate_text, route_available
+from methods.telemetry import bind_telemetry
+from methods.token_budget import fit_json_to_budget
 import os
 import logging
 from docx import Document
@@ -18,6 +20,9 @@ app = FastAPI()
 # Define API router
 router = APIRouter(prefix="/api", tags=["RFP"])
 
+# Token budget for the rfp_data pasted into the proposal prompt
+PROPOSAL_CONTEXT_TOKENS = int(os.getenv("PROPOSAL_CONTEXT_TOKENS", "24000"))
+
 
 
 @router.post("/going_to_edit", response_model=dict) #changes
@@ -32,15 +37,11 @@ def going_to_edit(rfp_data: dict,
     company_id = rfp_data.get("company_id")
     rfp_id = rfp_data.get("rfp_id")
     employee_id = rfp_data.get("employee_id")
+    bind_telemetry(rfp_id=rfp_id, company_id=company_id)
     print("id apro")
     print(employee_id)
-    model_name = os.getenv("GEMINI_MODEL")
-    model = None
-    if model_name:
-        try:
-            model = genai.GenerativeModel(model_name)
-        except Exception:
-            logging.exception("Failed to initialize Gemini model '%s'", model_name)
+    # Compact JSON instead of a Python repr; long answers are shortened to fit
+    rfp_json = fit_json_to_budget(rfp_data, PROPOSAL_CONTEXT_TOKENS)
 
     full_prompt = f"""
         You are an expert proposal writer. Compile the following question responses into a cohesive, professional
@@ -51,17 +52,16 @@ def going_to_edit(rfp_data: dict,
 
         The final proposal should be in Markdown format with appropriate headings, bullet points, and formatting.
 
-        rfp_data: {rfp_data}
+        rfp_data (JSON): {rfp_json}
         """
 
-    if model is None:
+    if not route_available("going_to_edit"):
         # Graceful fallback when there's no model configured
         logging.warning("No GEMINI_MODEL configured; returning unprocessed rfp_data as fallback result.")
         return {"prompt": "LLM not configured. Set GEMINI_MODEL to a supported model to enable proposal generation.", "rfp_data": rfp_data}
 
-    prompt = model.generate_content(full_prompt)
+    final_proposal_markdown = generate_text("going_to_edit", full_prompt)
     print("inga iruke")
-    final_proposal_markdown = getattr(prompt, "text", str(prompt))
     print(final_proposal_markdown)
     print(company_id)
     # company = db.query(Company).filter(Company.id==company_id).first()
@@ -0,0 +1,98 @@
+from fastapi import APIRouter, HTTPException, Form, Body
+from methods.functions import Session, Depends, get_db, require_role1
+from methods.jobs import enqueue_job, job_to_dict
+from models.schema import RFP, UserRole, Employee, Job
+
+# Asynchronous variants of /upload-rfp/ and /generate-response. The request only
+# enqueues a job and returns its id; workers/job_worker.py does the work and the
+# client polls /jobs/{job_id} (or /response-status/{rfp_id}) for progress.
+router = APIRouter(prefix="/api", tags=["Jobs"])
+
+
+def _check_company(company_id, current_user: Employee):
+    if company_id != current_user.company_id:
+        raise HTTPException(status_code=403, detail="Not allowed for this company")
+
+
+@router.post("/jobs/upload-rfp", response_model=dict)
+def enqueue_upload_rfp(
+    file_name: str = Form(...),
+    generate: bool = Form(False),
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    """Queue extraction (and optionally response generation) for an uploaded RFP"""
+    rfp = db.query(RFP).filter(RFP.filename == file_name).first()
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found for provided file_name")
+    _check_company(rfp.company_id, current_user)
+    if not rfp.file_url:
+        raise HTTPException(status_code=400, detail="No file_url available for this RFP")
+
+    job = enqueue_job(
+        db,
+        "pipeline" if generate else "extract",
+        {"rfp_id": rfp.id, "employee_id": current_user.id},
+        rfp_id=rfp.id,
+        company_id=rfp.company_id,
+    )
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.post("/jobs/generate-response", response_model=dict)
+def enqueue_generate_response(
+    json_data: dict = Body(...),
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    """Queue response generation for already extracted structured_data"""
+    structured_data = json_data.get("structured_data")
+    if not isinstance(structured_data, dict):
+        raise HTTPException(status_code=400, detail="structured_data is required")
+    company_id = structured_data.setdefault("company_id", current_user.company_id)
+    _check_company(company_id, current_user)
+    rfp_id = structured_data.get("rfp_id")
+    if rfp_id is not None:
+        rfp = db.query(RFP).filter(RFP.id == rfp_id).first()
+        if not rfp:
+            raise HTTPException(status_code=404, detail="RFP not found")
+        _check_company(rfp.company_id, current_user)
+    job = enqueue_job(
+        db,
+        "generate",
+        {"structured_data": structured_data, "mode": json_data.get("mode")},
+        rfp_id=rfp_id,
+        company_id=company_id,
+    )
+    return {"job_id": job.id, "status": job.status}
+
+
+@router.get("/jobs/{job_id}", response_model=dict)
+def get_job_status(
+    job_id: str,
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    # Other companies' jobs are reported as missing
+    job = db.query(Job).filter(Job.id == job_id, Job.company_id == current_user.company_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(job, include_result=job.status == "succeeded")
+
+
+@router.get("/response-status/{rfp_id}", response_model=dict)
+def get_response_status(
+    rfp_id: int,
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    """Latest job for an RFP"""
+    job = (
+        db.query(Job)
+        .filter(Job.rfp_id == rfp_id, Job.company_id == current_user.company_id)
+        .order_by(Job.created_at.desc())
+        .first()
+    )
+    if not job:
+        raise HTTPException(status_code=404, detail="No job found for this RFP")
+    return job_to_dict(job, include_result=job.status == "succeeded")
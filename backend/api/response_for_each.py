@@ -1,24 +1,395 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Body, Request
+from fastapi.responses import StreamingResponse
 # from langchain_community.chat_models import ChatGroq
 from langchain.agents import initialize_agent
 from langchain.agents.agent_types import AgentType
-from agents.tools.company_doc_tool import get_company_qa_tool
+from agents.tools.company_doc_tool import get_company_qa_tool, get_company_retriever
+from agents.compliance import NOT_EVALUATED, batched, check_requirements
 from agents.tools.wikipedia_tool import WikipediaTool
 from agents.tools.fall_back_tool import FallbackLLMTool
+from agents.retrieve_generate import RetrieveThenGenerate
+from methods.answer_cache import lookup_answer, store_answer
+from methods.token_budget import truncate_to_budget
+from methods.checkpoints import (
+    checkpoint_counts,
+    clear_checkpoints,
+    discard_checkpoints,
+    item_hash,
+    load_checkpoints,
+    save_checkpoint,
+)
+from methods.telemetry import bind_telemetry, with_current_context
 import asyncio
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
+from methods.llm_router import get_routed_chat
 from dotenv import load_dotenv
-from methods.functions import Depends,require_role,Session,get_db
-from models.schema import User,UserRole, Employee, Company
+from methods.functions import Depends,require_role,require_role1,Session,get_db
+from models.schema import User,UserRole, Employee, Company, RFP
 
 load_dotenv()
 router = APIRouter(prefix="/api", tags=["RFP"])
 
+# Max agent calls in flight per generate_rfp_response call
+LLM_CONCURRENCY = int(os.getenv("RFP_LLM_CONCURRENCY", "8"))
+QUESTION_TIMEOUT = float(os.getenv("RFP_QUESTION_TIMEOUT", "30"))
+# Blocking agent/compliance calls run here, not in the loop's default executor
+# (shared with cache lookups, checkpoint saves and uploads, and smaller than
+# LLM_CONCURRENCY on small hosts)
+_agent_pool = ThreadPoolExecutor(max_workers=LLM_CONCURRENCY, thread_name_prefix="rfp-agent")
+
+# "agent": ReAct agent choosing between company docs and the fallback LLM.
+# "retrieve": one retrieval + one grounded LLM call per item (agents/retrieve_generate.py).
+GENERATION_MODES = ("agent", "retrieve")
+GENERATION_MODE = os.getenv("RFP_GENERATION_MODE", "agent")
+
+# "batch": requirements judged ~20 per structured-JSON call; "agent": one agent run each.
+COMPLIANCE_MODE = os.getenv("RFP_COMPLIANCE_MODE", "batch")
+COMPLIANCE_EVIDENCE_K = int(os.getenv("RFP_COMPLIANCE_EVIDENCE_K", "3"))
+
+# Section text pasted into a query is cut to this many tokens (the opening,
+# where the section says what it asks for, is kept)
+SECTION_CONTENT_TOKENS = int(os.getenv("RFP_SECTION_CONTENT_TOKENS", "1500"))
+
 # Set Groq API key as env variable or securely load from vault
 # os.environ["GROQ_API_KEY"] = "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"
 
+def answer_llm():
+    # Groq first; slow or failing calls are hedged / failed over to Gemini (methods/llm_router.py)
+    return get_routed_chat("answer")
+
+
+def build_answerer(company_id, mode=None):
+    """Object with ``run(query)``: the ReAct agent or the single-pass pipeline."""
+    mode = mode or GENERATION_MODE
+    if mode not in GENERATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown generation mode: {mode}")
+
+    llm = answer_llm()
+    if mode == "retrieve":
+        return RetrieveThenGenerate(company_id, llm)
+
+    CompanyDocTool = get_company_qa_tool(company_id)
+    # Tools
+    tools = [CompanyDocTool,FallbackLLMTool]
+    return initialize_agent(
+        tools,
+        llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=True,
+        handle_parsing_errors=True
+    )
+
+
+async def stream_rfp_response(structured_data: dict, progress=None, mode=None, resume=False):
+    """Answer an extracted RFP, yielding each result as soon as it completes.
+
+    Yields a ``start`` event, one ``section``/``question``/``requirement`` event
+    per item (completion order, with its ``index`` in the input list) and a
+    final ``summary`` event holding the full response in input order.
+    ``mode`` ("agent" or "retrieve") overrides RFP_GENERATION_MODE. With
+    ``resume`` (retries of a failed run) items already checkpointed for this
+    rfp_id are not regenerated; their events carry ``"resumed": true``.
+    Checkpoints are discarded once a run completes with no failed item.
+    """
+    report = progress or (lambda percent, stage: None)
+    metadata = structured_data["metadata"]
+    sections = structured_data["sections"]
+    questions = structured_data["questions"]
+    requirements = structured_data["requirements"]
+
+
+    company_id = structured_data["company_id"]
+    rfp_id = structured_data["rfp_id"]
+    employee_id = structured_data["employee_id"]
+    # Every LLM/embedding call below is attributed to this RFP (methods/telemetry.py)
+    bind_telemetry(rfp_id=rfp_id, company_id=company_id)
+    
+    final_output = {
+        "company_id": company_id,
+        "rfp_id":rfp_id,
+        "employee_id":employee_id,
+        "metadata": metadata,
+        "sections": [],
+        "questions": [],
+        "requirements": []
+    }
+    print(final_output)
+    total = max(1, len(sections) + len(questions) + len(requirements))
+    done = 0
+    cache_hits = 0
+
+    mode = mode or structured_data.get("mode") or GENERATION_MODE
+    print(company_id, "generation mode:", mode)
+    agent_executor = build_answerer(company_id, mode)
+
+    # Items finished by an earlier, interrupted run are reused (methods/checkpoints.py)
+    checkpoints = await asyncio.to_thread(load_checkpoints, rfp_id) if rfp_id and resume else {}
+    hashes, restored, failed = {}, [], set()
+
+    def pending(kind, items):
+        todo = []
+        for index, item in enumerate(items):
+            hashes[(kind, index)] = item_hash(item, mode)
+            saved = checkpoints.get((kind, str(item["id"])))
+            if saved and saved[0] == hashes[(kind, index)]:
+                restored.append((kind, index, saved[1]))
+            else:
+                todo.append((index, item))
+        return todo
+
+    todo_sections = pending("section", sections)
+    todo_questions = pending("question", questions)
+    todo_requirements = pending("requirement", requirements)
+    done = len(restored)
+    if restored:
+        print(f"resuming rfp {rfp_id}: {len(restored)} of {total} items already answered")
+
+    semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+
+    async def in_agent_pool(fn, *args, timeout=None):
+        # A thread cannot be interrupted: after a timeout (or cancellation) the
+        # slot stays taken until the call really returns, so LLM_CONCURRENCY holds
+        await semaphore.acquire()
+        try:
+            future = asyncio.get_running_loop().run_in_executor(_agent_pool, with_current_context(fn), *args)
+        except BaseException:
+            semaphore.release()
+            raise
+        future.add_done_callback(lambda _: semaphore.release())
+        waiter = asyncio.shield(future)
+        return await (asyncio.wait_for(waiter, timeout) if timeout else waiter)
+
+    async def run_agent(query, stage, timeout=None):
+        # The agent is blocking; run it in a thread so the event loop stays free
+        nonlocal done
+        try:
+            return await in_agent_pool(agent_executor.run, query, timeout=timeout)
+        finally:
+            done += 1
+            report(int(done * 100 / total), stage)
+
+    async def cached_or_run(kind, text, query, stage, timeout=None):
+        # Reuse a near-identical earlier answer of this company (methods/answer_cache.py)
+        nonlocal done, cache_hits
+        try:
+            cached, embedding = await asyncio.to_thread(lookup_answer, company_id, text, mode)
+        except Exception as e:
+            print(f"answer cache unavailable: {e}")
+            cached, embedding = None, None
+        if cached is not None:
+            cache_hits += 1
+            done += 1
+            report(int(done * 100 / total), stage)
+            return cached
+        started = time.perf_counter()
+        answer = await run_agent(query, stage, timeout)
+        await asyncio.to_thread(
+            store_answer, company_id, kind, text, embedding, answer, time.perf_counter() - started, mode
+        )
+        return answer
+
+    async def answer_section(section):
+        print(f"Processing section: {section}")
+        content = truncate_to_budget(section["content"], SECTION_CONTENT_TOKENS)
+        query = f"Answer this RFP section based on our docs: {section['title']} - {content}"
+        try:
+            answer = await cached_or_run("section", f"{section['title']} {section['content']}", query, "sections")
+        except Exception as e:
+            import requests
+            if isinstance(e, requests.exceptions.ConnectionError):
+                answer = "Wikipedia lookup failed due to network error."
+            else:
+                answer = f"Error occurred: {str(e)}"
+            failed.add(("section", str(section["id"])))
+        return {
+            "id": section["id"],
+            "title": section["title"],
+            "parent_id": section["parent_id"],
+            "content": section["content"],
+            "answer": answer,
+            "level": section["level"]
+        }
+
+    async def answer_question(question):
+        print(f"Processing question: {question}")
+        query = f"Answer this RFP question based on our docs: {truncate_to_budget(question['text'], SECTION_CONTENT_TOKENS)}"
+        try:
+            answer = await cached_or_run("question", question["text"], query, "questions", timeout=QUESTION_TIMEOUT)
+        except asyncio.TimeoutError:
+            answer = "LLM timed out while answering this question."
+            failed.add(("question", str(question["id"])))
+        except Exception as e:
+            answer = f"Error occurred: {str(e)}"
+            failed.add(("question", str(question["id"])))
+        return {
+            "id": question["id"],
+            "text": question["text"],
+            "answer": answer,
+            "section": question["section"],
+            "type": question["type"],
+            "response_format": question["response_format"],
+            "word_limit": question["word_limit"],
+            "related_requirements": question["related_requirements"],
+        }
+
+    def requirement_item(req, satisfied, evidence):
+        return {
+            "id": req["id"],
+            "text": req["text"],
+            "section": req["section"],
+            "category": req["category"],
+            "mandatory": req["mandatory"],
+            "related_questions": req["related_questions"],
+            "satisfied": satisfied,
+            "evidence": evidence
+        }
+
+    async def check_requirement(index, req):
+        print(f"Processing requirement: {req}")
+        query = f"Does the company satisfy this requirement: {req['text']}?"
+        try:
+            evidence = await run_agent(query, "requirements")
+            satisfied = "yes" in evidence.lower() or "satisfied" in evidence.lower()
+        except Exception as e:
+            evidence, satisfied = f"Error occurred: {str(e)}", False
+            failed.add(("requirement", str(req["id"])))
+        return [("requirement", index, requirement_item(req, satisfied, evidence))]
+
+    async def check_requirement_batch(batch):
+        # One structured-output call judges the whole batch (agents/compliance.py)
+        nonlocal done
+        reqs = [req for _, req in batch]
+        print(f"Checking {len(reqs)} requirements in one call")
+        try:
+            verdicts = await in_agent_pool(check_requirements, reqs, compliance_retriever, llm)
+        except Exception as e:
+            print(f"compliance batch failed: {e}")
+            verdicts = {str(r["id"]): {"satisfied": False, "evidence": f"Error occurred: {str(e)}"} for r in reqs}
+            failed.update(("requirement", str(r["id"])) for r in reqs)
+        else:
+            # Ids the model skipped are retried on resume
+            failed.update(("requirement", rid) for rid, v in verdicts.items() if v["evidence"] == NOT_EVALUATED)
+        finally:
+            done += len(reqs)
+            report(int(done * 100 / total), "requirements")
+        return [("requirement", i, requirement_item(req, **verdicts[str(req["id"])])) for i, req in batch]
+
+    async def single(kind, index, call):
+        return [(kind, index, await call)]
+
+    # Everything is fanned out at once; the semaphore caps LLM calls in flight.
+    # Results are yielded as they finish and slotted back into input order.
+    if COMPLIANCE_MODE == "batch" and todo_requirements:
+        llm = get_routed_chat("compliance")
+        compliance_retriever = get_company_retriever(company_id, COMPLIANCE_EVIDENCE_K)
+        requirement_tasks = [check_requirement_batch(batch) for batch in batched(todo_requirements)]
+    else:
+        requirement_tasks = [check_requirement(i, x) for i, x in todo_requirements]
+    tasks = [
+        *[asyncio.create_task(single("section", i, answer_section(x))) for i, x in todo_sections],
+        *[asyncio.create_task(single("question", i, answer_question(x))) for i, x in todo_questions],
+        *[asyncio.create_task(call) for call in requirement_tasks],
+    ]
+    slots = {
+        "section": [None] * len(sections),
+        "question": [None] * len(questions),
+        "requirement": [None] * len(requirements),
+    }
+    yield {
+        "type": "start",
+        "total": sum(len(items) for items in slots.values()),
+        "counts": {kind: len(items) for kind, items in slots.items()},
+    }
+    for kind, index, item in restored:
+        slots[kind][index] = item
+        yield {"type": kind, "index": index, "item": item, "resumed": True}
+    try:
+        for finished in asyncio.as_completed(tasks):
+            for kind, index, item in await finished:
+                slots[kind][index] = item
+                if rfp_id and (kind, str(item["id"])) not in failed:
+                    await asyncio.to_thread(save_checkpoint, rfp_id, kind, item["id"], hashes[(kind, index)], item)
+                yield {"type": kind, "index": index, "item": item}
+    finally:
+        # Client went away: drop calls that have not started yet
+        for task in tasks:
+            task.cancel()
+
+    final_output["sections"] = slots["section"]
+    final_output["questions"] = slots["question"]
+    final_output["requirements"] = slots["requirement"]
+
+    print("Final output ready")
+    print(final_output)
+    if rfp_id and not failed:
+        # Complete: the next generation must not replay these answers
+        await asyncio.to_thread(discard_checkpoints, rfp_id)
+    yield {
+        "type": "summary",
+        "response": final_output,
+        "satisfied_requirements": sum(1 for r in final_output["requirements"] if r["satisfied"]),
+        "cache_hits": cache_hits,
+        "resumed_items": len(restored),
+        "failed_items": len(failed),
+    }
+
+
+async def generate_rfp_response(structured_data: dict, progress=None, mode=None, resume=False):
+    """Answer every section, question and requirement of an extracted RFP.
+
+    Shared by the /generate-response endpoint and the background job worker.
+    ``progress`` is an optional callback ``progress(percent, stage)``. With
+    ``resume`` items checkpointed by an earlier, failed attempt are reused.
+    """
+    async for event in stream_rfp_response(structured_data, progress, mode, resume):
+        if event["type"] == "summary":
+            return event["response"]
+
+
+def _encode_event(event, sse):
+    data = json.dumps(event, default=str)
+    if sse:
+        return f"event: {event['type']}\ndata: {data}\n\n"
+    return data + "\n"
+
+
+@router.post("/generate-response/stream")
+async def generate_response_stream(request: Request, json_data: dict = Body(...)):
+    """Stream each answer as soon as it is ready, then a summary with the full response.
+
+    Emits NDJSON by default, or server-sent events when the client sends
+    ``Accept: text/event-stream``. Event types: start, section, question,
+    requirement, summary and error.
+    """
+    structured_data = json_data.get("structured_data")
+    if not isinstance(structured_data, dict):
+        raise HTTPException(status_code=400, detail="structured_data is required")
+    if json_data.get("mode") and json_data["mode"] not in GENERATION_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown generation mode: {json_data['mode']}")
+    sse = "text/event-stream" in request.headers.get("accept", "")
+
+    async def events():
+        try:
+            async for event in stream_rfp_response(
+                structured_data, mode=json_data.get("mode"), resume=json_data.get("resume", False)
+            ):
+                yield _encode_event(event, sse)
+        except Exception as e:
+            import traceback
+            print("Exception in generate_response_stream:", traceback.format_exc())
+            yield _encode_event({"type": "error", "detail": f"Internal error: {str(e)}"}, sse)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.post("/generate-response", response_model=dict)
 async def generate_response(
     json_data: dict = Body(...),
@@ -26,119 +397,48 @@ async def generate_response(
     db: Session = Depends(get_db)
 ):
     try:
-        
-        metadata = json_data["structured_data"]["metadata"]
-        sections = json_data["structured_data"]["sections"]
-        questions = json_data["structured_data"]["questions"]
-        requirements = json_data["structured_data"]["requirements"]
-
-
-        company_id = json_data["structured_data"]["company_id"]
-        rfp_id = json_data["structured_data"]["rfp_id"]
-        employee_id = json_data["structured_data"]["employee_id"]
-        
-        
-        final_output = {
-            "company_id": company_id,
-            "rfp_id":rfp_id,
-            "employee_id":employee_id,
-            "metadata": metadata,
-            "sections": [],
-            "questions": [],
-            "requirements": []
-        }
-        print(final_output)
         # if(current_user.role=="employee"):
         #     company_id = db.query(Employee).filter(Employee.company_id==current_user.id).first().company_id
         # else:
         #     company_id = db.query(Company).filter(Company.userid == current_user.id).first()
-
-        CompanyDocTool = get_company_qa_tool(company_id)
-        print(company_id)
-        # Tools
-        tools = [CompanyDocTool,FallbackLLMTool]
-
-# Use Google Generative AI model
-        llm = ChatGroq(model_name="llama-3.3-70b-versatile", groq_api_key = os.getenv("GROQ_API_KEY"))
-        print("GROQ_API_KEY:", os.getenv("GROQ_API_KEY"))
-        agent_executor = initialize_agent(
-            tools,
-            llm,
-            agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-            verbose=True,
-            handle_parsing_errors=True
+        return await generate_rfp_response(
+            json_data["structured_data"], mode=json_data.get("mode"), resume=json_data.get("resume", False)
         )
 
-        for section in sections:
-            print(f"Processing section: {section}")
-            query = f"Answer this RFP section based on our docs: {section['title']} - {section['content']}"
-            try:
-                answer = agent_executor.run(query)
-            except Exception as e:
-                import requests
-                if isinstance(e, requests.exceptions.ConnectionError):
-                    answer = "Wikipedia lookup failed due to network error."
-                else:
-                    answer = f"Error occurred: {str(e)}"
-            final_output["sections"].append({
-                "id": section["id"],
-                "title": section["title"],
-                "parent_id": section["parent_id"],
-                "content": section["content"],
-                "answer": answer,
-                "level": section["level"]
-            })
-            # await asyncio.sleep(5)
-
-        for idx, question in enumerate(questions):
-            print(f"Processing question: {question}")
-            query = f"Answer this RFP question based on our docs: {question.get('title', '')} - {question.get('content', '')}"
-            try:
-                answer = await asyncio.wait_for(
-                    asyncio.to_thread(agent_executor.run, query),
-                    timeout=30  # seconds
-                )
-            except asyncio.TimeoutError:
-                answer = "LLM timed out while answering this question."
-            except Exception as e:
-                answer = f"Error occurred: {str(e)}"
-
-            final_output["questions"].append({
-                "id": question["id"],
-                "text": question["text"],
-                "answer": answer,
-                "section": question["section"],
-                "type": question["type"],
-                "response_format": question["response_format"],
-                "word_limit": question["word_limit"],
-                "related_requirements": question["related_requirements"],
-            })
-            # Stop after the first question
-            break
-
-        for req in requirements:
-            print(f"Processing requirement: {req}")
-            query = f"Does the company satisfy this requirement: {req['text']}?"
-            evidence = agent_executor.run(query)
-            satisfied = "yes" in evidence.lower() or "satisfied" in evidence.lower()
-
-            final_output["requirements"].append({
-                "id": req["id"],
-                "text": req["text"],
-                "section": req["section"],
-                "category": req["category"],
-                "mandatory": req["mandatory"],
-                "related_questions": req["related_questions"],
-                "satisfied": satisfied,
-                "evidence": evidence
-            })
-            # await asyncio.sleep(5)
-
-        print("Final output ready")
-        print(final_output)
-        return final_output
-
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print("Exception in generate_response:", traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Internal error: {str(e)}")
+
+
+def _own_rfp(db, rfp_id, current_user):
+    rfp = db.query(RFP).filter(RFP.id == rfp_id, RFP.company_id == current_user.company_id).first()
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found")
+    return rfp
+
+
+@router.get("/response-checkpoints/{rfp_id}", response_model=dict)
+def get_response_checkpoints(
+    rfp_id: int,
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    """How many items of an RFP's response are already saved"""
+    _own_rfp(db, rfp_id, current_user)
+    counts = checkpoint_counts(db, rfp_id)
+    return {"rfp_id": rfp_id, "completed": counts, "total_completed": sum(counts.values())}
+
+
+@router.delete("/response-checkpoints/{rfp_id}", response_model=dict)
+def delete_response_checkpoints(
+    rfp_id: int,
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    """Forget saved answers so a resumed generation starts from scratch"""
+    _own_rfp(db, rfp_id, current_user)
+    deleted = clear_checkpoints(db, rfp_id)
+    return {"message": f"Removed {deleted} checkpoint(s).", "deleted": deleted}
@@ -1,16 +1,18 @@
-import contextlib
+import asyncio
 from fastapi import FastAPI, HTTPException, Form
 import uuid
 import shutil
 import os
+import traceback
 from fastapi import UploadFile, File
 from agents.extract_rfp_structure import extract_rfp_structure
 from pydantic_models.datatypes import RFP_STORE
 from fastapi import APIRouter
-import tempfile
-import requests
 from pydantic import BaseModel
 from methods.functions import Session,Depends,get_db,require_role1
+from methods.http_client import download_to_buffer, file_extension_from_url
+from methods.structure_cache import content_hash, get_cached_structure, store_structure
+from methods.telemetry import bind_telemetry, record_call
 
 from models.schema import RFP,User,UserRole,Employee
 
@@ -19,87 +21,79 @@ router = APIRouter(prefix="/api", tags=["RFP"])
 class temp(BaseModel):
     file_name:str
     
-@router.post("/upload-rfp/", response_model=dict)
-async def upload_rfp(
-    file_name: str = Form(...),
-    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
-    db: Session = Depends(get_db)
-):
-    # defensive initialization
-    temp_file = None
-    file_path = None
-
-    # Find the RFP record first and validate
-    rfp = db.query(RFP).filter(RFP.filename == file_name).first()
-    if not rfp:
-        raise HTTPException(status_code=404, detail="RFP not found for provided file_name")
+async def extract_structure_for_rfp(db: Session, rfp: RFP, employee_id: int, progress=None):
+    """Download an RFP file and return its structured data (shared by the endpoint and job worker).
 
+    ``progress`` is an optional callback ``progress(percent, stage)``.
+    Returns ``(structured_data, content_hash)``.
+    """
+    report = progress or (lambda percent, stage: None)
+    bind_telemetry(rfp_id=rfp.id, company_id=rfp.company_id, endpoint="extract")
     file_url = getattr(rfp, "file_url", None)
-    rfp_id = getattr(rfp, "id", None)
-    company_id = getattr(rfp, "company_id", None)
-
-    try:
-        if not file_url:
-            raise HTTPException(status_code=400, detail="No file_url available for this RFP")
-
-        # Debug: log rfp and file_url
-        print(f"upload_rfp: rfp_id={rfp_id}, company_id={company_id}, file_url={file_url}")
+    if not file_url:
+        raise HTTPException(status_code=400, detail="No file_url available for this RFP")
 
-        # Download from S3 or HTTP(S) URL
-        response = requests.get(file_url, stream=True, timeout=30)
-        print(f"download status: {getattr(response, 'status_code', None)}")
-        if response.status_code != 200:
-            # include response text in debug logs (but don't expose to clients)
-            print(f"download failed, status={response.status_code}, text={response.text[:500]}")
-            raise HTTPException(status_code=400, detail="Failed to download file from URL")
+    # Debug: log rfp and file_url
+    print(f"upload_rfp: rfp_id={rfp.id}, company_id={rfp.company_id}, file_url={file_url}")
 
-        file_extension = os.path.splitext(file_url)[1] or ".tmp"
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                temp_file.write(chunk)
-        temp_file.close()
-        file_path = temp_file.name
-        print("santhosh3, temp saved:", file_path)
+    # Stream the file from S3 or HTTP(S) into memory on the shared async client;
+    # nothing touches the disk and the event loop stays free during the download.
+    report(5, "downloading")
+    buffer = await download_to_buffer(file_url)
+    file_extension = file_extension_from_url(file_url) or os.path.splitext(rfp.filename or "")[1].lower()
+    print(f"downloaded {buffer.getbuffer().nbytes} bytes")
 
-        # Attempt to extract structure from file_path; trap and log errors
+    # Identical files (re-uploads, the same tender for several companies)
+    # reuse the cached structure instead of paying for extraction again.
+    digest = content_hash(buffer)
+    structured_data = get_cached_structure(db, digest)
+    if structured_data is not None:
+        print(f"structure cache hit for {digest}")
+        record_call("llm", "structure_cache", cache_hit=True)
+    else:
+        # Parsing and extraction are CPU/IO bound, so run them off the event loop.
+        report(20, "extracting")
         try:
-            structured_data = extract_rfp_structure(file_path)
+            structured_data = await asyncio.to_thread(
+                extract_rfp_structure, buffer, f"{os.path.splitext(rfp.filename or 'rfp')[0]}{file_extension}"
+            )
         except Exception as exc:
             print("extract_rfp_structure raised:", repr(exc))
             traceback.print_exc()
-            # ensure file removed before raising
-            if file_path and os.path.exists(file_path):
-                with contextlib.suppress(Exception):
-                    os.remove(file_path)
             raise HTTPException(status_code=500, detail=f"Failed to process document: {str(exc)}")
+        if not structured_data.pop("_degraded", False):
+            store_structure(db, digest, structured_data)
 
-        # Clean up downloaded temp
-        if file_path and os.path.exists(file_path):
-            os.remove(file_path)
+    structured_data["company_id"] = rfp.company_id
+    structured_data["employee_id"] = employee_id
+    structured_data["rfp_id"] = rfp.id
+    print("structured_data keys:", list(structured_data.keys()) if isinstance(structured_data, dict) else type(structured_data))
+    report(100, "extracted")
+    return structured_data, digest
 
-        structured_data["company_id"] = company_id
-        structured_data["employee_id"] = current_user.id
-        structured_data["rfp_id"] = rfp_id
-        print("structured_data keys:", list(structured_data.keys()) if isinstance(structured_data, dict) else type(structured_data))
+
+@router.post("/upload-rfp/", response_model=dict)
+async def upload_rfp(
+    file_name: str = Form(...),
+    current_user: Employee = Depends(require_role1([UserRole.EMPLOYEE])),
+    db: Session = Depends(get_db)
+):
+    # Find the RFP record first and validate
+    rfp = db.query(RFP).filter(RFP.filename == file_name).first()
+    if not rfp:
+        raise HTTPException(status_code=404, detail="RFP not found for provided file_name")
+
+    try:
+        structured_data, digest = await extract_structure_for_rfp(db, rfp, current_user.id)
         return {
             "message": "RFP uploaded and processed successfully",
-            "structured_data": structured_data
+            "structured_data": structured_data,
+            "content_hash": digest
         }
     except HTTPException:
         # re-raise HTTPExceptions so FastAPI can handle them unchanged
         raise
     except Exception as e:
-        # cleanup
-        if file_path and os.path.exists(file_path):
-            with contextlib.suppress(Exception):
-                os.remove(file_path)
         # Log the exception to stdout for debugging and return a 500
-        import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing RFP: {str(e)}")
-    finally:
-        if temp_file:
-            with contextlib.suppress(Exception):
-                with contextlib.suppress(Exception):
-                    os.remove(temp_file.name)
\ No newline at end of file
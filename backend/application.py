@@ -0,0 +1,136 @@
+import asyncio
+import os
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi import FastAPI
+from dotenv import load_dotenv
+import google.generativeai as genai
+from api import response_for_each, final_rfp, authendication,upload_rfp
+# from api.super_admin import super_admin
+from api.admin import admin
+from api.user import user
+from api.employee.employee import router as employee_router
+from api.all_company import router as company_router
+from api.super_admin import super_admin
+from api.fetch_username import router as fetch_username_router
+from api.rfp_messages import router as rfp_messages_router
+from api.employee.proposal_edit_llm import router as proposal_edit_llm_router
+from api.pdf_url import router as pdf_url_router
+from api.google_oauth import router as google_oauth_router
+from starlette.middleware.sessions import SessionMiddleware
+from api.forget_pass import router as forget_pass
+from api.jobs import router as jobs_router
+from agents.tools.company_doc_tool import get_vectorstore
+from methods.http_client import close_http_client
+from methods.process_pool import shutdown_process_pool
+from methods.llm_provider import get_gemini_model, provider_status
+from methods.llm_router import router_status
+from methods.embedding_cache import embedding_cache_stats
+from agents.retrieval import rerank_stats
+from methods.functions import engine
+from sqlalchemy import text
+from models.schema import Base
+# Initialize FastAPI app
+app = FastAPI(title="RFP Response Agent API")
+
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Add SessionMiddleware for OAuth2 session management
+app.add_middleware(SessionMiddleware, secret_key="your-secret-key")
+
+# Create necessary directories
+# os.makedirs("uploads", exist_ok=True)
+# os.makedirs("company_docs", exist_ok=True)
+# os.makedirs("outputs", exist_ok=True)
+# os.makedirs("vector_stores", exist_ok=True)
+
+
+# Load your .env
+load_dotenv()
+
+# Configure with your Gemini API key
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+
+# Optional: configure a model via environment variable (e.g. GEMINI_MODEL)
+# Do NOT call model.generate_content at import time — this can fail and will
+# block the application startup if the model name is invalid or unavailable.
+MODEL_NAME = os.getenv("GEMINI_MODEL", "")
+# Shared client (methods/llm_provider.py); None if the model is not available
+model = get_gemini_model(MODEL_NAME) if MODEL_NAME else None
+
+# Example usage (for local testing) — call this from a function or a route,
+# not at module import. If you want to verify available models, use the
+# SDK/ListModels method at runtime and pick a supported model name.
+
+# Health check endpoint
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {
+        "status": "ok",
+        "version": "1.0.0",
+        "llm_providers": provider_status(),
+        "llm_routes": router_status(),
+        "embedding_cache": embedding_cache_stats(),
+        "rerank": rerank_stats(),
+    }
+
+@app.on_event("startup")
+def create_missing_tables():
+    """Create tables added since the initial schema (existing tables are left untouched)"""
+    try:
+        with engine.begin() as conn:
+            # answer_cache stores embeddings
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    except Exception as e:
+        print(f"Warning: could not enable the pgvector extension: {e}")
+    try:
+        Base.metadata.create_all(bind=engine)
+    except Exception as e:
+        print(f"Warning: failed to create missing tables: {e}")
+    try:
+        with engine.begin() as conn:
+            # create_all does not add columns to tables that already exist
+            conn.execute(text("ALTER TABLE llm_call_logs ADD COLUMN IF NOT EXISTS units INTEGER"))
+    except Exception as e:
+        print(f"Warning: could not add missing columns: {e}")
+
+@app.on_event("startup")
+async def warm_vectorstore():
+    """Build the shared company_docs store once, before the first request needs it"""
+    try:
+        await asyncio.to_thread(get_vectorstore)
+    except Exception as e:
+        print(f"Warning: could not initialize the vector store: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_http_client():
+    """Release pooled download connections and extraction worker processes"""
+    await close_http_client()
+    shutdown_process_pool()
+
+# app.include_router(upload_company_docs.router)
+app.include_router(response_for_each.router)
+app.include_router(final_rfp.router)
+# app.include_router(download_doc.router)
+app.include_router(super_admin.router)
+app.include_router(authendication.router)
+app.include_router(admin.router)
+app.include_router(employee_router)
+app.include_router(user.router)
+app.include_router(company_router)
+app.include_router(upload_rfp.router)
+app.include_router(fetch_username_router)
+app.include_router(rfp_messages_router)
+app.include_router(proposal_edit_llm_router)
+app.include_router(pdf_url_router)
+app.include_router(google_oauth_router)
+app.include_router(forget_pass)
+app.include_router(jobs_router)
@@ -0,0 +1,100 @@
+"""Compare the structure-aware chunker with the old character splitter.
+
+Run from the backend directory:
+
+    python -m benchmarks.chunking_benchmark path/to/rfp1.pdf path/to/rfp2.docx
+    python -m benchmarks.chunking_benchmark --dir samples/ --repeat 5
+
+Without files a synthetic 200-section RFP is used. For each document and
+splitter it reports chunk count, characters emitted relative to the source
+(overlap duplication), token sizes under the embedding tokenizer, chunks over
+the 256-token embedding limit, and split throughput. Parsing is done once up
+front so only splitting is timed.
+"""
+import argparse
+import os
+import statistics
+import time
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from agents.chunking import CHUNK_MAX_TOKENS, StructureAwareSplitter, count_tokens
+from agents.document_loader import SUPPORTED_EXTENSIONS, iter_document_pages
+
+
+def synthetic_rfp(sections=200):
+    parts = ["REQUEST FOR PROPOSAL\nIssued by: City of Example\nProposal due date: March 3, 2025\n"]
+    for i in range(1, sections + 1):
+        parts.append(f"{i}. Scope Item {i}\n")
+        parts.append(
+            f"The vendor shall provide services for item {i} in accordance with the terms of this RFP. "
+            "Proposals must include staffing plans, timelines and pricing assumptions. " * 4
+        )
+        parts.append(f"\n\nQ{i}. Describe your approach to item {i} (maximum 300 words).\n\n")
+    return [("synthetic", "".join(parts))]
+
+
+def load_samples(paths):
+    samples = []
+    for path in paths:
+        pages = [page.page_content for page in iter_document_pages(path)]
+        samples.append((os.path.basename(path), "\n".join(pages)))
+    return samples
+
+
+def measure(splitter, text, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = splitter.split_text(text)
+        timings.append(time.perf_counter() - started)
+    tokens = [count_tokens(chunk) for chunk in chunks]
+    seconds = statistics.median(timings)
+    return {
+        "chunks": len(chunks),
+        "emitted_ratio": sum(len(c) for c in chunks) / max(len(text), 1),
+        "mean_tokens": statistics.mean(tokens) if tokens else 0,
+        "max_tokens": max(tokens, default=0),
+        "over_limit": sum(t > CHUNK_MAX_TOKENS for t in tokens),
+        "seconds": seconds,
+        "chars_per_sec": len(text) / seconds if seconds else float("inf"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("files", nargs="*")
+    parser.add_argument("--dir", help="benchmark every supported document in this directory")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    paths = list(args.files)
+    if args.dir:
+        paths += [
+            os.path.join(args.dir, name)
+            for name in sorted(os.listdir(args.dir))
+            if name.lower().endswith(SUPPORTED_EXTENSIONS)
+        ]
+    samples = load_samples(paths) if paths else synthetic_rfp()
+
+    splitters = {
+        "recursive-1000/200": RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200),
+        f"structure-{CHUNK_MAX_TOKENS}tok": StructureAwareSplitter(),
+    }
+    count_tokens("warm up")  # load the tokenizer outside the timed region
+
+    header = f"{'document':<28} {'splitter':<20} {'chunks':>7} {'emitted':>8} {'mean tok':>9} {'max tok':>8} {'>limit':>7} {'ms':>8} {'MB/s':>7}"
+    print(header)
+    print("-" * len(header))
+    for name, text in samples:
+        for label, splitter in splitters.items():
+            r = measure(splitter, text, args.repeat)
+            print(
+                f"{name[:28]:<28} {label:<20} {r['chunks']:>7} {r['emitted_ratio']:>7.2f}x "
+                f"{r['mean_tokens']:>9.1f} {r['max_tokens']:>8} {r['over_limit']:>7} "
+                f"{r['seconds'] * 1000:>8.1f} {r['chars_per_sec'] / 1e6:>7.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Compare the ReAct agent with single-pass retrieve-then-generate answering.
+
+Run from the backend directory against a real company and an extracted RFP
+(the structured_data returned by /upload-rfp/, saved as JSON):
+
+    python -m benchmarks.generation_benchmark structured.json --company-id 3 --items 10
+
+Items (sections, then questions) are answered one at a time in each mode so
+latencies are not skewed by concurrency. Reports per-item latency (median and
+p95), LLM calls per item, and answer length. Needs GROQ_API_KEY and
+VECTOR_DATABASE_URL like the API itself.
+"""
+import argparse
+import json
+import statistics
+import time
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+from api.response_for_each import GENERATION_MODES, build_answerer
+
+
+class LLMCallCounter(BaseCallbackHandler):
+    def __init__(self):
+        self.calls = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.calls += 1
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.calls += 1
+
+
+def queries(structured_data, limit):
+    items = [
+        f"Answer this RFP section based on our docs: {s['title']} - {s['content']}"
+        for s in structured_data.get("sections", [])
+    ] + [
+        f"Answer this RFP question based on our docs: {q['text']}"
+        for q in structured_data.get("questions", [])
+    ]
+    return items[:limit]
+
+
+def run_mode(mode, company_id, items):
+    answerer = build_answerer(company_id, mode)
+    latencies, calls, lengths, errors = [], [], [], 0
+    for query in items:
+        counter = LLMCallCounter()
+        started = time.perf_counter()
+        try:
+            answer = answerer.run(query, callbacks=[counter])
+        except Exception as e:
+            print(f"[{mode}] failed: {e}")
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+        calls.append(counter.calls)
+        lengths.append(len(answer.split()))
+    return latencies, calls, lengths, errors
+
+
+def p95(values):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("structured_data", help="JSON file with the extracted RFP structure")
+    parser.add_argument("--company-id", type=int, help="defaults to structured_data.company_id")
+    parser.add_argument("--items", type=int, default=10)
+    parser.add_argument("--modes", nargs="+", default=list(GENERATION_MODES), choices=GENERATION_MODES)
+    args = parser.parse_args()
+
+    with open(args.structured_data) as fh:
+        data = json.load(fh)
+    data = data.get("structured_data", data)
+    company_id = args.company_id or data["company_id"]
+    items = queries(data, args.items)
+    print(f"{len(items)} items, company {company_id}")
+
+    header = f"{'mode':<10} {'items':>5} {'errors':>6} {'median s':>9} {'p95 s':>7} {'calls/item':>10} {'words/answer':>12}"
+    print(header)
+    print("-" * len(header))
+    for mode in args.modes:
+        latencies, calls, lengths, errors = run_mode(mode, company_id, items)
+        if not latencies:
+            print(f"{mode:<10} {len(items):>5} {errors:>6}  (no successful calls)")
+            continue
+        print(
+            f"{mode:<10} {len(items):>5} {errors:>6} {statistics.median(latencies):>9.2f} {p95(latencies):>7.2f} "
+            f"{statistics.mean(calls):>10.1f} {statistics.mean(lengths):>12.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
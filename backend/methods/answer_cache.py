@@ -0,0 +1,182 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from methods.functions import SessionLocal
+from methods.telemetry import record_call
+from models.schema import AnswerCacheEntry
+
+# Per-company semantic answer cache.
+#
+# Tenants answer the same boilerplate ("describe your security certifications",
+# "company overview") in RFP after RFP. Section and question texts are
+# normalized and embedded; a previous answer from the same company whose
+# embedding is within ANSWER_CACHE_MIN_SIMILARITY (cosine) and younger than
+# ANSWER_CACHE_TTL_HOURS is reused instead of running the agent again. Adding
+# company documents invalidates that company's entries. The cache never fails a
+# generation: database errors are logged and treated as misses.
+#
+# all-MiniLM-L6-v2 only reads the first 256 word pieces, so two long sections
+# that open with the same boilerplate embed almost identically. Texts longer
+# than ANSWER_CACHE_EMBED_WORDS words are therefore only reused when the whole
+# normalized text matches, not on similarity alone.
+#
+# Storing an answer replaces the entry for the same normalized text (kind and
+# mode) instead of adding a row, and deletes the company's expired entries, so
+# the table stays bounded by live, distinct texts.
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") not in ("0", "false", "False")
+ANSWER_CACHE_MIN_SIMILARITY = float(os.getenv("ANSWER_CACHE_MIN_SIMILARITY", "0.92"))
+ANSWER_CACHE_TTL_HOURS = float(os.getenv("ANSWER_CACHE_TTL_HOURS", str(24 * 30)))
+ANSWER_CACHE_EMBED_WORDS = int(os.getenv("ANSWER_CACHE_EMBED_WORDS", "150"))  # fits the 256-piece window
+
+_stats = {"lookups": 0, "hits": 0, "seconds_saved": 0.0}
+_stats_lock = threading.Lock()
+
+
+def normalize_query(text: str) -> str:
+    """Lower-case, drop numbering/punctuation and collapse whitespace."""
+    text = text.lower()
+    text = re.sub(r"^\s*(?:q(?:uestion)?\s*)?\d+(?:\.\d+)*[.):]?\s+", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _embed(text):
+    from agents.tools.company_doc_tool import embeddings
+
+    return embeddings.embed_query(text)
+
+
+def _record(hit, seconds_saved=0.0):
+    with _stats_lock:
+        _stats["lookups"] += 1
+        if hit:
+            _stats["hits"] += 1
+            _stats["seconds_saved"] += seconds_saved
+
+
+def _expired_before():
+    return datetime.utcnow() - timedelta(hours=ANSWER_CACHE_TTL_HOURS)
+
+
+def lookup_answer(company_id, text, mode="agent"):
+    """Return ``(answer, embedding)``; ``answer`` is None on a miss.
+
+    The embedding is returned so a miss can be stored without embedding twice.
+    """
+    normalized = normalize_query(text)
+    if not ANSWER_CACHE_ENABLED or not normalized:
+        return None, None
+    started = time.perf_counter()
+    embedding = _embed(normalized)
+    db = SessionLocal()
+    try:
+        distance = AnswerCacheEntry.embedding.cosine_distance(embedding)
+        query = db.query(AnswerCacheEntry, distance.label("distance")).filter(
+            AnswerCacheEntry.company_id == company_id,
+            AnswerCacheEntry.mode == mode,
+            AnswerCacheEntry.created_at >= _expired_before(),
+        )
+        if len(normalized.split()) > ANSWER_CACHE_EMBED_WORDS:
+            # The embedding only saw the opening; the rest must match too
+            query = query.filter(AnswerCacheEntry.query_text == normalized)
+        row = query.order_by(distance).first()
+        if row is None or 1 - row.distance < ANSWER_CACHE_MIN_SIMILARITY:
+            _record(False)
+            return None, embedding
+        entry = row.AnswerCacheEntry
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.commit()
+        _record(True, entry.generation_seconds or 0.0)
+        record_call("llm", "answer_cache", mode, time.perf_counter() - started, cache_hit=True, endpoint="answer")
+        print(f"answer cache hit for company {company_id} (similarity {1 - row.distance:.3f})")
+        return entry.answer, embedding
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"answer cache lookup failed: {e}")
+        return None, embedding
+    finally:
+        db.close()
+
+
+def store_answer(company_id, kind, text, embedding, answer, generation_seconds, mode="agent"):
+    if not ANSWER_CACHE_ENABLED or embedding is None or not answer:
+        return
+    normalized = normalize_query(text)
+    db = SessionLocal()
+    try:
+        db.query(AnswerCacheEntry).filter(
+            AnswerCacheEntry.company_id == company_id,
+            AnswerCacheEntry.created_at < _expired_before(),
+        ).delete(synchronize_session=False)
+        entry = (
+            db.query(AnswerCacheEntry)
+            .filter(
+                AnswerCacheEntry.company_id == company_id,
+                AnswerCacheEntry.kind == kind,
+                AnswerCacheEntry.mode == mode,
+                AnswerCacheEntry.query_text == normalized,
+            )
+            .first()
+        )
+        if entry is None:
+            entry = AnswerCacheEntry(company_id=company_id, kind=kind, mode=mode, query_text=normalized, hit_count=0)
+            db.add(entry)
+        entry.embedding = embedding
+        entry.answer = answer
+        entry.generation_seconds = generation_seconds
+        entry.created_at = datetime.utcnow()
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"answer cache store failed: {e}")
+    finally:
+        db.close()
+
+
+def invalidate_company_answers(db, company_id) -> int:
+    """Drop every cached answer of a company (its documents changed)."""
+    try:
+        deleted = db.query(AnswerCacheEntry).filter(AnswerCacheEntry.company_id == company_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        return deleted
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"answer cache invalidation failed for company {company_id}: {e}")
+        return 0
+
+
+def answer_cache_stats(db, company_id=None) -> dict:
+    """Hit rate and time saved: this process since start, and all-time from the table."""
+    with _stats_lock:
+        process = dict(_stats)
+    process["hit_rate"] = round(process["hits"] / process["lookups"], 3) if process["lookups"] else 0.0
+    process["seconds_saved"] = round(process["seconds_saved"], 1)
+
+    query = db.query(
+        func.count(AnswerCacheEntry.id),
+        func.coalesce(func.sum(AnswerCacheEntry.hit_count), 0),
+        func.coalesce(func.sum(AnswerCacheEntry.hit_count * AnswerCacheEntry.generation_seconds), 0.0),
+    )
+    if company_id is not None:
+        query = query.filter(AnswerCacheEntry.company_id == company_id)
+    entries, hits, saved = query.one()
+    return {
+        "process": process,
+        "stored": {
+            "entries": entries,
+            "hits": int(hits),
+            # Every stored entry was one miss; every hit avoided one generation
+            "hit_rate": round(hits / (hits + entries), 3) if hits + entries else 0.0,
+            "seconds_saved": round(float(saved), 1),
+        },
+    }
@@ -0,0 +1,108 @@
+import hashlib
+import json
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from methods.functions import SessionLocal
+from models.schema import RFP, ResponseCheckpoint
+
+# Checkpoints for response generation.
+#
+# Every answered section, question and requirement is saved under its rfp_id as
+# soon as it completes. A retry (a failed job attempt, or a client calling
+# /generate-response again with "resume": true) loads them and only generates
+# the missing items; a normal run starts from scratch. Each checkpoint stores a
+# hash of its input item and generation mode, so items whose text changed after
+# re-extraction are answered again. Error answers are never checkpointed.
+#
+# Checkpoints only live until a run finishes with no failed item, and a
+# company's checkpoints are dropped when it uploads a new document, so answers
+# written before the new evidence existed are never replayed.
+
+
+def item_hash(item: dict, mode: str) -> str:
+    payload = json.dumps({"item": item, "mode": mode}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_checkpoints(rfp_id) -> dict:
+    """``{(kind, item_id): (item_hash, result)}`` for an RFP (empty on errors)."""
+    db = SessionLocal()
+    try:
+        rows = db.query(ResponseCheckpoint).filter(ResponseCheckpoint.rfp_id == rfp_id).all()
+        return {(row.kind, row.item_id): (row.item_hash, row.result) for row in rows}
+    except SQLAlchemyError as e:
+        print(f"failed to load checkpoints for rfp {rfp_id}: {e}")
+        return {}
+    finally:
+        db.close()
+
+
+def save_checkpoint(rfp_id, kind, item_id, digest, result):
+    """Insert or replace the checkpoint of one item."""
+    db = SessionLocal()
+    try:
+        row = (
+            db.query(ResponseCheckpoint)
+            .filter(
+                ResponseCheckpoint.rfp_id == rfp_id,
+                ResponseCheckpoint.kind == kind,
+                ResponseCheckpoint.item_id == str(item_id),
+            )
+            .first()
+        )
+        if row:
+            row.item_hash = digest
+            row.result = result
+        else:
+            db.add(ResponseCheckpoint(rfp_id=rfp_id, kind=kind, item_id=str(item_id), item_hash=digest, result=result))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"failed to save checkpoint {kind} {item_id} for rfp {rfp_id}: {e}")
+    finally:
+        db.close()
+
+
+def discard_checkpoints(rfp_id) -> int:
+    """Drop an RFP's checkpoints once its response is complete."""
+    db = SessionLocal()
+    try:
+        return clear_checkpoints(db, rfp_id)
+    finally:
+        db.close()
+
+
+def clear_company_checkpoints(db, company_id) -> int:
+    """Drop the checkpoints of every RFP of a company."""
+    try:
+        rfp_ids = db.query(RFP.id).filter(RFP.company_id == company_id)
+        deleted = db.query(ResponseCheckpoint).filter(ResponseCheckpoint.rfp_id.in_(rfp_ids.scalar_subquery())).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        return deleted
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"failed to clear checkpoints for company {company_id}: {e}")
+        return 0
+
+
+def clear_checkpoints(db, rfp_id) -> int:
+    try:
+        deleted = db.query(ResponseCheckpoint).filter(ResponseCheckpoint.rfp_id == rfp_id).delete(
+            synchronize_session=False
+        )
+        db.commit()
+        return deleted
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"failed to clear checkpoints for rfp {rfp_id}: {e}")
+        return 0
+
+
+def checkpoint_counts(db, rfp_id) -> dict:
+    counts = {"section": 0, "question": 0, "requirement": 0}
+    for (kind,) in db.query(ResponseCheckpoint.kind).filter(ResponseCheckpoint.rfp_id == rfp_id):
+        counts[kind] = counts.get(kind, 0) + 1
+    return counts
@@ -0,0 +1,90 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.documents import Document
+
+from agents.chunking import StructureAwareSplitter
+from agents.document_loader import iter_document_chunks
+from methods.excel_extraction import iter_excel_row_batches
+
+# Chunked, batched ingestion of company documents into pgvector.
+#
+# all-MiniLM-L6-v2 reads at most 256 word pieces, so a document embedded as a
+# single vector is mostly ignored. Documents are streamed page by page and
+# split into token-sized chunks (agents/chunking.py); workbooks are embedded as
+# small header-prefixed row batches. Chunks are embedded INGEST_EMBED_BATCH at
+# a time and every batch is written with one bulk insert. The insert of a batch
+# runs on a writer thread while the next batch is being embedded.
+#
+# Chunk metadata: company_id, source (file name), page (PDF, 0-based) or
+# sheet/first_row/last_row (XLSX), start_index/end_index (character offsets
+# into the page), tokens and the nearest heading.
+
+INGEST_EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+EXCEL_EMBED_ROWS = int(os.getenv("EXCEL_EMBED_ROWS", "10"))
+
+
+def iter_company_chunks(company_id, filename, file_bytes):
+    """Yield the embeddable chunks of an uploaded company document."""
+    if filename.lower().endswith(".xlsx"):
+        for sheet, first, last, text in iter_excel_row_batches(file_bytes, EXCEL_EMBED_ROWS):
+            yield Document(
+                page_content=text,
+                metadata={"company_id": company_id, "source": filename, "sheet": sheet, "first_row": first, "last_row": last},
+            )
+        return
+    for chunk in iter_document_chunks(file_bytes, filename, StructureAwareSplitter()):
+        if chunk.page_content.strip():
+            chunk.metadata["company_id"] = company_id
+            yield chunk
+
+
+def _batches(chunks, size):
+    batch = []
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest_document(vectorstore, company_id, filename, file_bytes, batch_size=None) -> dict:
+    """Chunk, embed and store one document; returns counts and throughput."""
+    batch_size = batch_size or INGEST_EMBED_BATCH
+    embeddings = vectorstore.embedding_function
+    stats = {"chunks": 0, "batches": 0, "characters": 0, "tokens": 0, "embed_seconds": 0.0}
+    started = time.perf_counter()
+    write = None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingest-writer") as writer:
+        for batch in _batches(iter_company_chunks(company_id, filename, file_bytes), batch_size):
+            texts = [chunk.page_content for chunk in batch]
+            embed_started = time.perf_counter()
+            vectors = embeddings.embed_documents(texts)
+            stats["embed_seconds"] += time.perf_counter() - embed_started
+            # At most one insert in flight: wait for the previous batch before queueing this one
+            if write is not None:
+                write.result()
+            write = writer.submit(vectorstore.add_embeddings, texts, vectors, [chunk.metadata for chunk in batch])
+            stats["chunks"] += len(batch)
+            stats["batches"] += 1
+            stats["characters"] += sum(len(text) for text in texts)
+            stats["tokens"] += sum(chunk.metadata.get("tokens") or 0 for chunk in batch)
+        if write is not None:
+            write.result()
+
+    total = time.perf_counter() - started
+    embed = stats["embed_seconds"]
+    stats.update(
+        embed_seconds=round(embed, 2),
+        total_seconds=round(total, 2),
+        chunks_per_second=round(stats["chunks"] / embed, 1) if embed else None,
+        tokens_per_second=round(stats["tokens"] / embed, 1) if embed and stats["tokens"] else None,
+    )
+    print(
+        f"ingested {filename} for company {company_id}: {stats['chunks']} chunks in {stats['batches']} batches, "
+        f"{stats['total_seconds']}s total, {stats['chunks_per_second']} chunks/s embedding"
+    )
+    return stats
@@ -0,0 +1,152 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from langchain_core.embeddings import Embeddings
+
+# LRU cache for query embeddings.
+#
+# Agents repeat the same CompanyDocTool query within one response, and section
+# titles ("Company overview", "Security") recur across RFPs; each one is a full
+# MiniLM forward pass on CPU. embed_query() results are kept in a bounded
+# process-local LRU keyed by model name + normalized text (whitespace collapsed,
+# lower-cased: all-MiniLM-L6-v2 is an uncased model, so case never changes the
+# vector). With EMBED_CACHE_REDIS_URL set, misses also check a shared Redis
+# tier so workers and API processes reuse each other's embeddings; if redis is
+# not installed or unreachable the cache stays process-local.
+#
+# Hits are recorded in llm_call_logs with cache_hit set (misses are recorded by
+# the wrapped TrackedEmbeddings), so the telemetry hit rate covers both tiers.
+#
+# Document embeddings (ingestion) are not cached: every chunk is new text and
+# would only evict useful query entries.
+
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "4096"))
+EMBED_CACHE_LOWERCASE = os.getenv("EMBED_CACHE_LOWERCASE", "1") == "1"
+EMBED_CACHE_REDIS_URL = os.getenv("EMBED_CACHE_REDIS_URL")
+EMBED_CACHE_SHARED_TTL = int(os.getenv("EMBED_CACHE_SHARED_TTL", str(7 * 24 * 3600)))
+
+_caches = []
+
+
+def normalize_text(text: str) -> str:
+    text = " ".join(text.split())
+    return text.lower() if EMBED_CACHE_LOWERCASE else text
+
+
+def _shared_client():
+    if not EMBED_CACHE_REDIS_URL:
+        return None
+    try:
+        import redis
+
+        client = redis.Redis.from_url(EMBED_CACHE_REDIS_URL, socket_timeout=0.2)
+        client.ping()
+        return client
+    except Exception as e:
+        print(f"shared embedding cache unavailable ({e}), using the process-local cache only")
+        return None
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps a LangChain embeddings object with an LRU cache for embed_query()."""
+
+    def __init__(self, embeddings, model_name, size=None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.size = size or EMBED_CACHE_SIZE
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.counters = {"hits": 0, "shared_hits": 0, "misses": 0}
+        self.shared = _shared_client()
+        _caches.append(self)
+
+    def _count(self, name):
+        with self.lock:
+            self.counters[name] += 1
+
+    def _shared_key(self, key):
+        return f"emb:{self.model_name}:{hashlib.sha1(key.encode('utf-8')).hexdigest()}"
+
+    def _shared_get(self, key):
+        if self.shared is None:
+            return None
+        try:
+            import numpy as np
+
+            raw = self.shared.get(self._shared_key(key))
+            return tuple(np.frombuffer(raw, dtype=np.float32).tolist()) if raw else None
+        except Exception as e:
+            print(f"shared embedding cache read failed: {e}")
+            return None
+
+    def _shared_set(self, key, vector):
+        if self.shared is None:
+            return
+        try:
+            import numpy as np
+
+            self.shared.set(self._shared_key(key), np.asarray(vector, dtype=np.float32).tobytes(), ex=EMBED_CACHE_SHARED_TTL)
+        except Exception as e:
+            print(f"shared embedding cache write failed: {e}")
+
+    def _record_hit(self, provider, started):
+        from methods.telemetry import record_call
+
+        record_call("embedding", provider, self.model_name, time.perf_counter() - started, cache_hit=True)
+
+    def embed_query(self, text):
+        started = time.perf_counter()
+        key = normalize_text(text)
+        with self.lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                self.counters["hits"] += 1
+        if vector is not None:
+            self._record_hit("local", started)
+            return list(vector)
+        vector = self._shared_get(key)
+        if vector is not None:
+            self._count("shared_hits")
+            self._record_hit("redis", started)
+        else:
+            self._count("misses")
+            vector = tuple(self.embeddings.embed_query(key))
+            self._shared_set(key, vector)
+        with self.lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+        return list(vector)
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    def stats(self) -> dict:
+        with self.lock:
+            counters = dict(self.counters)
+            size = len(self.entries)
+        lookups = sum(counters.values())
+        return {
+            "model": self.model_name,
+            **counters,
+            "hit_rate": round((counters["hits"] + counters["shared_hits"]) / lookups, 3) if lookups else 0.0,
+            "size": size,
+            "max_size": self.size,
+            "shared": self.shared is not None,
+        }
+
+
+def embedding_cache_stats() -> list:
+    """Counters of every embedding cache in this process."""
+    return [cache.stats() for cache in _caches]
@@ -0,0 +1,138 @@
+import io
+import os
+
+from methods.process_pool import POOL_WORKERS, SharedMemoryReader, copy_to_shared_memory, get_process_pool
+
+# Streaming Excel extraction.
+#
+# Workbooks are opened with openpyxl in read-only mode, which parses the sheet
+# XML incrementally instead of building a cell object for every cell. Rows are
+# emitted in batches of EXCEL_BATCH_ROWS, each prefixed with the sheet's header
+# row, so a 100k-row pricing sheet becomes a stream of small, self-describing
+# text blocks that can go straight into chunking and embedding.
+#
+# Workbooks with several sheets above EXCEL_PARALLEL_MIN_BYTES are processed
+# one sheet per task on the shared process pool. A task returns its sheet's
+# batches in one piece, so only sheets of at most EXCEL_PARALLEL_MAX_ROWS rows
+# go to the pool; larger (or undimensioned) sheets are streamed in-process.
+# Workers read the workbook straight from shared memory, without a copy.
+
+EXCEL_BATCH_ROWS = int(os.getenv("EXCEL_BATCH_ROWS", "200"))
+EXCEL_PARALLEL_MIN_BYTES = int(os.getenv("EXCEL_PARALLEL_MIN_BYTES", str(2 * 1024 * 1024)))
+EXCEL_PARALLEL_MAX_ROWS = int(os.getenv("EXCEL_PARALLEL_MAX_ROWS", "20000"))
+
+
+def _format_row(row):
+    return " | ".join("" if cell is None else str(cell) for cell in row)
+
+
+def _iter_sheet_batches(worksheet, batch_rows):
+    """Yield (first_row, last_row, text) for non-empty rows of one read-only sheet."""
+    header, header_row = None, None
+    batch, first, last, emitted = [], None, None, False
+    for index, row in enumerate(worksheet.iter_rows(values_only=True), start=1):
+        if not any(cell is not None and str(cell).strip() for cell in row):
+            continue
+        line = _format_row(row)
+        if header is None:
+            header, header_row = line, index
+            continue
+        if first is None:
+            first = index
+        last = index
+        batch.append(line)
+        if len(batch) >= batch_rows:
+            yield first, last, "\n".join([header, *batch])
+            batch, first, emitted = [], None, True
+    if batch:
+        yield first, last, "\n".join([header, *batch])
+    elif header is not None and not emitted:
+        # Sheet with a single non-empty row
+        yield header_row, header_row, header
+
+
+def _open_workbook(stream):
+    import openpyxl
+
+    return openpyxl.load_workbook(stream, read_only=True, data_only=True)
+
+
+def _sheet_worker(shm_name, size, sheet_name, batch_rows):
+    """Worker: all row batches of one (bounded-size) sheet."""
+    with SharedMemoryReader(shm_name, size) as raw:
+        workbook = _open_workbook(io.BufferedReader(raw))
+        try:
+            return list(_iter_sheet_batches(workbook[sheet_name], batch_rows))
+        finally:
+            workbook.close()
+
+
+def _pool_sized(worksheet):
+    # max_row comes from the sheet's <dimension> tag; None when the writer omitted it
+    rows = worksheet.max_row
+    return rows is not None and rows <= EXCEL_PARALLEL_MAX_ROWS
+
+
+def iter_excel_row_batches(source, batch_rows=None):
+    """Yield ``(sheet_name, first_row, last_row, text)`` batches for every sheet, in order.
+
+    ``source`` may be a path, bytes or a binary buffer.
+    """
+    # Imported here: agents.document_loader imports this module
+    from agents.document_loader import open_source
+
+    batch_rows = batch_rows or EXCEL_BATCH_ROWS
+    stream = open_source(source, use_mmap=False)
+    owns_stream = isinstance(source, (str, os.PathLike))
+    try:
+        workbook = _open_workbook(stream)
+        sheet_names = workbook.sheetnames
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+
+        parallel = POOL_WORKERS > 1 and len(sheet_names) >= 2 and size >= EXCEL_PARALLEL_MIN_BYTES
+        pooled = {name for name in sheet_names if _pool_sized(workbook[name])} if parallel else set()
+        if len(pooled) < 2:
+            try:
+                for name in sheet_names:
+                    for first, last, text in _iter_sheet_batches(workbook[name], batch_rows):
+                        yield name, first, last, text
+            finally:
+                workbook.close()
+            return
+
+        shm, size = copy_to_shared_memory(stream)
+        futures = {}
+        try:
+            pool = get_process_pool()
+            # Pool sheets are submitted ahead (bounded); results are yielded in sheet order
+            ahead = iter([name for name in sheet_names if name in pooled])
+
+            def submit_ahead():
+                while len(futures) < POOL_WORKERS and (name := next(ahead, None)) is not None:
+                    futures[name] = pool.submit(_sheet_worker, shm.name, size, name, batch_rows)
+
+            for name in sheet_names:
+                submit_ahead()
+                if name in pooled:
+                    batches = futures.pop(name).result()
+                else:
+                    batches = _iter_sheet_batches(workbook[name], batch_rows)
+                for first, last, text in batches:
+                    yield name, first, last, text
+        finally:
+            for future in futures.values():
+                future.cancel()
+            workbook.close()
+            shm.close()
+            shm.unlink()
+    finally:
+        if owns_stream:
+            stream.close()
+
+
+def extract_excel_text(source) -> str:
+    """Whole-workbook text, built from the streamed batches."""
+    return "\n".join(
+        f"[{sheet}]\n{text}" for sheet, _, _, text in iter_excel_row_batches(source)
+    )
@@ -0,0 +1,134 @@
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from methods.http_client import download_bytes
+from methods.pdf_extraction import extract_pdf_text
+from models.schema import RFP, RFPExtractedText
+
+# Persisted, versioned text of the generated proposal artifacts (rfp.pdf_url /
+# rfp.docx_url). Text is written once when /employee/ok generates the files and
+# then served from a small in-process LRU or the rfp_extracted_texts table, so
+# the edit endpoints no longer download and re-parse S3 files on every click.
+# Rows are matched on source_url, so replacing an artifact invalidates its text.
+
+TEXT_CACHE_SIZE = int(os.getenv("EXTRACTED_TEXT_CACHE_SIZE", "128"))
+
+_cache = OrderedDict()  # (rfp_id, artifact, source_url) -> text
+_cache_lock = threading.Lock()
+
+
+def _cache_get(key):
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+    return None
+
+
+def _cache_put(key, text):
+    with _cache_lock:
+        _cache[key] = text
+        _cache.move_to_end(key)
+        while len(_cache) > TEXT_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def _cache_drop(rfp_id):
+    with _cache_lock:
+        for key in [k for k in _cache if k[0] == rfp_id]:
+            del _cache[key]
+
+
+def extract_docx_text(data: bytes) -> str:
+    import docx
+
+    doc = docx.Document(BytesIO(data))
+    return "\n".join([p.text for p in doc.paragraphs])
+
+
+def _artifact(rfp: RFP, artifact=None):
+    if artifact == "pdf" or (artifact is None and rfp.pdf_url):
+        return "pdf", rfp.pdf_url
+    if artifact == "docx" or (artifact is None and rfp.docx_url):
+        return "docx", rfp.docx_url
+    return None, None
+
+
+def store_rfp_text(db: Session, rfp_id: int, artifact: str, source_url: str, text: str):
+    """Persist a new version of an artifact's text."""
+    try:
+        latest = (
+            db.query(func.max(RFPExtractedText.version))
+            .filter(RFPExtractedText.rfp_id == rfp_id, RFPExtractedText.artifact == artifact)
+            .scalar()
+        ) or 0
+        db.add(RFPExtractedText(
+            rfp_id=rfp_id,
+            artifact=artifact,
+            source_url=source_url,
+            version=latest + 1,
+            text=text,
+        ))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"failed to store extracted text for rfp {rfp_id}: {e}")
+    _cache_put((rfp_id, artifact, source_url), text)
+
+
+def get_rfp_text(db: Session, rfp: RFP, artifact: str = None, fetch: bool = True):
+    """Text of the RFP's current pdf (preferred) or docx artifact.
+
+    Looks in the process cache, then the database. With ``fetch=True`` a miss
+    downloads and extracts the file once and stores the result; with
+    ``fetch=False`` a miss returns None.
+    """
+    artifact, url = _artifact(rfp, artifact)
+    if not url:
+        return None
+    key = (rfp.id, artifact, url)
+    text = _cache_get(key)
+    if text is not None:
+        return text
+
+    row = (
+        db.query(RFPExtractedText)
+        .filter(
+            RFPExtractedText.rfp_id == rfp.id,
+            RFPExtractedText.artifact == artifact,
+            RFPExtractedText.source_url == url,
+        )
+        .order_by(RFPExtractedText.version.desc())
+        .first()
+    )
+    if row:
+        _cache_put(key, row.text)
+        return row.text
+    if not fetch:
+        return None
+
+    print(f"extracted text miss for rfp {rfp.id} ({artifact}), downloading {url}")
+    data = download_bytes(url)
+    text = extract_pdf_text(data) if artifact == "pdf" else extract_docx_text(data)
+    store_rfp_text(db, rfp.id, artifact, url, text)
+    return text
+
+
+def invalidate_rfp_text(db: Session, rfp_id: int, keep_urls=()):
+    """Drop stored text for artifacts that are no longer current."""
+    _cache_drop(rfp_id)
+    try:
+        query = db.query(RFPExtractedText).filter(RFPExtractedText.rfp_id == rfp_id)
+        if keep_urls:
+            query = query.filter(RFPExtractedText.source_url.notin_(list(keep_urls)))
+        query.delete(synchronize_session=False)
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"failed to invalidate extracted text for rfp {rfp_id}: {e}")
@@ -13,7 +13,6 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
 
 import docx  # For Word
-import openpyxl  # For Excel
 from io import BytesIO
 
 # Configuration
@@ -146,27 +145,16 @@ def get_company_from_subdomain(subdomain: str, db: Session):
     return company
 
 
-from langchain_community.document_loaders import PyPDFLoader
-from typing import List
+from agents.document_loader import iter_document_text
+from methods.excel_extraction import extract_excel_text
 
 def extract_text_from_pdf(file_path: str) -> str:
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    # Combine all page contents into a single string
-    return "\n".join([doc.page_content for doc in documents])
+    # Pages are parsed lazily and only their text is kept
+    return "\n".join(iter_document_text(file_path))
 
-import tempfile
 def extract_text_from_pdf_bytes(file_bytes: bytes) -> str:
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp.write(file_bytes)
-        tmp.flush()
-        tmp_path = tmp.name
-
-    try:
-        text = extract_text_from_pdf(tmp_path)
-    finally:
-        os.remove(tmp_path)
-    return text
+    # Parse straight from memory; no temporary file needed
+    return "\n".join(iter_document_text(file_bytes, "document.pdf"))
 
 
 def extract_text_from_docx(file_bytes: bytes) -> str:
@@ -174,10 +162,5 @@ def extract_text_from_docx(file_bytes: bytes) -> str:
     return "\n".join([para.text for para in doc.paragraphs])
 
 def extract_text_from_excel(file_bytes: bytes) -> str:
-    wb = openpyxl.load_workbook(BytesIO(file_bytes), data_only=True)
-    text_chunks = []
-    for sheet in wb.worksheets:
-        for row in sheet.iter_rows(values_only=True):
-            line = ' | '.join([str(cell) if cell is not None else '' for cell in row])
-            text_chunks.append(line)
-    return "\n".join(text_chunks)
+    # Read-only streaming; rows are emitted in header-prefixed batches
+    return extract_excel_text(file_bytes)
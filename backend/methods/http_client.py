@@ -0,0 +1,103 @@
+import io
+import os
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+from fastapi import HTTPException
+
+# Shared, pooled HTTP client used for downloading RFP files from S3 / HTTP(S).
+# Keeping one client per process lets connections to the bucket be reused
+# instead of paying TCP + TLS setup on every upload.
+DOWNLOAD_TIMEOUT = float(os.getenv("DOWNLOAD_TIMEOUT", "30"))
+MAX_DOWNLOAD_BYTES = int(os.getenv("MAX_DOWNLOAD_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+_async_client: Optional[httpx.AsyncClient] = None
+_sync_client: Optional[httpx.Client] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the process-wide async HTTP client, creating it on first use."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(
+            timeout=DOWNLOAD_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _async_client
+
+
+def get_sync_http_client() -> httpx.Client:
+    """Pooled client for synchronous (threadpool) endpoints."""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(
+            timeout=DOWNLOAD_TIMEOUT,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20),
+        )
+    return _sync_client
+
+
+async def close_http_client():
+    """Close the shared clients (called on application shutdown)."""
+    global _async_client, _sync_client
+    if _async_client is not None and not _async_client.is_closed:
+        await _async_client.aclose()
+    _async_client = None
+    if _sync_client is not None and not _sync_client.is_closed:
+        _sync_client.close()
+    _sync_client = None
+
+
+def file_extension_from_url(url: str, default: str = "") -> str:
+    """Return the lower-cased extension of the path part of a URL (query strings ignored)."""
+    return os.path.splitext(urlparse(url).path)[1].lower() or default
+
+
+async def download_to_buffer(url: str) -> io.BytesIO:
+    """Stream a remote file into an in-memory buffer without blocking the event loop.
+
+    The returned buffer is rewound to position 0 and can be handed straight to
+    the document parsers. Raises HTTPException on HTTP errors or oversized files.
+    """
+    client = get_http_client()
+    buffer = io.BytesIO()
+    try:
+        async with client.stream("GET", url) as response:
+            if response.status_code != 200:
+                body = (await response.aread())[:500]
+                print(f"download failed, status={response.status_code}, text={body!r}")
+                raise HTTPException(status_code=400, detail="Failed to download file from URL")
+
+            declared = response.headers.get("content-length")
+            if declared and declared.isdigit() and int(declared) > MAX_DOWNLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="File is too large to process")
+
+            async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                buffer.write(chunk)
+                if buffer.tell() > MAX_DOWNLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File is too large to process")
+    except httpx.HTTPError as e:
+        print(f"download error for {url}: {e!r}")
+        raise HTTPException(status_code=400, detail="Failed to download file from URL")
+
+    buffer.seek(0)
+    return buffer
+
+
+def download_bytes(url: str) -> bytes:
+    """Blocking download on the pooled sync client, for code already running in a thread."""
+    try:
+        response = get_sync_http_client().get(url)
+    except httpx.HTTPError as e:
+        print(f"download error for {url}: {e!r}")
+        raise HTTPException(status_code=400, detail="Failed to download file from URL")
+    if response.status_code != 200:
+        print(f"download failed, status={response.status_code}, text={response.text[:500]}")
+        raise HTTPException(status_code=400, detail="Failed to download file from URL")
+    if len(response.content) > MAX_DOWNLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File is too large to process")
+    return response.content
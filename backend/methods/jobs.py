@@ -0,0 +1,164 @@
+import os
+import traceback
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from methods.functions import SessionLocal
+from models.schema import Job
+
+# Postgres-backed job queue.
+#
+# Jobs are claimed with SELECT ... FOR UPDATE SKIP LOCKED so any number of
+# worker processes can poll the same table. Running jobs send heartbeats; a job
+# whose heartbeat is older than JOB_STALE_SECONDS (worker crashed or restarted)
+# is picked up again by the next poll, unless it has used up its attempts, in
+# which case it is marked failed ("worker lost").
+
+JOB_STALE_SECONDS = int(os.getenv("JOB_STALE_SECONDS", "300"))
+JOB_RETRY_BASE_SECONDS = int(os.getenv("JOB_RETRY_BASE_SECONDS", "10"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+
+
+class NonRetryableJobError(Exception):
+    """Raised by job handlers for failures a retry cannot fix (bad input, missing RFP)."""
+
+
+def enqueue_job(db: Session, kind: str, payload: dict, rfp_id=None, company_id=None) -> Job:
+    job = Job(
+        kind=kind,
+        payload=payload,
+        rfp_id=rfp_id,
+        company_id=company_id,
+        max_attempts=JOB_MAX_ATTEMPTS,
+        run_after=datetime.utcnow(),
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _attempts_left():
+    return func.coalesce(Job.attempts, 0) < func.coalesce(Job.max_attempts, JOB_MAX_ATTEMPTS)
+
+
+def fail_lost_jobs(db: Session) -> int:
+    """Mark stale running jobs that have no attempts left as failed."""
+    now = datetime.utcnow()
+    lost = (
+        db.query(Job)
+        .filter(
+            Job.status == "running",
+            Job.heartbeat_at < now - timedelta(seconds=JOB_STALE_SECONDS),
+            ~_attempts_left(),
+        )
+        .update(
+            {
+                Job.status: "failed",
+                Job.error: "worker lost: heartbeat stale after the last attempt",
+                Job.locked_by: None,
+                Job.finished_at: now,
+            },
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    if lost:
+        print(f"marked {lost} stale job(s) with no attempts left as failed")
+    return lost
+
+
+def claim_next_job(db: Session, worker_id: str):
+    """Lock and mark the next runnable job as running, or return None."""
+    fail_lost_jobs(db)
+    now = datetime.utcnow()
+    stale_before = now - timedelta(seconds=JOB_STALE_SECONDS)
+    job = (
+        db.query(Job)
+        .filter(or_(
+            and_(Job.status == "queued", Job.run_after <= now),
+            and_(Job.status == "running", Job.heartbeat_at < stale_before, _attempts_left()),
+        ))
+        .order_by(Job.created_at)
+        .with_for_update(skip_locked=True)
+        .first()
+    )
+    if not job:
+        db.commit()
+        return None
+    if job.status == "running":
+        print(f"reclaiming stale job {job.id} from {job.locked_by}")
+    job.status = "running"
+    job.locked_by = worker_id
+    job.heartbeat_at = now
+    job.attempts = (job.attempts or 0) + 1
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def update_job_progress(job_id: str, progress: int = None, stage: str = None):
+    """Record progress and refresh the heartbeat; safe to call from any thread."""
+    db = SessionLocal()
+    try:
+        values = {Job.heartbeat_at: datetime.utcnow()}
+        if progress is not None:
+            values[Job.progress] = max(0, min(100, int(progress)))
+        if stage is not None:
+            values[Job.stage] = stage
+        db.query(Job).filter(Job.id == job_id, Job.status == "running").update(values, synchronize_session=False)
+        db.commit()
+    except Exception:
+        db.rollback()
+        traceback.print_exc()
+    finally:
+        db.close()
+
+
+def complete_job(db: Session, job: Job, result: dict):
+    job.status = "succeeded"
+    job.progress = 100
+    job.stage = "done"
+    job.result = result
+    job.finished_at = datetime.utcnow()
+    job.locked_by = None
+    db.commit()
+
+
+def fail_job(db: Session, job: Job, error: str, retryable: bool = True):
+    """Requeue with exponential backoff, or mark failed once attempts are used up."""
+    job.error = error[-4000:]
+    job.locked_by = None
+    if retryable and (job.attempts or 0) < (job.max_attempts or JOB_MAX_ATTEMPTS):
+        delay = JOB_RETRY_BASE_SECONDS * (2 ** ((job.attempts or 1) - 1))
+        job.status = "queued"
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        print(f"job {job.id} failed (attempt {job.attempts}), retrying in {delay}s")
+    else:
+        job.status = "failed"
+        job.finished_at = datetime.utcnow()
+        print(f"job {job.id} failed permanently: {error[:200]}")
+    db.commit()
+
+
+def job_to_dict(job: Job, include_result: bool = True) -> dict:
+    data = {
+        "job_id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress or 0,
+        "stage": job.stage,
+        "attempts": job.attempts or 0,
+        "max_attempts": job.max_attempts,
+        "rfp_id": job.rfp_id,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if include_result:
+        data["result"] = job.result
+    return data
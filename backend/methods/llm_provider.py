@@ -0,0 +1,269 @@
+import os
+import random
+import threading
+import time
+
+import google.generativeai as genai
+
+from methods.telemetry import record_call
+from methods.token_budget import estimate_tokens, usage_from_response
+
+# Process-wide LLM provider layer.
+#
+# Clients are created once per process and reused, so HTTP/gRPC connections to
+# Gemini and Groq stay alive between requests. Every call goes through
+# call_llm(), which
+#   - caps concurrent calls per provider (LLM_<PROVIDER>_CONCURRENCY),
+#   - retries 429 / 5xx / connection errors with exponential backoff + jitter,
+#   - opens a per-provider circuit breaker after LLM_BREAKER_FAILURES
+#     consecutive failures, failing fast for LLM_BREAKER_COOLDOWN seconds
+#     instead of hammering a provider that is down.
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "1.0"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_COOLDOWN = float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+PROVIDERS = ("gemini", "groq")
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = (
+    "RateLimit", "TooManyRequests", "ResourceExhausted", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "Timeout", "APIConnectionError", "ConnectError", "RemoteProtocolError",
+)
+
+
+class LLMUnavailableError(Exception):
+    """The provider's circuit is open; the call was not attempted."""
+
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half-open after the cooldown."""
+
+    def __init__(self, name, failures=None, cooldown=None):
+        self.name = name
+        self.max_failures = failures or LLM_BREAKER_FAILURES
+        self.cooldown = cooldown or LLM_BREAKER_COOLDOWN
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: let calls through again once the cooldown has passed
+            return time.monotonic() - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        with self.lock:
+            if self.opened_at is not None:
+                print(f"llm circuit for {self.name} closed")
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.max_failures:
+                if self.opened_at is None:
+                    print(f"llm circuit for {self.name} opened after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+
+_breakers = {name: CircuitBreaker(name) for name in PROVIDERS}
+_semaphores = {
+    name: threading.BoundedSemaphore(int(os.getenv(f"LLM_{name.upper()}_CONCURRENCY", "8")))
+    for name in PROVIDERS
+}
+
+
+def _status_code(exc):
+    for attr in ("status_code", "code", "status"):
+        value = getattr(exc, attr, None)
+        value = value() if callable(value) else value
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def is_retryable(exc) -> bool:
+    """Rate limits, server errors and transport failures; not bad requests or auth errors."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return isinstance(exc, (ConnectionError, TimeoutError)) or any(
+        name in type(exc).__name__ for name in RETRYABLE_NAMES
+    )
+
+
+def call_llm(provider, fn, *args, **kwargs):
+    """Run ``fn(*args, **kwargs)`` under the provider's limits, retries and breaker."""
+    breaker = _breakers[provider]
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        if not breaker.allow():
+            raise LLMUnavailableError(f"{provider} is unavailable (circuit open), try again shortly")
+        try:
+            with _semaphores[provider]:
+                result = fn(*args, **kwargs)
+            breaker.record_success()
+            return result
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            breaker.record_failure()
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            delay = min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+            print(f"{provider} call failed ({type(e).__name__}: {e}), retry {attempt + 1} in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def log_usage(provider, model_name, response, prompt_text=None, label=None, seconds=None):
+    """Log and record token counts for one call (estimated when the provider does not report them)."""
+    prompt_tokens, completion_tokens = usage_from_response(response)
+    estimated = prompt_tokens is None
+    if prompt_tokens is None and prompt_text is not None:
+        prompt_tokens = estimate_tokens(prompt_text if isinstance(prompt_text, str) else str(prompt_text))
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(getattr(response, "text", None) or "")
+    print(
+        f"llm usage provider={provider} model={model_name} label={label or '-'} "
+        f"prompt_tokens={prompt_tokens} completion_tokens={completion_tokens}{' (estimated)' if estimated else ''}"
+    )
+    record_call("llm", provider, model_name, seconds, prompt_tokens, completion_tokens, endpoint=label)
+    return prompt_tokens, completion_tokens
+
+
+def tracked_call(provider, model_name, prompt_text, label, fn, *args, **kwargs):
+    """call_llm() plus usage logging and a telemetry record (failed calls are recorded too)."""
+    started = time.perf_counter()
+    try:
+        response = call_llm(provider, fn, *args, **kwargs)
+    except Exception as e:
+        record_call("llm", provider, model_name, time.perf_counter() - started, success=False, error=e, endpoint=label)
+        raise
+    try:
+        log_usage(provider, model_name, response, prompt_text, label, time.perf_counter() - started)
+    except Exception as e:
+        print(f"failed to log {provider} usage: {e}")
+    return response
+
+
+def provider_available(provider) -> bool:
+    """Configured and not behind an open circuit."""
+    if provider == "gemini" and not (os.getenv("GEMINI_MODEL") and (os.getenv("GEMINI_API_KEY") or os.getenv("GOOGLE_API_KEY"))):
+        return False
+    if provider == "groq" and not os.getenv("GROQ_API_KEY"):
+        return False
+    return _breakers[provider].allow()
+
+
+def provider_status() -> dict:
+    return {name: {"circuit": breaker.state(), "failures": breaker.failures} for name, breaker in _breakers.items()}
+
+
+# Gemini
+
+_gemini_models = {}
+_gemini_lock = threading.Lock()
+_gemini_configured = False
+
+
+def get_gemini_model(model_name=None):
+    """Cached GenerativeModel for ``model_name`` (default GEMINI_MODEL), or None if not configured."""
+    global _gemini_configured
+    model_name = model_name or os.getenv("GEMINI_MODEL")
+    if not model_name:
+        return None
+    with _gemini_lock:
+        if not _gemini_configured:
+            if os.getenv("GEMINI_API_KEY"):
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+            _gemini_configured = True
+        if model_name not in _gemini_models:
+            try:
+                _gemini_models[model_name] = genai.GenerativeModel(model_name)
+            except Exception as e:
+                print(f"Failed to initialize Gemini model '{model_name}': {e}")
+                return None
+        return _gemini_models[model_name]
+
+
+def generate_content(model, prompt, label=None, **kwargs):
+    """``model.generate_content`` with retries, concurrency cap and circuit breaker.
+
+    ``label`` names the caller in the usage log line.
+    """
+    return tracked_call("gemini", getattr(model, "model_name", "?"), prompt, label, model.generate_content, prompt, **kwargs)
+
+
+_gemini_chats = {}
+
+
+def _resilient_chat_gemini_class():
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    class ResilientChatGemini(ChatGoogleGenerativeAI):
+        """ChatGoogleGenerativeAI whose every completion goes through call_llm()."""
+
+        def _generate(self, messages, *args, **kwargs):
+            prompt_text = "\n".join(str(m.content) for m in messages)
+            return tracked_call("gemini", self.model, prompt_text, None, super()._generate, messages, *args, **kwargs)
+
+    return ResilientChatGemini
+
+
+def get_gemini_chat(model_name=None):
+    """Process-wide LangChain chat client for Gemini (used where a chat model is expected), or None."""
+    model_name = model_name or os.getenv("GEMINI_MODEL")
+    if not model_name:
+        return None
+    with _gemini_lock:
+        if model_name not in _gemini_chats:
+            chat_class = _resilient_chat_gemini_class()
+            # Without GEMINI_API_KEY the client falls back to GOOGLE_API_KEY, like genai does
+            key = {"google_api_key": os.getenv("GEMINI_API_KEY")} if os.getenv("GEMINI_API_KEY") else {}
+            # Retries are done by call_llm(), not the SDK
+            _gemini_chats[model_name] = chat_class(model=model_name, max_retries=1, **key)
+        return _gemini_chats[model_name]
+
+
+# Groq (LangChain chat model, shared by agents and direct calls)
+
+_groq_chats = {}
+_groq_lock = threading.Lock()
+
+
+def _resilient_chat_groq_class():
+    from langchain_groq import ChatGroq
+
+    class ResilientChatGroq(ChatGroq):
+        """ChatGroq whose every completion goes through call_llm()."""
+
+        def _generate(self, messages, *args, **kwargs):
+            prompt_text = "\n".join(str(m.content) for m in messages)
+            return tracked_call("groq", self.model_name, prompt_text, None, super()._generate, messages, *args, **kwargs)
+
+    return ResilientChatGroq
+
+
+def get_groq_chat(model_name=None):
+    """Process-wide ChatGroq client (keeps its HTTP connection pool between requests)."""
+    model_name = model_name or GROQ_MODEL
+    with _groq_lock:
+        if model_name not in _groq_chats:
+            chat_class = _resilient_chat_groq_class()
+            # Retries are done by call_llm(), not the SDK
+            _groq_chats[model_name] = chat_class(
+                model_name=model_name, groq_api_key=os.getenv("GROQ_API_KEY"), max_retries=0
+            )
+        return _groq_chats[model_name]
@@ -0,0 +1,231 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from methods.llm_provider import (
+    LLMUnavailableError,
+    generate_content,
+    get_gemini_chat,
+    get_gemini_model,
+    get_groq_chat,
+    provider_available,
+)
+from methods.telemetry import telemetry_context, with_current_context
+
+# Multi-provider routing with hedged requests.
+#
+# Every routed call names an endpoint ("answer", "compliance", "going_to_edit",
+# ...). The endpoint's policy lists the providers in order of preference and
+# whether slow calls are hedged:
+#   - the call goes to the first available provider;
+#   - if it has not answered within that provider's p95 latency for the
+#     endpoint, the same request is also sent to the next provider, the first
+#     answer wins and the other call is cancelled (a call that is already
+#     running cannot be interrupted, so its result is discarded);
+#   - if a provider fails or its circuit is open, the next one is tried
+#     straight away (failover, with or without hedging).
+# Hedging at p95 duplicates about 5% of calls. It is off by default for the
+# long proposal generations, where a duplicate costs a whole document.
+#
+# Policies can be overridden per endpoint:
+#   LLM_ROUTE_<ENDPOINT>=groq,gemini   provider order (a single provider disables failover)
+#   LLM_HEDGE_<ENDPOINT>=1|0           hedge slow calls or not
+
+LLM_HEDGING = os.getenv("LLM_HEDGING", "1") == "1"
+LLM_HEDGE_QUANTILE = float(os.getenv("LLM_HEDGE_QUANTILE", "0.95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "10"))  # until there are enough samples
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+LLM_ROUTER_WORKERS = int(os.getenv("LLM_ROUTER_WORKERS", "64"))
+
+POLICIES = {
+    # Short per-item generations: hedge the tail
+    "answer": {"providers": ("groq", "gemini"), "hedge": True},
+    "compliance": {"providers": ("groq", "gemini"), "hedge": True},
+    "fallback": {"providers": ("gemini", "groq"), "hedge": True},
+    # Whole-document generations: fail over, but do not pay for duplicates
+    "going_to_edit": {"providers": ("gemini", "groq"), "hedge": False},
+    "custom_prompt_edit": {"providers": ("gemini", "groq"), "hedge": False},
+    "final_proposal": {"providers": ("gemini", "groq"), "hedge": False},
+    "employee_final_rfp": {"providers": ("gemini", "groq"), "hedge": False},
+}
+DEFAULT_POLICY = {"providers": ("gemini", "groq"), "hedge": False}
+
+
+def get_policy(endpoint) -> dict:
+    policy = dict(POLICIES.get(endpoint, DEFAULT_POLICY))
+    key = endpoint.upper()
+    if route := os.getenv(f"LLM_ROUTE_{key}"):
+        policy["providers"] = tuple(p.strip() for p in route.split(",") if p.strip())
+    if (hedge := os.getenv(f"LLM_HEDGE_{key}")) is not None:
+        policy["hedge"] = hedge == "1"
+    policy["hedge"] = policy["hedge"] and LLM_HEDGING
+    return policy
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per (endpoint, provider)."""
+
+    def __init__(self, window=None):
+        self.window = window or LLM_LATENCY_WINDOW
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, provider, seconds):
+        with self.lock:
+            self.samples.setdefault((endpoint, provider), deque(maxlen=self.window)).append(seconds)
+
+    def quantile(self, endpoint, provider, q=None):
+        """Latency quantile, or None while there are fewer than LLM_HEDGE_MIN_SAMPLES samples."""
+        with self.lock:
+            samples = sorted(self.samples.get((endpoint, provider), ()))
+        if len(samples) < LLM_HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * (q or LLM_HEDGE_QUANTILE)))]
+
+    def hedge_delay(self, endpoint, provider):
+        delay = self.quantile(endpoint, provider)
+        return max(LLM_HEDGE_MIN_DELAY, LLM_HEDGE_DEFAULT_DELAY if delay is None else delay)
+
+
+latency = LatencyTracker()
+_pool = ThreadPoolExecutor(max_workers=LLM_ROUTER_WORKERS, thread_name_prefix="llm-router")
+_stats = {}
+_stats_lock = threading.Lock()
+
+
+def _count(endpoint, name):
+    with _stats_lock:
+        counts = _stats.setdefault(endpoint, {"calls": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0})
+        counts[name] += 1
+
+
+def _timed(endpoint, provider, fn):
+    # Timed inside the worker so queueing in the pool is not counted as provider latency
+    started = time.monotonic()
+    with telemetry_context(endpoint=endpoint):
+        result = fn()
+    latency.record(endpoint, provider, time.monotonic() - started)
+    return result
+
+
+def hedged_call(endpoint, calls):
+    """Run one request through the endpoint's policy.
+
+    ``calls`` maps provider name to a zero-argument callable making the request
+    with that provider; providers missing from it are skipped. Returns the
+    first successful result, or raises the last error if every provider failed.
+    """
+    policy = get_policy(endpoint)
+    order = [p for p in policy["providers"] if p in calls and provider_available(p)]
+    if not order:
+        raise LLMUnavailableError(f"no LLM provider available for {endpoint}")
+    _count(endpoint, "calls")
+
+    pending = {}
+    errors = []
+    hedges = set()
+    next_provider = 0
+
+    def launch():
+        nonlocal next_provider
+        provider = order[next_provider]
+        next_provider += 1
+        pending[_pool.submit(with_current_context(_timed), endpoint, provider, calls[provider])] = provider
+
+    launch()
+    hedge_at = time.monotonic() + latency.hedge_delay(endpoint, order[0])
+    while pending:
+        can_hedge = policy["hedge"] and next_provider < len(order)
+        timeout = max(0.0, hedge_at - time.monotonic()) if can_hedge else None
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            print(f"llm hedge endpoint={endpoint}: {order[0]} slower than p95, also asking {order[next_provider]}")
+            _count(endpoint, "hedged")
+            hedges.add(order[next_provider])
+            launch()
+            continue
+        for future in done:
+            provider = pending.pop(future)
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"llm call endpoint={endpoint} provider={provider} failed: {type(e).__name__}: {e}")
+                errors.append(e)
+                continue
+            # Queued losers are cancelled; running ones finish in the background and are ignored
+            for loser in pending:
+                loser.cancel()
+            if provider in hedges:
+                _count(endpoint, "hedge_wins")
+            return result
+        if not pending and next_provider < len(order):
+            print(f"llm failover endpoint={endpoint}: trying {order[next_provider]}")
+            _count(endpoint, "failovers")
+            launch()
+    raise errors[-1]
+
+
+def route_available(endpoint) -> bool:
+    """At least one provider of the endpoint's policy is configured."""
+    return any(provider_available(p) for p in get_policy(endpoint)["providers"])
+
+
+def generate_text(endpoint, prompt) -> str:
+    """Plain prompt -> text completion routed through the endpoint's policy."""
+
+    def gemini():
+        return getattr(generate_content(get_gemini_model(), prompt, label=endpoint), "text", "")
+
+    def groq():
+        return get_groq_chat().invoke(prompt).content
+
+    return hedged_call(endpoint, {"gemini": gemini, "groq": groq})
+
+
+_chat_clients = {"gemini": get_gemini_chat, "groq": get_groq_chat}
+_routed_chats = {}
+_routed_lock = threading.Lock()
+
+
+def _routed_chat_class():
+    from langchain_core.language_models.chat_models import BaseChatModel
+
+    class RoutedChat(BaseChatModel):
+        """Chat model for agents and chains whose completions go through hedged_call()."""
+
+        endpoint: str = "answer"
+
+        @property
+        def _llm_type(self):
+            return "routed"
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            calls = {}
+            for provider in get_policy(self.endpoint)["providers"]:
+                if provider_available(provider) and (chat := _chat_clients[provider]()) is not None:
+                    calls[provider] = lambda chat=chat: chat._generate(messages, stop=stop, **kwargs)
+            return hedged_call(self.endpoint, calls)
+
+    return RoutedChat
+
+
+def get_routed_chat(endpoint):
+    """Process-wide LangChain chat model routed through ``endpoint``'s policy."""
+    with _routed_lock:
+        if endpoint not in _routed_chats:
+            _routed_chats[endpoint] = _routed_chat_class()(endpoint=endpoint)
+        return _routed_chats[endpoint]
+
+
+def router_status() -> dict:
+    """Call/hedge counters and current hedge delays per endpoint."""
+    with _stats_lock:
+        stats = {endpoint: dict(counts) for endpoint, counts in _stats.items()}
+    for endpoint, counts in stats.items():
+        providers = get_policy(endpoint)["providers"]
+        counts["p95_seconds"] = {p: latency.quantile(endpoint, p) for p in providers}
+    return stats
@@ -0,0 +1,89 @@
+import io
+import os
+
+from methods.process_pool import POOL_WORKERS, copy_to_shared_memory, get_process_pool, read_shared_memory
+
+# Shared PDF text extraction service.
+#
+# pypdf is pure Python and CPU bound, so large PDFs are split into page ranges
+# that are extracted in a process pool. The PDF bytes are copied once into
+# shared memory and workers attach to it by name, so only (name, start, end)
+# is pickled per task. Small files are extracted in-process where the pool
+# round-trip would cost more than it saves. Set PDF_POOL_WORKERS=0 to disable.
+
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+PDF_PARALLEL_MIN_BYTES = int(os.getenv("PDF_PARALLEL_MIN_BYTES", str(1024 * 1024)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+
+def _extract_range(shm_name, size, start, end):
+    """Worker: extract the text of pages [start, end) from a PDF in shared memory.
+
+    The reader is built per task and dropped with it, so an idle worker does
+    not keep the last document's bytes and parsed objects alive.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(io.BytesIO(read_shared_memory(shm_name, size)))
+    return [reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def iter_pdf_page_texts(source):
+    """Yield the text of every page of a PDF, in order.
+
+    ``source`` may be a path, bytes or a binary buffer. Large documents are
+    extracted in parallel; at most two tasks per worker are in flight so
+    memory stays bounded while pages are consumed.
+    """
+    from pypdf import PdfReader
+
+    # Imported here: agents.document_loader imports this module
+    from agents.document_loader import open_source
+
+    stream = open_source(source)
+    owns_stream = isinstance(source, (str, os.PathLike))
+    try:
+        reader = PdfReader(stream)
+        page_count = len(reader.pages)
+        stream.seek(0, os.SEEK_END)
+        size = stream.tell()
+
+        if (
+            POOL_WORKERS <= 1
+            or page_count < PDF_PARALLEL_MIN_PAGES
+            or size < PDF_PARALLEL_MIN_BYTES
+        ):
+            for page in reader.pages:
+                yield page.extract_text() or ""
+            return
+
+        del reader
+        shm, size = copy_to_shared_memory(stream)
+        futures = []
+        try:
+            pool = get_process_pool()
+            ranges = [
+                (start, min(start + PDF_PAGES_PER_TASK, page_count))
+                for start in range(0, page_count, PDF_PAGES_PER_TASK)
+            ]
+            max_in_flight = POOL_WORKERS * 2
+            next_range = 0
+            while next_range < len(ranges) or futures:
+                while next_range < len(ranges) and len(futures) < max_in_flight:
+                    start, end = ranges[next_range]
+                    futures.append(pool.submit(_extract_range, shm.name, size, start, end))
+                    next_range += 1
+                yield from futures.pop(0).result()
+        finally:
+            for future in futures:
+                future.cancel()
+            shm.close()
+            shm.unlink()
+    finally:
+        if owns_stream:
+            stream.close()
+
+
+def extract_pdf_text(source, separator="\n") -> str:
+    """Extract the full text of a PDF (path, bytes or buffer) as one string."""
+    return separator.join(iter_pdf_page_texts(source))
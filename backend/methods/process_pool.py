@@ -0,0 +1,106 @@
+import io
+import mmap
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+# Process pool shared by the CPU-bound document extractors (PDF pages, Excel
+# sheets). Input files are copied once into shared memory and workers attach
+# to the segment by name, so tasks only pickle a name and a range.
+# Set PDF_POOL_WORKERS=0 (or 1) to keep all extraction in-process.
+#
+# Workers are spawned, so each one re-imports the entry script (main.py keeps
+# that import light) and costs a fresh interpreter; the default is capped.
+
+POOL_WORKERS = int(os.getenv("PDF_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_pool = None
+
+
+def get_process_pool():
+    global _pool
+    if _pool is None:
+        # spawn: forking a threaded server process is not safe
+        _pool = ProcessPoolExecutor(
+            max_workers=POOL_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_process_pool():
+    """Stop the worker processes (called on application shutdown)."""
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def copy_to_shared_memory(stream):
+    """Copy a BytesIO/mmap/file stream into a new shared memory segment.
+
+    Returns ``(shm, size)``; the caller must ``close()`` and ``unlink()`` it.
+    """
+    if hasattr(stream, "getbuffer"):
+        view = stream.getbuffer()
+    elif isinstance(stream, mmap.mmap):
+        view = memoryview(stream)
+    else:
+        stream.seek(0)
+        view = memoryview(stream.read())
+    try:
+        size = view.nbytes
+        shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+        shm.buf[:size] = view
+    finally:
+        view.release()
+    return shm, size
+
+
+def read_shared_memory(shm_name, size) -> bytes:
+    """Worker side: copy the bytes out of a shared memory segment."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+
+class SharedMemoryReader(io.RawIOBase):
+    """Worker side: seekable read-only file over a shared memory segment, without copying it.
+
+    Close it (or use it as a context manager) to detach from the segment.
+    """
+
+    def __init__(self, shm_name, size):
+        super().__init__()
+        self._shm = shared_memory.SharedMemory(name=shm_name)
+        self._view = self._shm.buf[:size]
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = max(0, min(len(buffer), len(self._view) - self._pos))
+        buffer[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+            self._shm.close()
+        super().close()
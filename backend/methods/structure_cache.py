@@ -0,0 +1,89 @@
+import hashlib
+import os
+from datetime import datetime
+
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from agents.document_loader import CHUNKER
+from agents.extract_rfp_structure import EXTRACTOR_VERSION
+from models.schema import RFPStructureCache
+
+# Content-addressed cache of extract_rfp_structure() results.
+# Key = SHA-256 of the raw file bytes + extractor version (and chunker) + model
+# name, so a new prompt/merge version or a different GEMINI_MODEL never serves stale entries.
+
+
+def content_hash(buffer) -> str:
+    """SHA-256 hex digest of a bytes object or BytesIO buffer (without copying it)."""
+    data = buffer.getbuffer() if hasattr(buffer, "getbuffer") else buffer
+    return hashlib.sha256(data).hexdigest()
+
+
+def _cache_key():
+    # The chunker changes what the LLM paths see, so it is part of the version
+    return f"{EXTRACTOR_VERSION}-{CHUNKER}", os.getenv("GEMINI_MODEL", "")
+
+
+def get_cached_structure(db: Session, digest: str):
+    """Return a cached structure for ``digest`` or None. Cache errors never fail the upload."""
+    version, model_name = _cache_key()
+    try:
+        entry = (
+            db.query(RFPStructureCache)
+            .filter(
+                RFPStructureCache.content_hash == digest,
+                RFPStructureCache.extractor_version == version,
+                RFPStructureCache.model_name == model_name,
+            )
+            .first()
+        )
+        if not entry:
+            return None
+        entry.hit_count = (entry.hit_count or 0) + 1
+        entry.last_hit_at = datetime.utcnow()
+        db.commit()
+        return dict(entry.structured_data)
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"structure cache lookup failed: {e}")
+        return None
+
+
+def store_structure(db: Session, digest: str, structured_data: dict):
+    """Insert (or refresh) the cache entry for ``digest``."""
+    version, model_name = _cache_key()
+    try:
+        entry = (
+            db.query(RFPStructureCache)
+            .filter(
+                RFPStructureCache.content_hash == digest,
+                RFPStructureCache.extractor_version == version,
+                RFPStructureCache.model_name == model_name,
+            )
+            .first()
+        )
+        if entry:
+            entry.structured_data = structured_data
+            entry.created_at = datetime.utcnow()
+        else:
+            db.add(RFPStructureCache(
+                content_hash=digest,
+                extractor_version=version,
+                model_name=model_name,
+                structured_data=structured_data,
+            ))
+        db.commit()
+    except SQLAlchemyError as e:
+        db.rollback()
+        print(f"structure cache store failed: {e}")
+
+
+def invalidate_structures(db: Session, digest: str = None) -> int:
+    """Delete cache entries for one file hash (all versions) or the whole cache."""
+    query = db.query(RFPStructureCache)
+    if digest:
+        query = query.filter(RFPStructureCache.content_hash == digest)
+    deleted = query.delete(synchronize_session=False)
+    db.commit()
+    return deleted
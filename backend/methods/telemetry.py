@@ -0,0 +1,233 @@
+import atexit
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from langchain_core.embeddings import Embeddings
+from sqlalchemy import func
+from sqlalchemy.exc import SQLAlchemyError
+
+from models.schema import LLMCallLog
+
+# LLM / embedding call telemetry.
+#
+# Every LLM call, embedding call and cache hit is recorded with its endpoint,
+# rfp_id, company_id, provider, model, token counts and latency. Records are
+# buffered in memory and written to llm_call_logs in batches by a background
+# thread (every TELEMETRY_FLUSH_SECONDS or TELEMETRY_BATCH_SIZE records), so
+# recording never waits on the database. If the database is down the buffer
+# keeps at most TELEMETRY_MAX_BUFFER records and drops the oldest.
+#
+# rfp_id / company_id / endpoint come from a context variable: code that works
+# on one RFP calls bind_telemetry() or telemetry_context() once and every call
+# below it is attributed, including calls made from asyncio.to_thread. Plain
+# thread pools do not copy context variables; submit with_current_context(fn)
+# to them instead of fn.
+
+TELEMETRY_ENABLED = os.getenv("TELEMETRY_ENABLED", "1") not in ("0", "false", "False")
+TELEMETRY_BATCH_SIZE = int(os.getenv("TELEMETRY_BATCH_SIZE", "200"))
+TELEMETRY_FLUSH_SECONDS = float(os.getenv("TELEMETRY_FLUSH_SECONDS", "5"))
+TELEMETRY_MAX_BUFFER = int(os.getenv("TELEMETRY_MAX_BUFFER", "10000"))
+
+GROUP_BY = ("company", "rfp", "endpoint", "provider")
+
+_context = contextvars.ContextVar("telemetry_context", default={})
+_buffer = deque()
+_buffer_lock = threading.Lock()
+_wakeup = threading.Event()
+_flusher = None
+_dropped = 0
+
+
+def bind_telemetry(**fields):
+    """Attribute calls for the rest of the current task/thread (None values are ignored)."""
+    _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+
+
+@contextmanager
+def telemetry_context(**fields):
+    """Attribute calls inside the block; the previous attribution is restored afterwards."""
+    token = _context.set({**_context.get(), **{k: v for k, v in fields.items() if v is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def with_current_context(fn):
+    """``fn`` bound to a copy of the caller's context, for thread pools."""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.copy().run(fn, *args, **kwargs)
+
+
+def record_call(kind, provider, model=None, latency_seconds=0.0, prompt_tokens=None, completion_tokens=None,
+                cache_hit=False, success=True, error=None, endpoint=None, units=None):
+    """Queue one telemetry record; never raises."""
+    global _dropped
+    if not TELEMETRY_ENABLED:
+        return
+    context = _context.get()
+    row = {
+        "created_at": datetime.utcnow(),
+        "kind": kind,
+        "endpoint": endpoint or context.get("endpoint"),
+        "rfp_id": context.get("rfp_id"),
+        "company_id": context.get("company_id"),
+        "provider": provider,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "units": units,
+        "latency_seconds": round(float(latency_seconds or 0.0), 4),
+        "cache_hit": cache_hit,
+        "success": success,
+        "error": str(error)[:500] if error else None,
+    }
+    with _buffer_lock:
+        if len(_buffer) >= TELEMETRY_MAX_BUFFER:
+            _buffer.popleft()
+            _dropped += 1
+        _buffer.append(row)
+        full = len(_buffer) >= TELEMETRY_BATCH_SIZE
+    _ensure_flusher()
+    if full:
+        _wakeup.set()
+
+
+def flush_telemetry() -> int:
+    """Write buffered records now; returns how many were written."""
+    global _dropped
+    from methods.functions import SessionLocal
+
+    written = 0
+    while True:
+        with _buffer_lock:
+            rows = [_buffer.popleft() for _ in range(min(TELEMETRY_BATCH_SIZE, len(_buffer)))]
+            dropped, _dropped = _dropped, 0
+        if dropped:
+            print(f"telemetry buffer full, dropped {dropped} record(s)")
+        if not rows:
+            return written
+        db = SessionLocal()
+        try:
+            db.bulk_insert_mappings(LLMCallLog, rows)
+            db.commit()
+            written += len(rows)
+        except SQLAlchemyError as e:
+            db.rollback()
+            print(f"failed to write {len(rows)} telemetry record(s): {e}")
+            # Put them back for the next attempt (oldest first)
+            with _buffer_lock:
+                _buffer.extendleft(reversed(rows))
+                while len(_buffer) > TELEMETRY_MAX_BUFFER:
+                    _buffer.popleft()
+                    _dropped += 1
+            return written
+        finally:
+            db.close()
+
+
+def _flush_loop():
+    while True:
+        _wakeup.wait(TELEMETRY_FLUSH_SECONDS)
+        _wakeup.clear()
+        try:
+            flush_telemetry()
+        except Exception as e:
+            print(f"telemetry flush failed: {e}")
+
+
+def _ensure_flusher():
+    global _flusher
+    if _flusher is not None:
+        return
+    with _buffer_lock:
+        if _flusher is None:
+            _flusher = threading.Thread(target=_flush_loop, name="telemetry-flush", daemon=True)
+            _flusher.start()
+            atexit.register(flush_telemetry)
+
+
+class TrackedEmbeddings(Embeddings):
+    """Wraps a LangChain embeddings object and records every embedding call."""
+
+    def __init__(self, embeddings, provider="huggingface"):
+        self.embeddings = embeddings
+        self.provider = provider
+        self.model = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None)
+
+    def _tracked(self, fn, texts):
+        from methods.token_budget import estimate_tokens
+
+        started = time.perf_counter()
+        try:
+            result = fn(texts)
+        except Exception as e:
+            record_call("embedding", self.provider, self.model, time.perf_counter() - started, success=False, error=e)
+            raise
+        tokens = sum(estimate_tokens(t) for t in texts) if isinstance(texts, list) else estimate_tokens(texts)
+        record_call("embedding", self.provider, self.model, time.perf_counter() - started, prompt_tokens=tokens)
+        return result
+
+    def embed_documents(self, texts):
+        return self._tracked(self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text):
+        return self._tracked(self.embeddings.embed_query, text)
+
+    async def aembed_documents(self, texts):
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text):
+        return self.embed_query(text)
+
+
+def usage_summary(db, group_by="company", company_id=None, rfp_id=None, since_hours=None) -> list:
+    """Calls, tokens and latency aggregated by company, rfp, endpoint or provider."""
+    column = {
+        "company": LLMCallLog.company_id,
+        "rfp": LLMCallLog.rfp_id,
+        "endpoint": LLMCallLog.endpoint,
+        "provider": LLMCallLog.provider,
+    }[group_by]
+    calls = func.count(LLMCallLog.id)
+    query = db.query(
+        column.label("key"),
+        calls.label("calls"),
+        calls.filter((LLMCallLog.kind == "llm") & LLMCallLog.cache_hit.is_(False)).label("llm_calls"),
+        calls.filter(LLMCallLog.kind == "embedding").label("embedding_calls"),
+        calls.filter(LLMCallLog.cache_hit.is_(True)).label("cache_hits"),
+        calls.filter(LLMCallLog.success.is_(False)).label("failures"),
+        func.coalesce(func.sum(LLMCallLog.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(LLMCallLog.completion_tokens), 0).label("completion_tokens"),
+        func.coalesce(func.sum(LLMCallLog.units).filter(LLMCallLog.kind == "rerank"), 0).label("rerank_pairs"),
+        func.coalesce(func.sum(LLMCallLog.latency_seconds), 0.0).label("total_seconds"),
+        func.percentile_cont(0.95).within_group(LLMCallLog.latency_seconds).label("p95_seconds"),
+    )
+    if company_id is not None:
+        query = query.filter(LLMCallLog.company_id == company_id)
+    if rfp_id is not None:
+        query = query.filter(LLMCallLog.rfp_id == rfp_id)
+    if since_hours:
+        query = query.filter(LLMCallLog.created_at >= datetime.utcnow() - timedelta(hours=since_hours))
+    rows = query.group_by(column).order_by(func.sum(LLMCallLog.latency_seconds).desc()).all()
+    return [
+        {
+            group_by: row.key,
+            "calls": row.calls,
+            "llm_calls": row.llm_calls,
+            "embedding_calls": row.embedding_calls,
+            "cache_hits": row.cache_hits,
+            "failures": row.failures,
+            "prompt_tokens": int(row.prompt_tokens),
+            "completion_tokens": int(row.completion_tokens),
+            "rerank_pairs": int(row.rerank_pairs),
+            "total_seconds": round(float(row.total_seconds), 2),
+            "p95_seconds": round(float(row.p95_seconds), 3) if row.p95_seconds is not None else None,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,139 @@
+import json
+import math
+
+# Token counting and prompt budgeting.
+#
+# Token counts use tiktoken's cl100k_base when it is installed and a
+# characters / 4 estimate otherwise; neither is exact for Gemini or Llama, so
+# budgets should keep some headroom. Over-budget text is cut at a paragraph or
+# sentence boundary (keeping the opening, which is where RFP sections state what
+# they ask for), lists of context are filled greedily in relevance order, and
+# structured data is serialized as compact JSON without empty fields.
+
+CHARS_PER_TOKEN = 4
+TRUNCATION_MARKER = " [...]"
+
+_encoding = None
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"tiktoken unavailable ({e}), estimating tokens as characters / {CHARS_PER_TOKEN}")
+            _encoding = False
+    return _encoding
+
+
+def estimate_tokens(text) -> int:
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def truncate_to_budget(text, max_tokens) -> str:
+    """Return ``text`` unchanged if it fits, else its opening cut at a natural boundary."""
+    if not text or max_tokens <= 0 or estimate_tokens(text) <= max_tokens:
+        return text or ""
+    # Start from a proportional character estimate and shrink until it fits
+    limit = int(len(text) * max_tokens / estimate_tokens(text))
+    while limit > 0:
+        head = text[:limit]
+        cut = max(head.rfind("\n\n"), head.rfind(". "), head.rfind("\n"))
+        if cut > limit * 0.6:
+            head = head[:cut + 1]
+        head = head.rstrip() + TRUNCATION_MARKER
+        if estimate_tokens(head) <= max_tokens:
+            return head
+        limit = int(limit * 0.9)
+    return ""
+
+
+def select_within_budget(texts, max_tokens, separator="\n\n"):
+    """Keep texts in the given (relevance) order until the budget is used up.
+
+    The first text that does not fit is truncated into the remaining space.
+    """
+    selected, used = [], 0
+    separator_tokens = estimate_tokens(separator)
+    for text in texts:
+        remaining = max_tokens - used - (separator_tokens if selected else 0)
+        if remaining <= 0:
+            break
+        tokens = estimate_tokens(text)
+        if tokens > remaining:
+            text = truncate_to_budget(text, remaining)
+            if text:
+                selected.append(text)
+            break
+        selected.append(text)
+        used += tokens + (separator_tokens if len(selected) > 1 else 0)
+    return selected
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        pruned = {k: _prune(v) for k, v in value.items()}
+        return {k: v for k, v in pruned.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_prune(v) for v in value if v not in (None, "", [], {})]
+    return value
+
+
+def compact_json(data) -> str:
+    """JSON without whitespace or empty fields (a Python repr costs ~30% more tokens)."""
+    return json.dumps(_prune(data), separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def fit_json_to_budget(data, max_tokens, text_fields=("answer", "evidence", "content")):
+    """Compact JSON for ``data``; long string fields are truncated evenly until it fits."""
+    text = compact_json(data)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    data = json.loads(text)
+    strings = []
+
+    def collect(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in text_fields and isinstance(value, str):
+                    strings.append((node, key))
+                else:
+                    collect(value)
+        elif isinstance(node, list):
+            for value in node:
+                collect(value)
+
+    collect(data)
+    if not strings:
+        return text
+    # Give every long field an equal share of what is left after the skeleton
+    skeleton = estimate_tokens(text) - sum(estimate_tokens(node[key]) for node, key in strings)
+    share = max(20, (max_tokens - skeleton) // len(strings))
+    for node, key in strings:
+        node[key] = truncate_to_budget(node[key], share)
+    return compact_json(data)
+
+
+def _count(value):
+    return value if isinstance(value, int) else None
+
+
+def usage_from_response(response):
+    """(prompt_tokens, completion_tokens) from a Gemini response or LangChain result, if reported."""
+    meta = getattr(response, "usage_metadata", None)
+    if meta is not None and not isinstance(meta, dict):
+        return _count(getattr(meta, "prompt_token_count", None)), _count(getattr(meta, "candidates_token_count", None))
+    if isinstance(meta, dict):
+        return _count(meta.get("input_tokens")), _count(meta.get("output_tokens"))
+    llm_output = getattr(response, "llm_output", None) or {}
+    usage = llm_output.get("token_usage") or {}
+    return _count(usage.get("prompt_tokens")), _count(usage.get("completion_tokens"))
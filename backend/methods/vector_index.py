@@ -0,0 +1,202 @@
+import os
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from models.schema import CompanyDocChunk, VectorBase
+
+# Company document chunks with an ANN index and a real company_id column.
+#
+# LangChain's PGVector keeps every tenant in one collection and filters on
+# cmetadata->>'company_id', which no index serves: each retrieval scanned all
+# tenants' embeddings. company_doc_chunks stores company_id as a btree-indexed
+# column and the embeddings under an HNSW (default) or IVFFlat index with
+# cosine ops. For a small tenant the planner reads its rows through the btree
+# and sorts them exactly; for a large one it walks the ANN index. Recall/speed
+# is tuned per query with VECTOR_EF_SEARCH (HNSW) or VECTOR_PROBES (IVFFlat).
+# A plain ANN scan returns ef_search candidates before the company filter is
+# applied, so a small tenant can get fewer than k rows. On pgvector >= 0.8 the
+# scan is made iterative (strict_order, detected at startup) and keeps going
+# until k rows pass the filter; VECTOR_ITERATIVE_SCAN=off|relaxed_order|
+# strict_order overrides the detection.
+#
+# Existing rows of the company_docs collection are copied over by
+# backfill_company_chunks (idempotent). With VECTOR_BACKFILL=auto (default) it
+# runs at startup while company_doc_chunks is still empty and the old
+# collection has rows, i.e. on the first start after upgrading; the copied
+# rows then mark it as done. VECTOR_BACKFILL=1 runs it on every start (to pick
+# up rows written by an older instance), 0 never.
+
+VECTOR_INDEX = os.getenv("VECTOR_INDEX", "hnsw")  # hnsw | ivfflat | none
+VECTOR_HNSW_M = int(os.getenv("VECTOR_HNSW_M", "16"))
+VECTOR_HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", "64"))
+VECTOR_EF_SEARCH = int(os.getenv("VECTOR_EF_SEARCH", "100"))
+VECTOR_IVFFLAT_LISTS = int(os.getenv("VECTOR_IVFFLAT_LISTS", "100"))
+VECTOR_PROBES = int(os.getenv("VECTOR_PROBES", "10"))
+VECTOR_ITERATIVE_SCAN = os.getenv("VECTOR_ITERATIVE_SCAN", "auto")  # auto | off | relaxed_order | strict_order
+
+INDEX_DDL = {
+    "hnsw": (
+        "CREATE INDEX IF NOT EXISTS ix_company_doc_chunks_embedding_hnsw ON company_doc_chunks "
+        "USING hnsw (embedding vector_cosine_ops) WITH (m = {m}, ef_construction = {ef_construction})"
+    ),
+    "ivfflat": (
+        "CREATE INDEX IF NOT EXISTS ix_company_doc_chunks_embedding_ivfflat ON company_doc_chunks "
+        "USING ivfflat (embedding vector_cosine_ops) WITH (lists = {lists})"
+    ),
+}
+
+BACKFILL_SQL = """
+    INSERT INTO company_doc_chunks (company_id, content, metadata, embedding, source_id, created_at)
+    SELECT (e.cmetadata->>'company_id')::int, e.document, e.cmetadata::jsonb, e.embedding::vector(384),
+           e.uuid::text, now()
+    FROM langchain_pg_embedding e
+    JOIN langchain_pg_collection c ON c.uuid = e.collection_id
+    WHERE c.name = :collection
+      AND e.document IS NOT NULL
+      AND e.cmetadata->>'company_id' ~ '^[0-9]+$'
+    ON CONFLICT (source_id) DO NOTHING
+"""
+
+
+def create_chunk_tables(engine):
+    """Create company_doc_chunks and its ANN index if missing."""
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+    VectorBase.metadata.create_all(bind=engine)
+    if VECTOR_INDEX in INDEX_DDL:
+        with engine.begin() as conn:
+            conn.execute(text(INDEX_DDL[VECTOR_INDEX].format(
+                m=VECTOR_HNSW_M, ef_construction=VECTOR_HNSW_EF_CONSTRUCTION, lists=VECTOR_IVFFLAT_LISTS
+            )))
+
+
+def backfill_pending(engine, collection="company_docs") -> bool:
+    """True while company_doc_chunks is empty but the LangChain collection has rows."""
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('langchain_pg_embedding')")).scalar() is None:
+            return False
+        if conn.execute(text("SELECT EXISTS (SELECT 1 FROM company_doc_chunks)")).scalar():
+            return False
+        return bool(conn.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM langchain_pg_embedding e "
+            "JOIN langchain_pg_collection c ON c.uuid = e.collection_id WHERE c.name = :collection)"
+        ), {"collection": collection}).scalar())
+
+
+def backfill_company_chunks(engine, collection="company_docs") -> int:
+    """Copy rows of the LangChain collection that are not in company_doc_chunks yet."""
+    with engine.begin() as conn:
+        if conn.execute(text("SELECT to_regclass('langchain_pg_embedding')")).scalar() is None:
+            return 0
+        copied = conn.execute(text(BACKFILL_SQL), {"collection": collection}).rowcount
+    if copied:
+        print(f"backfilled {copied} chunk(s) from the {collection} collection")
+    return copied
+
+
+def detect_iterative_scan(engine) -> str:
+    """Iterative scan mode to use: the configured one, or strict_order on pgvector >= 0.8."""
+    if VECTOR_ITERATIVE_SCAN != "auto":
+        return "" if VECTOR_ITERATIVE_SCAN == "off" else VECTOR_ITERATIVE_SCAN
+    try:
+        with engine.connect() as conn:
+            version = conn.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        major, minor = (int(part) for part in (version or "0.0").split(".")[:2])
+    except Exception as e:
+        print(f"could not read the pgvector version ({e}), iterative index scans disabled")
+        return ""
+    if (major, minor) < (0, 8):
+        print(f"pgvector {version} has no iterative index scans; small tenants may get fewer than k chunks")
+        return ""
+    return "strict_order"
+
+
+def _tune(session, iterative_scan=""):
+    # SET LOCAL lasts until the end of this transaction only (values are ints or checked modes)
+    if iterative_scan not in ("", "relaxed_order", "strict_order"):
+        raise ValueError(f"unknown iterative scan mode: {iterative_scan}")
+    if VECTOR_INDEX == "hnsw":
+        session.execute(text(f"SET LOCAL hnsw.ef_search = {int(VECTOR_EF_SEARCH)}"))
+        if iterative_scan:
+            session.execute(text(f"SET LOCAL hnsw.iterative_scan = {iterative_scan}"))
+    elif VECTOR_INDEX == "ivfflat":
+        session.execute(text(f"SET LOCAL ivfflat.probes = {int(VECTOR_PROBES)}"))
+        if iterative_scan:
+            # IVFFlat only supports relaxed_order
+            session.execute(text("SET LOCAL ivfflat.iterative_scan = relaxed_order"))
+
+
+class CompanyChunkStore:
+    """Vector store over company_doc_chunks.
+
+    Implements the parts of the PGVector interface used here:
+    ``embedding_function``, ``add_embeddings`` and ``as_retriever``.
+    """
+
+    def __init__(self, engine, embedding_function):
+        self.engine = engine
+        self.embedding_function = embedding_function
+        self.iterative_scan = detect_iterative_scan(engine) if VECTOR_INDEX in INDEX_DDL else ""
+
+    def add_embeddings(self, texts, embeddings, metadatas=None, **kwargs):
+        """Bulk insert one batch of chunks (one INSERT, one transaction)."""
+        metadatas = metadatas or [{} for _ in texts]
+        rows = [
+            {"company_id": int(metadata["company_id"]), "content": text_, "meta": metadata, "embedding": embedding}
+            for text_, embedding, metadata in zip(texts, embeddings, metadatas)
+        ]
+        if rows:
+            with Session(self.engine) as session:
+                session.execute(insert(CompanyDocChunk), rows)
+                session.commit()
+        return len(rows)
+
+    def _nearest(self, company_id, embedding, k, *columns):
+        distance = CompanyDocChunk.embedding.cosine_distance(embedding)
+        with Session(self.engine) as session:
+            _tune(session, self.iterative_scan)
+            return (
+                session.query(CompanyDocChunk.content, CompanyDocChunk.meta, distance.label("distance"), *columns)
+                .filter(CompanyDocChunk.company_id == company_id)
+                .order_by(distance)
+                .limit(k)
+                .all()
+            )
+
+    @staticmethod
+    def _document(row):
+        return Document(page_content=row.content, metadata={**(row.meta or {}), "distance": float(row.distance)})
+
+    def search_by_vector(self, company_id, embedding, k=4):
+        """The ``k`` chunks of one company closest (cosine) to ``embedding``."""
+        return [self._document(row) for row in self._nearest(company_id, embedding, k)]
+
+    def search_with_embeddings(self, company_id, query, k):
+        """``(query_embedding, docs, doc_embeddings)`` for MMR over the ``k`` nearest chunks."""
+        query_embedding = self.embedding_function.embed_query(query)
+        rows = self._nearest(company_id, query_embedding, k, CompanyDocChunk.embedding)
+        return query_embedding, [self._document(row) for row in rows], [list(row.embedding) for row in rows]
+
+    def search(self, company_id, query, k=4):
+        return self.search_by_vector(company_id, self.embedding_function.embed_query(query), k)
+
+    def as_retriever(self, search_kwargs=None):
+        search_kwargs = search_kwargs or {}
+        company_id = (search_kwargs.get("filter") or {}).get("company_id")
+        if company_id is None:
+            raise ValueError("company_doc_chunks retrievers need a company_id filter")
+        return CompanyChunkRetriever(store=self, company_id=company_id, k=search_kwargs.get("k", 4))
+
+
+class CompanyChunkRetriever(BaseRetriever):
+    """LangChain retriever over one company's chunks."""
+
+    store: object
+    company_id: int
+    k: int = 4
+
+    def _get_relevant_documents(self, query, *, run_manager=None):
+        return self.store.search(self.company_id, query, self.k)
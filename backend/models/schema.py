@@ -1,9 +1,10 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum, LargeBinary
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum, LargeBinary, UniqueConstraint, Float
 from sqlalchemy.dialects.postgresql import JSON
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from typing import Optional
+import uuid
 from pydantic import BaseModel, EmailStr
 from enum import Enum
 from sqlalchemy.dialects.postgresql import JSONB  # Only if you're using PostgreSQL
@@ -97,6 +98,129 @@ class Employee(Base):
     # Relationships
     # company = relationship("Company", back_populates="employees")
 
+class RFPStructureCache(Base):
+    """Extracted RFP structure keyed by SHA-256 of the file bytes and extractor version."""
+    __tablename__ = "rfp_structure_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content_hash = Column(String(64), index=True, nullable=False)
+    extractor_version = Column(String, nullable=False)
+    model_name = Column(String, nullable=False, default="")
+    structured_data = Column(JSON, nullable=False)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_hit_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("content_hash", "extractor_version", "model_name", name="uq_rfp_structure_cache_key"),
+    )
+
+class Job(Base):
+    """Background job (upload -> extract -> generate) processed by workers/job_worker.py."""
+    __tablename__ = "jobs"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    kind = Column(String, nullable=False, index=True)  # extract | generate | pipeline
+    status = Column(String, default="queued", index=True)  # queued | running | succeeded | failed
+    progress = Column(Integer, default=0)
+    stage = Column(String, nullable=True)
+    payload = Column(JSON, default=dict)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    rfp_id = Column(Integer, ForeignKey("rfps.id"), nullable=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id"), nullable=True)
+    run_after = Column(DateTime, default=datetime.utcnow)
+    locked_by = Column(String, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+class RFPExtractedText(Base):
+    """Text extracted from a generated RFP artifact (docx/pdf), versioned per RFP."""
+    __tablename__ = "rfp_extracted_texts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rfp_id = Column(Integer, ForeignKey("rfps.id", ondelete="CASCADE"), index=True, nullable=False)
+    artifact = Column(String, nullable=False)  # pdf | docx
+    source_url = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    text = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("rfp_id", "artifact", "version", name="uq_rfp_extracted_text_version"),
+    )
+
+class AnswerCacheEntry(Base):
+    """Previously generated answer, looked up by embedding similarity within one company."""
+    __tablename__ = "answer_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(Integer, ForeignKey("companies.id", ondelete="CASCADE"), index=True, nullable=False)
+    kind = Column(String, nullable=False)  # section | question
+    mode = Column(String, nullable=False, default="agent")
+    query_text = Column(Text, nullable=False)  # normalized
+    embedding = Column(Vector(384), nullable=False)  # all-MiniLM-L6-v2
+    answer = Column(Text, nullable=False)
+    generation_seconds = Column(Float, default=0.0)
+    hit_count = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_hit_at = Column(DateTime, nullable=True)
+
+class ResponseCheckpoint(Base):
+    """One finished section/question/requirement answer of an in-progress response."""
+    __tablename__ = "response_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    rfp_id = Column(Integer, ForeignKey("rfps.id", ondelete="CASCADE"), index=True, nullable=False)
+    kind = Column(String, nullable=False)  # section | question | requirement
+    item_id = Column(String, nullable=False)
+    item_hash = Column(String(64), nullable=False)  # input item + mode; a changed item is regenerated
+    result = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("rfp_id", "kind", "item_id", name="uq_response_checkpoint_item"),
+    )
+
+class LLMCallLog(Base):
+    """One LLM or embedding call (or cache hit), for cost and latency reporting."""
+    __tablename__ = "llm_call_logs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    kind = Column(String, nullable=False)  # llm | embedding | rerank
+    endpoint = Column(String, nullable=True, index=True)
+    rfp_id = Column(Integer, nullable=True, index=True)  # no FK: logs outlive deleted RFPs
+    company_id = Column(Integer, nullable=True, index=True)
+    provider = Column(String, nullable=False)  # gemini | groq | huggingface | answer_cache | structure_cache
+    model = Column(String, nullable=True)
+    prompt_tokens = Column(Integer, nullable=True)
+    completion_tokens = Column(Integer, nullable=True)
+    units = Column(Integer, nullable=True)  # work items that are not tokens, e.g. rerank pairs
+    latency_seconds = Column(Float, nullable=False, default=0.0)
+    cache_hit = Column(Boolean, default=False)
+    success = Column(Boolean, default=True)
+    error = Column(String, nullable=True)
+
+# Tables in the vector database (VECTOR_DATABASE_URL), created by methods/vector_index.py
+VectorBase = declarative_base()
+
+class CompanyDocChunk(VectorBase):
+    """One embedded chunk of a company document; company_id is a real indexed column."""
+    __tablename__ = "company_doc_chunks"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(Integer, nullable=False, index=True)  # no FK: companies live in the main database
+    content = Column(Text, nullable=False)
+    meta = Column("metadata", JSONB, nullable=False, default=dict)
+    embedding = Column(Vector(384), nullable=False)  # all-MiniLM-L6-v2
+    source_id = Column(String, nullable=True, unique=True)  # langchain_pg_embedding row it was backfilled from
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 # Pydantic Models
 class UserCreate(BaseModel):
     username: str
@@ -0,0 +1,165 @@
+"""Background worker for the jobs table.
+
+Run one or more of these next to uvicorn (from the backend directory):
+
+    python -m workers.job_worker            # one worker process
+    python -m workers.job_worker --processes 4
+
+Each process claims one job at a time; jobs interrupted by a crash or restart
+are reclaimed once their heartbeat goes stale (see methods/jobs.py).
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+load_dotenv()
+
+import google.generativeai as genai
+
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+if os.getenv("GROQ_API_KEY"):
+    os.environ["GROQ_API_KEY"] = os.getenv("GROQ_API_KEY")
+
+from methods.functions import SessionLocal
+from methods.jobs import (
+    NonRetryableJobError,
+    claim_next_job,
+    complete_job,
+    fail_job,
+    update_job_progress,
+)
+from methods.telemetry import telemetry_context
+from models.schema import RFP
+
+POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "2"))
+HEARTBEAT_INTERVAL = float(os.getenv("JOB_HEARTBEAT_INTERVAL", "30"))
+
+
+async def run_extract(db, payload, progress):
+    from api.upload_rfp import extract_structure_for_rfp
+
+    rfp = db.query(RFP).filter(RFP.id == payload.get("rfp_id")).first()
+    if not rfp:
+        raise NonRetryableJobError("RFP not found")
+    structured_data, digest = await extract_structure_for_rfp(db, rfp, payload.get("employee_id"), progress)
+    return {"structured_data": structured_data, "content_hash": digest}
+
+
+async def run_generate(db, payload, progress):
+    from api.response_for_each import generate_rfp_response
+
+    if not isinstance(payload.get("structured_data"), dict):
+        raise NonRetryableJobError("structured_data is required")
+    response = await generate_rfp_response(
+        payload["structured_data"], progress, payload.get("mode"), resume=payload.get("resume", False)
+    )
+    return {"response": response}
+
+
+async def run_pipeline(db, payload, progress):
+    # Extraction is ~30% of the bar; a retry re-uses the cached structure
+    extracted = await run_extract(db, payload, lambda pct, stage: progress(pct * 0.3, stage))
+    generated = await run_generate(
+        db,
+        {"structured_data": extracted["structured_data"], "resume": payload.get("resume", False)},
+        lambda pct, stage: progress(30 + pct * 0.7, stage),
+    )
+    return {**extracted, **generated}
+
+
+HANDLERS = {
+    "extract": run_extract,
+    "generate": run_generate,
+    "pipeline": run_pipeline,
+}
+
+
+def _heartbeat(job_id, stop):
+    while not stop.wait(HEARTBEAT_INTERVAL):
+        update_job_progress(job_id)
+
+
+async def process_job(db, job):
+    handler = HANDLERS.get(job.kind)
+    if handler is None:
+        fail_job(db, job, f"Unknown job kind: {job.kind}", retryable=False)
+        return
+
+    def progress(percent, stage=None):
+        update_job_progress(job.id, percent, stage)
+
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(job.id, stop), daemon=True)
+    beat.start()
+    try:
+        print(f"running job {job.id} ({job.kind}), attempt {job.attempts}")
+        payload = dict(job.payload or {})
+        # Only a retry picks up the answers checkpointed by the failed attempt
+        payload.setdefault("resume", (job.attempts or 1) > 1)
+        # Telemetry attribution set by the handler ends with the job
+        with telemetry_context():
+            result = await handler(db, payload, progress)
+        complete_job(db, job, result)
+        print(f"job {job.id} succeeded")
+    except NonRetryableJobError as e:
+        fail_job(db, job, str(e), retryable=False)
+    except HTTPException as e:
+        # 4xx means bad input (missing file, unsupported format) - retrying will not help
+        fail_job(db, job, f"{e.status_code}: {e.detail}", retryable=e.status_code >= 500)
+    except Exception:
+        fail_job(db, job, traceback.format_exc())
+    finally:
+        stop.set()
+
+
+async def worker_loop(worker_id):
+    print(f"job worker {worker_id} started")
+    while True:
+        db = SessionLocal()
+        try:
+            job = claim_next_job(db, worker_id)
+            if job is None:
+                await asyncio.sleep(POLL_INTERVAL)
+                continue
+            await process_job(db, job)
+        except Exception:
+            db.rollback()
+            traceback.print_exc()
+            await asyncio.sleep(POLL_INTERVAL)
+        finally:
+            db.close()
+
+
+def run_worker():
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    # One long-lived event loop per process so pooled async clients stay valid
+    asyncio.run(worker_loop(worker_id))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="RFP background job worker")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_WORKER_PROCESSES", "1")))
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        run_worker()
+    else:
+        processes = [multiprocessing.Process(target=run_worker, daemon=False) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
+            time.sleep(1)
@@ -17,6 +17,7 @@ export default function ResponseGeneration({ rfpData, onResponseGenerated }: Res
   const [progress, setProgress] = useState(0)
   const [currentStep, setCurrentStep] = useState("")
   const [error, setError] = useState<string | null>(null)
+  const [partialResults, setPartialResults] = useState<any[]>([])
 
   const handleGenerate = async () => {
     if (!rfpData) {
@@ -27,26 +28,13 @@ export default function ResponseGeneration({ rfpData, onResponseGenerated }: Res
     setGenerating(true)
     setError(null)
     setProgress(0)
-
-    const steps = [
-      { step: "Analyzing RFP structure...", duration: 1000 },
-      { step: "Processing questions and requirements...", duration: 1500 },
-      { step: "Retrieving relevant company information...", duration: 1200 },
-      { step: "Generating AI responses...", duration: 2000 },
-      { step: "Formatting and structuring content...", duration: 800 },
-      { step: "Finalizing response document...", duration: 500 },
-    ]
+    setPartialResults([])
 
     try {
-      // Show progress steps
-      for (let i = 0; i < steps.length; i++) {
-        setCurrentStep(steps[i].step)
-        setProgress(((i + 1) / steps.length) * 100)
-        await new Promise((resolve) => setTimeout(resolve, steps[i].duration))
-      }
+      setCurrentStep("Analyzing RFP structure...")
 
-      // Make actual API call to generate response
-      const response = await fetch("http://localhost:8000/api/generate-response", {
+      // Stream answers as they complete (NDJSON: one event per line)
+      const response = await fetch("http://localhost:8000/api/generate-response/stream", {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
@@ -54,12 +42,49 @@ export default function ResponseGeneration({ rfpData, onResponseGenerated }: Res
         body: JSON.stringify(rfpData),
       })
 
-      if (!response.ok) {
-        const errorData = await response.json()
+      if (!response.ok || !response.body) {
+        const errorData = await response.json().catch(() => ({}))
         throw new Error(errorData.detail || "Failed to generate response")
       }
 
-      const generatedResponse = await response.json()
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ""
+      let total = 0
+      let done = 0
+      let generatedResponse: any = null
+
+      const handleEvent = (event: any) => {
+        if (event.type === "start") {
+          total = event.total
+          setCurrentStep(`Generating AI responses (0 of ${total})...`)
+        } else if (event.type === "section" || event.type === "question" || event.type === "requirement") {
+          done += 1
+          setPartialResults((prev) => [...prev, event])
+          setProgress(total ? (done / total) * 100 : 100)
+          setCurrentStep(`Generating AI responses (${done} of ${total})...`)
+        } else if (event.type === "summary") {
+          generatedResponse = event.response
+        } else if (event.type === "error") {
+          throw new Error(event.detail || "Failed to generate response")
+        }
+      }
+
+      while (true) {
+        const { value, done: streamDone } = await reader.read()
+        if (streamDone) break
+        buffer += decoder.decode(value, { stream: true })
+        const lines = buffer.split("\n")
+        buffer = lines.pop() || ""
+        for (const line of lines) {
+          if (line.trim()) handleEvent(JSON.parse(line))
+        }
+      }
+      if (buffer.trim()) handleEvent(JSON.parse(buffer))
+
+      if (!generatedResponse) {
+        throw new Error("Response stream ended before generation finished")
+      }
       console.log("Generated Response:", generatedResponse)
 
       onResponseGenerated(generatedResponse)
@@ -166,6 +191,18 @@ export default function ResponseGeneration({ rfpData, onResponseGenerated }: Res
               </div>
               <Progress value={progress} className="h-2" />
               <div className="text-sm text-blue-600 text-right">{Math.round(progress)}% complete</div>
+              {partialResults.length > 0 && (
+                <div className="max-h-64 overflow-y-auto space-y-2 pt-2">
+                  {partialResults.map((event) => (
+                    <div key={`${event.type}-${event.index}`} className="rounded-lg bg-white p-3 text-sm shadow-sm">
+                      <div className="font-semibold text-gray-900">
+                        {event.type === "section" ? event.item.title : event.item.text}
+                      </div>
+                      <p className="text-gray-600 line-clamp-3">{event.item.answer ?? event.item.evidence}</p>
+                    </div>
+                  ))}
+                </div>
+              )}
             </div>
           </CardContent>
         </Card>